@@ -0,0 +1,485 @@
+-- =====================================================================
+-- BAPESU API — Funciones RPC del servidor Flask (tienda)
+-- =====================================================================
+-- Funciones y vistas que consume server/app/services sobre las tablas
+-- de la tienda (products, product_ratings, orders, users, ...).
+-- Idempotente: usa CREATE OR REPLACE / IF NOT EXISTS, se puede correr
+-- completo sobre una base existente.
+--
+-- SECCIONES:
+--   1. Búsqueda de texto completo en productos
+--   2. Listado de productos (filtros + conteo + calificaciones)
+--   3. Índices para paginación por cursor (created_at, id)
+--   4. Agregados de calificaciones por producto (mantenidos en escritura)
+--   5. Marca updated_at en productos (refresco del catálogo en memoria)
+--   6. Estadísticas agregadas (órdenes, usuarios, productos)
+--   7. Productos por categoría
+--   8. Descripciones de productos en lote
+-- =====================================================================
+
+-- =====================================================================
+-- §1. BÚSQUEDA DE TEXTO COMPLETO EN PRODUCTOS
+-- =====================================================================
+-- Reemplaza los ILIKE '%término%' (que recorren toda la tabla) por un
+-- tsvector con raíces en español y sin acentos, indexado con GIN. Cada
+-- palabra del término se busca como prefijo ('zapat:*') para que sirva
+-- mientras el usuario escribe; el SKU se busca por prefijo con trigramas.
+-- Lo usan products_filtered (§2, filtro search del listado) y
+-- search_products (GET /products/search).
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- ── Configuración español + unaccent ─────────────────────────────────
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION public.es_unaccent (COPY = pg_catalog.spanish);
+        ALTER TEXT SEARCH CONFIGURATION public.es_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+    END IF;
+END;
+$$;
+
+-- ── Documento indexado: nombre y SKU pesan más que categoría y descripción
+ALTER TABLE public.products ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('public.es_unaccent'::regconfig, COALESCE(name, '')), 'A') ||
+        setweight(to_tsvector('public.es_unaccent'::regconfig, COALESCE(sku, '')), 'A') ||
+        setweight(to_tsvector('public.es_unaccent'::regconfig, COALESCE(category, '')), 'B') ||
+        setweight(to_tsvector('public.es_unaccent'::regconfig, COALESCE(description, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_products_search_vector ON public.products USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_products_sku_trgm      ON public.products USING GIN (sku gin_trgm_ops);
+
+-- ── Término del usuario → tsquery con prefijos ───────────────────────
+-- 'Zapato roj' → 'zapat':* & 'roj':*   (NULL si no quedan palabras)
+CREATE OR REPLACE FUNCTION public.product_search_query(p_search TEXT)
+RETURNS TSQUERY LANGUAGE sql IMMUTABLE AS $$
+    SELECT to_tsquery('public.es_unaccent'::regconfig, string_agg(quote_literal(w) || ':*', ' & '))
+    FROM regexp_split_to_table(lower(COALESCE(p_search, '')), '[^[:alnum:]]+') AS w
+    WHERE w <> ''
+$$;
+
+-- ── Búsqueda con ranking ─────────────────────────────────────────────
+-- Devuelve {"data": [...], "total": n}; cada fila incluye search_rank.
+-- Un SKU que coincide exactamente va primero.
+CREATE OR REPLACE FUNCTION public.search_products(
+    p_search TEXT,
+    p_limit  INTEGER DEFAULT 10,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS JSONB LANGUAGE sql STABLE AS $$
+    WITH q AS (
+        SELECT public.product_search_query(p_search) AS query
+    ),
+    matches AS (
+        SELECT p.*,
+               CASE WHEN lower(p.sku) = lower(p_search) THEN 1.0 ELSE 0 END
+               + ts_rank_cd(p.search_vector, q.query) AS search_rank
+        FROM public.products p, q
+        WHERE p.is_active = TRUE
+          AND (p.search_vector @@ q.query OR p.sku ILIKE p_search || '%')
+    ),
+    page AS (
+        SELECT m.*, COUNT(*) OVER () AS total_count
+        FROM matches m
+        ORDER BY m.search_rank DESC, m.created_at DESC, m.id DESC
+        LIMIT p_limit OFFSET p_offset
+    )
+    SELECT jsonb_build_object(
+        'data',  COALESCE(jsonb_agg((to_jsonb(page) - 'total_count' - 'search_vector')
+                                    ORDER BY page.search_rank DESC, page.created_at DESC, page.id DESC),
+                          '[]'::jsonb),
+        'total', COALESCE(MAX(page.total_count), 0)
+    )
+    FROM page
+$$;
+
+GRANT EXECUTE ON FUNCTION public.product_search_query(TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION public.search_products(TEXT, INTEGER, INTEGER) TO service_role;
+
+-- =====================================================================
+-- §2. LISTADO DE PRODUCTOS
+-- =====================================================================
+-- Un solo round-trip para GET /products: filas de la página, total y
+-- promedio/cantidad de calificaciones (leídos de product_rating_stats,
+-- ver §4). Los filtros replican ProductService._apply_filters
+-- (NULL = filtro no aplicado).
+
+-- ── Productos activos filtrados ──────────────────────────────────────
+-- Función SQL simple (inlineable): el planificador la expande, lo que
+-- permite estimar filas con EXPLAIN en estimate_filtered_products.
+CREATE OR REPLACE FUNCTION public.products_filtered(
+    p_category  TEXT    DEFAULT NULL,
+    p_status    TEXT    DEFAULT NULL,
+    p_search    TEXT    DEFAULT NULL,
+    p_min_price NUMERIC DEFAULT NULL,
+    p_max_price NUMERIC DEFAULT NULL,
+    p_featured  BOOLEAN DEFAULT NULL,
+    p_in_stock  BOOLEAN DEFAULT NULL
+)
+RETURNS SETOF public.products LANGUAGE sql STABLE AS $$
+    SELECT p.*
+    FROM public.products p
+    WHERE p.is_active = TRUE
+      AND (p_category  IS NULL OR p.category = p_category)
+      AND (p_status    IS NULL OR p.status = p_status)
+      AND (p_search    IS NULL
+           OR p.search_vector @@ public.product_search_query(p_search)
+           OR p.sku ILIKE p_search || '%')
+      AND (p_min_price IS NULL OR p.price >= p_min_price)
+      AND (p_max_price IS NULL OR p.price <= p_max_price)
+      AND (p_featured  IS NULL OR p.is_featured = p_featured)
+      AND (p_in_stock  IS NOT TRUE OR p.stock > 0)
+$$;
+
+-- ── Conteo estimado por el planificador ──────────────────────────────
+CREATE OR REPLACE FUNCTION public.estimate_filtered_products(
+    p_category  TEXT    DEFAULT NULL,
+    p_status    TEXT    DEFAULT NULL,
+    p_search    TEXT    DEFAULT NULL,
+    p_min_price NUMERIC DEFAULT NULL,
+    p_max_price NUMERIC DEFAULT NULL,
+    p_featured  BOOLEAN DEFAULT NULL,
+    p_in_stock  BOOLEAN DEFAULT NULL
+)
+RETURNS BIGINT LANGUAGE plpgsql STABLE AS $$
+DECLARE
+    v_plan JSON;
+BEGIN
+    EXECUTE format(
+        'EXPLAIN (FORMAT JSON) SELECT 1 FROM public.products_filtered(%L, %L, %L, %L::numeric, %L::numeric, %L::boolean, %L::boolean)',
+        p_category, p_status, p_search, p_min_price, p_max_price, p_featured, p_in_stock
+    ) INTO v_plan;
+    RETURN (v_plan -> 0 -> 'Plan' ->> 'Plan Rows')::BIGINT;
+END;
+$$;
+
+-- ── Listado paginado ─────────────────────────────────────────────────
+-- p_count_mode:
+--   'exact'     → COUNT(*) OVER () sobre el filtro (misma consulta)
+--   'planned'   → estimación del planificador, sin contar filas
+--   'estimated' → estimación; si es <= p_estimate_threshold, exacto
+-- Devuelve {"data": [...], "total": n, "total_is_estimate": bool}
+CREATE OR REPLACE FUNCTION public.list_products(
+    p_category           TEXT    DEFAULT NULL,
+    p_status             TEXT    DEFAULT NULL,
+    p_search             TEXT    DEFAULT NULL,
+    p_min_price          NUMERIC DEFAULT NULL,
+    p_max_price          NUMERIC DEFAULT NULL,
+    p_featured           BOOLEAN DEFAULT NULL,
+    p_in_stock           BOOLEAN DEFAULT NULL,
+    p_limit              INTEGER DEFAULT 10,
+    p_offset             INTEGER DEFAULT 0,
+    p_count_mode         TEXT    DEFAULT 'exact',
+    p_estimate_threshold BIGINT  DEFAULT 1000
+)
+RETURNS JSONB LANGUAGE plpgsql STABLE AS $$
+DECLARE
+    v_rows      JSONB;
+    v_total     BIGINT;
+    v_estimated BOOLEAN := FALSE;
+BEGIN
+    IF p_count_mode IN ('planned', 'estimated') THEN
+        v_total := public.estimate_filtered_products(
+            p_category, p_status, p_search, p_min_price, p_max_price, p_featured, p_in_stock
+        );
+        v_estimated := TRUE;
+        IF p_count_mode = 'estimated' AND v_total <= p_estimate_threshold THEN
+            v_total := NULL;
+            v_estimated := FALSE;
+        END IF;
+    END IF;
+
+    IF v_total IS NULL THEN
+        -- Conteo exacto con función de ventana en la misma consulta
+        WITH page AS (
+            SELECT f.*, COUNT(*) OVER () AS total_count
+            FROM public.products_filtered(
+                p_category, p_status, p_search, p_min_price, p_max_price, p_featured, p_in_stock
+            ) f
+            ORDER BY f.created_at DESC, f.id DESC
+            LIMIT p_limit OFFSET p_offset
+        )
+        SELECT COALESCE(jsonb_agg(
+                   (to_jsonb(page) - 'total_count' - 'search_vector')
+                   || jsonb_build_object(
+                        'rating',  COALESCE(ROUND(rs.average_rating, 1), 0),
+                        'reviews', COALESCE(rs.total_ratings, 0))
+                   ORDER BY page.created_at DESC, page.id DESC), '[]'::jsonb),
+               MAX(page.total_count)
+          INTO v_rows, v_total
+          FROM page
+          LEFT JOIN LATERAL (
+              SELECT s.ratings_sum::NUMERIC / NULLIF(s.ratings_count, 0) AS average_rating,
+                     s.ratings_count AS total_ratings
+              FROM public.product_rating_stats s
+              WHERE s.product_id = page.id
+          ) rs ON TRUE;
+
+        -- Página fuera de rango: la ventana no devolvió filas
+        IF v_total IS NULL THEN
+            SELECT COUNT(*) INTO v_total
+            FROM public.products_filtered(
+                p_category, p_status, p_search, p_min_price, p_max_price, p_featured, p_in_stock
+            );
+        END IF;
+    ELSE
+        WITH page AS (
+            SELECT f.*
+            FROM public.products_filtered(
+                p_category, p_status, p_search, p_min_price, p_max_price, p_featured, p_in_stock
+            ) f
+            ORDER BY f.created_at DESC, f.id DESC
+            LIMIT p_limit OFFSET p_offset
+        )
+        SELECT COALESCE(jsonb_agg(
+                   (to_jsonb(page) - 'search_vector')
+                   || jsonb_build_object(
+                        'rating',  COALESCE(ROUND(rs.average_rating, 1), 0),
+                        'reviews', COALESCE(rs.total_ratings, 0))
+                   ORDER BY page.created_at DESC, page.id DESC), '[]'::jsonb)
+          INTO v_rows
+          FROM page
+          LEFT JOIN LATERAL (
+              SELECT s.ratings_sum::NUMERIC / NULLIF(s.ratings_count, 0) AS average_rating,
+                     s.ratings_count AS total_ratings
+              FROM public.product_rating_stats s
+              WHERE s.product_id = page.id
+          ) rs ON TRUE;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'data', v_rows,
+        'total', v_total,
+        'total_is_estimate', v_estimated
+    );
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.list_products(TEXT, TEXT, TEXT, NUMERIC, NUMERIC, BOOLEAN, BOOLEAN, INTEGER, INTEGER, TEXT, BIGINT) TO service_role;
+
+CREATE INDEX IF NOT EXISTS idx_products_active_created ON public.products(is_active, created_at DESC, id DESC);
+
+-- =====================================================================
+-- §3. ÍNDICES PARA PAGINACIÓN POR CURSOR
+-- =====================================================================
+-- app/utils/pagination.apply_keyset ordena por (created_at, id) DESC y
+-- continúa con created_at < c OR (created_at = c AND id < i).
+CREATE INDEX IF NOT EXISTS idx_orders_created_id        ON public.orders(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_user_created_id   ON public.orders(user_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_orders_status_created_id ON public.orders(status, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_users_created_id         ON public.users(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_product_ratings_product_created_id
+    ON public.product_ratings(product_id, created_at DESC, id DESC) WHERE is_approved = TRUE;
+
+-- =====================================================================
+-- §4. AGREGADOS DE CALIFICACIONES POR PRODUCTO
+-- =====================================================================
+-- Conteo, suma e histograma de calificaciones aprobadas. Los mantiene
+-- ProductRatingService (create/update/delete/approve/reject_rating) con
+-- apply_product_rating_delta; rebuild_product_rating_stats los recalcula
+-- desde product_ratings para reparar desvíos
+-- (server/scripts/rebuild_rating_stats.py).
+CREATE TABLE IF NOT EXISTS public.product_rating_stats (
+    product_id    BIGINT      PRIMARY KEY REFERENCES public.products(id) ON DELETE CASCADE,
+    ratings_count INTEGER     NOT NULL DEFAULT 0,
+    ratings_sum   INTEGER     NOT NULL DEFAULT 0,
+    count_1       INTEGER     NOT NULL DEFAULT 0,
+    count_2       INTEGER     NOT NULL DEFAULT 0,
+    count_3       INTEGER     NOT NULL DEFAULT 0,
+    count_4       INTEGER     NOT NULL DEFAULT 0,
+    count_5       INTEGER     NOT NULL DEFAULT 0,
+    updated_at    TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- ── Aplicar un cambio incremental ────────────────────────────────────
+-- p_removed: calificación aprobada que deja de contar (NULL si ninguna)
+-- p_added:   calificación aprobada que empieza a contar (NULL si ninguna)
+CREATE OR REPLACE FUNCTION public.apply_product_rating_delta(
+    p_product_id BIGINT,
+    p_removed    INTEGER DEFAULT NULL,
+    p_added      INTEGER DEFAULT NULL
+)
+RETURNS VOID LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO public.product_rating_stats AS s
+        (product_id, ratings_count, ratings_sum, count_1, count_2, count_3, count_4, count_5)
+    VALUES (
+        p_product_id,
+        (p_added IS NOT NULL)::INT - (p_removed IS NOT NULL)::INT,
+        COALESCE(p_added, 0) - COALESCE(p_removed, 0),
+        COALESCE((p_added = 1)::INT, 0) - COALESCE((p_removed = 1)::INT, 0),
+        COALESCE((p_added = 2)::INT, 0) - COALESCE((p_removed = 2)::INT, 0),
+        COALESCE((p_added = 3)::INT, 0) - COALESCE((p_removed = 3)::INT, 0),
+        COALESCE((p_added = 4)::INT, 0) - COALESCE((p_removed = 4)::INT, 0),
+        COALESCE((p_added = 5)::INT, 0) - COALESCE((p_removed = 5)::INT, 0)
+    )
+    ON CONFLICT (product_id) DO UPDATE SET
+        ratings_count = GREATEST(s.ratings_count + EXCLUDED.ratings_count, 0),
+        ratings_sum   = GREATEST(s.ratings_sum   + EXCLUDED.ratings_sum, 0),
+        count_1       = GREATEST(s.count_1 + EXCLUDED.count_1, 0),
+        count_2       = GREATEST(s.count_2 + EXCLUDED.count_2, 0),
+        count_3       = GREATEST(s.count_3 + EXCLUDED.count_3, 0),
+        count_4       = GREATEST(s.count_4 + EXCLUDED.count_4, 0),
+        count_5       = GREATEST(s.count_5 + EXCLUDED.count_5, 0),
+        updated_at    = NOW();
+END;
+$$;
+
+-- ── Recalcular desde product_ratings ─────────────────────────────────
+-- p_product_id NULL recalcula todos los productos. Devuelve las filas escritas.
+CREATE OR REPLACE FUNCTION public.rebuild_product_rating_stats(p_product_id BIGINT DEFAULT NULL)
+RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    DELETE FROM public.product_rating_stats
+    WHERE p_product_id IS NULL OR product_id = p_product_id;
+
+    INSERT INTO public.product_rating_stats
+        (product_id, ratings_count, ratings_sum, count_1, count_2, count_3, count_4, count_5)
+    SELECT r.product_id,
+           COUNT(*),
+           SUM(r.rating),
+           COUNT(*) FILTER (WHERE r.rating = 1),
+           COUNT(*) FILTER (WHERE r.rating = 2),
+           COUNT(*) FILTER (WHERE r.rating = 3),
+           COUNT(*) FILTER (WHERE r.rating = 4),
+           COUNT(*) FILTER (WHERE r.rating = 5)
+    FROM public.product_ratings r
+    WHERE r.is_approved = TRUE
+      AND (p_product_id IS NULL OR r.product_id = p_product_id)
+      AND EXISTS (SELECT 1 FROM public.products p WHERE p.id = r.product_id)
+    GROUP BY r.product_id;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.apply_product_rating_delta(BIGINT, INTEGER, INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION public.rebuild_product_rating_stats(BIGINT) TO service_role;
+
+-- ── Carga inicial ────────────────────────────────────────────────────
+-- Llena la tabla con las calificaciones ya existentes; sin esto los
+-- productos calificados antes de instalar §4 aparecen sin calificaciones.
+-- Volver a ejecutar el archivo solo recalcula los mismos valores.
+SELECT public.rebuild_product_rating_stats();
+
+-- =====================================================================
+-- §5. MARCA updated_at EN PRODUCTOS
+-- =====================================================================
+-- app/services/product_catalog.ProductCatalog refresca su copia en
+-- memoria con updated_at >= última marca vista, así que toda escritura
+-- en products (incluidos stock y soft delete) debe moverla.
+ALTER TABLE public.products ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT NOW();
+
+DROP TRIGGER IF EXISTS trg_products_updated_at ON public.products;
+CREATE TRIGGER trg_products_updated_at
+    BEFORE UPDATE ON public.products
+    FOR EACH ROW EXECUTE FUNCTION public.touch_updated_at();
+
+CREATE INDEX IF NOT EXISTS idx_products_updated_at           ON public.products(updated_at);
+CREATE INDEX IF NOT EXISTS idx_product_rating_stats_updated_at ON public.product_rating_stats(updated_at);
+
+-- =====================================================================
+-- §6. ESTADÍSTICAS AGREGADAS (ÓRDENES, USUARIOS, PRODUCTOS)
+-- =====================================================================
+-- Una fila por llamada, calculada con GROUP BY / FILTER en la base de
+-- datos en lugar de descargar todas las filas al servidor. Devuelven el
+-- mismo JSON que armaban OrderService.get_order_stats,
+-- UserService.get_user_stats y ProductService._calculate_stats_manually.
+
+-- ── Órdenes ──────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION public.get_order_stats()
+RETURNS JSONB LANGUAGE sql STABLE AS $$
+    WITH by_status AS (
+        SELECT status,
+               COUNT(*) AS orders,
+               SUM(total_amount) FILTER (WHERE status = 'delivered') AS sales
+        FROM public.orders
+        GROUP BY status
+    )
+    SELECT jsonb_build_object(
+        'total_orders',  COALESCE(SUM(orders), 0),
+        'status_counts', COALESCE(jsonb_object_agg(status, orders) FILTER (WHERE status IS NOT NULL), '{}'::jsonb),
+        'total_sales',   COALESCE(SUM(sales), 0)
+    )
+    FROM by_status
+$$;
+
+-- ── Usuarios ─────────────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION public.get_user_stats()
+RETURNS JSONB LANGUAGE sql STABLE AS $$
+    WITH by_role AS (
+        SELECT COALESCE(role, 'user') AS role,
+               COUNT(*) AS users,
+               COUNT(*) FILTER (WHERE is_active = TRUE) AS active
+        FROM public.users
+        GROUP BY COALESCE(role, 'user')
+    )
+    SELECT jsonb_build_object(
+        'total_users',    COALESCE(SUM(users), 0),
+        'active_users',   COALESCE(SUM(active), 0),
+        'inactive_users', COALESCE(SUM(users) - SUM(active), 0),
+        'role_counts',    COALESCE(jsonb_object_agg(role, users), '{}'::jsonb)
+    )
+    FROM by_role
+$$;
+
+-- ── Productos activos ────────────────────────────────────────────────
+CREATE OR REPLACE FUNCTION public.get_product_stats()
+RETURNS JSONB LANGUAGE sql STABLE AS $$
+    SELECT jsonb_build_object(
+        'total_products',     COUNT(*),
+        'active_products',    COUNT(*) FILTER (WHERE status = 'Activo'),
+        'out_of_stock',       COUNT(*) FILTER (WHERE status = 'Sin Stock'),
+        'featured_products',  COUNT(*) FILTER (WHERE is_featured),
+        'average_price',      COALESCE(ROUND(AVG(COALESCE(price, 0)), 2), 0),
+        'total_stock',        COALESCE(SUM(COALESCE(stock, 0)), 0),
+        'low_stock_products', COUNT(*) FILTER (WHERE stock > 0 AND stock <= 5)
+    )
+    FROM public.products
+    WHERE is_active = TRUE
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_order_stats()   TO service_role;
+GRANT EXECUTE ON FUNCTION public.get_user_stats()    TO service_role;
+GRANT EXECUTE ON FUNCTION public.get_product_stats() TO service_role;
+
+-- =====================================================================
+-- §7. PRODUCTOS POR CATEGORÍA
+-- =====================================================================
+-- Conteo de productos activos por categoría en una sola consulta, para
+-- CategoryService.get_category_stats (antes una consulta por categoría).
+CREATE OR REPLACE FUNCTION public.get_category_product_counts()
+RETURNS TABLE (category TEXT, products BIGINT) LANGUAGE sql STABLE AS $$
+    SELECT p.category, COUNT(*)
+    FROM public.products p
+    WHERE p.is_active = TRUE
+    GROUP BY p.category
+$$;
+
+GRANT EXECUTE ON FUNCTION public.get_category_product_counts() TO service_role;
+
+CREATE INDEX IF NOT EXISTS idx_products_active_category ON public.products(category) WHERE is_active = TRUE;
+
+-- =====================================================================
+-- §8. DESCRIPCIONES DE PRODUCTOS EN LOTE
+-- =====================================================================
+-- Guarda las descripciones generadas por el trabajo en lote
+-- (ProductService.update_product_descriptions) en un solo UPDATE.
+-- p_items: [{"id": 123, "description": "..."}]. Devuelve los IDs
+-- actualizados; el trigger de §5 actualiza updated_at.
+CREATE OR REPLACE FUNCTION public.update_product_descriptions(p_items JSONB)
+RETURNS SETOF BIGINT LANGUAGE sql VOLATILE AS $$
+    UPDATE public.products p
+    SET description = i.description
+    FROM jsonb_to_recordset(p_items) AS i(id BIGINT, description TEXT)
+    WHERE p.id = i.id
+    RETURNING p.id::BIGINT
+$$;
+
+GRANT EXECUTE ON FUNCTION public.update_product_descriptions(JSONB) TO service_role;
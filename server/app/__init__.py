@@ -1,11 +1,18 @@
-from flask import Flask
+from flask import Flask, Response, request, abort
 from flask_cors import CORS
 from .config import Config
 from .routes import api_bp
+from .services.background_removal_service import start_rembg_warmup
+from .services.background_removal_jobs import start_background_removal_pool
+from .utils.metrics import init_app_metrics, render_metrics
+from .utils.log import configure_logging, init_request_logging
 from flask_swagger import swagger
 from flask_swagger_ui import get_swaggerui_blueprint
 
 def create_app(config_class=Config):
+    # Logs JSON con nivel, muestreo de DEBUG e ID de petición (LOG_LEVEL, LOG_FORMAT)
+    configure_logging()
+
     app = Flask(__name__)
     app.config.from_object(config_class)
 
@@ -36,6 +43,21 @@ def create_app(config_class=Config):
     # Registrar blueprints API
     app.register_blueprint(api_bp, url_prefix=app.config['API_PREFIX'])
 
+    # ID de petición (X-Request-ID) en cada log y en la respuesta
+    init_request_logging(app)
+
+    # Métricas de Prometheus: duración, estado y tamaño por ruta
+    init_app_metrics(app)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        if not config_class.METRICS_ENABLED:
+            abort(404)
+        if config_class.METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {config_class.METRICS_TOKEN}":
+            abort(401)
+        data, content_type = render_metrics()
+        return Response(data, mimetype=content_type)
+
     # Manejador global para solicitudes OPTIONS
     @app.route('/<path:path>', methods=['OPTIONS'])
     def handle_options(path):
@@ -46,4 +68,10 @@ def create_app(config_class=Config):
         response.headers.add('Access-Control-Max-Age', '86400')
         return response
 
+    # Cargar el modelo de rembg al iniciar el worker y no en la primera petición
+    if config_class.REMBG_POOL_WORKERS > 0:
+        start_background_removal_pool()
+    elif config_class.REMBG_PRELOAD:
+        start_rembg_warmup()
+
     return app
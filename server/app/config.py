@@ -15,6 +15,49 @@ class Config:
     SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_KEY')  # Clave de servicio para operaciones admin
     SUPABASE_JWT_SECRET = os.getenv('SUPABASE_JWT_SECRET')
 
+    # Pool de conexiones HTTP hacia Supabase (uno por worker)
+    SUPABASE_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', '10'))
+    SUPABASE_POOL_IDLE_TIMEOUT = float(os.getenv('SUPABASE_POOL_IDLE_TIMEOUT', '30'))
+    SUPABASE_HTTP_TIMEOUT = float(os.getenv('SUPABASE_HTTP_TIMEOUT', '20'))
+
+    # Pool de hilos para consultas independientes en paralelo (uno por worker)
+    IO_POOL_SIZE = int(os.getenv('IO_POOL_SIZE', '16'))
+
+    # Modo ASGI (asgi.py): hilos que atienden la app Flask por worker de uvicorn
+    ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '40'))
+
+    # Caché del rol de administrador en admin_required (TTL en segundos, 0 la desactiva)
+    ADMIN_ROLE_CACHE_TTL = float(os.getenv('ADMIN_ROLE_CACHE_TTL', '60'))
+    ADMIN_ROLE_CACHE_MAX_ENTRIES = int(os.getenv('ADMIN_ROLE_CACHE_MAX_ENTRIES', '1024'))
+
+    # Caché de JWT ya verificados en token_required/admin_required
+    JWT_CACHE_ENABLED = os.getenv('JWT_CACHE_ENABLED', 'True').lower() == 'true'
+    JWT_CACHE_MAX_ENTRIES = int(os.getenv('JWT_CACHE_MAX_ENTRIES', '4096'))
+    JWT_CACHE_MAX_TTL = float(os.getenv('JWT_CACHE_MAX_TTL', '3600'))
+
+    # Conteo del total en el listado de productos ('exact', 'planned', 'estimated')
+    PRODUCTS_COUNT_MODE = os.getenv('PRODUCTS_COUNT_MODE', 'exact')
+    PRODUCTS_ESTIMATED_COUNT_FROM_PAGE = int(os.getenv('PRODUCTS_ESTIMATED_COUNT_FROM_PAGE', '20'))  # 0 = nunca
+    PRODUCTS_ESTIMATE_THRESHOLD = int(os.getenv('PRODUCTS_ESTIMATE_THRESHOLD', '1000'))
+
+    # Copia en memoria del catálogo de productos (una por worker, desactivada por defecto)
+    CATALOG_SNAPSHOT_ENABLED = os.getenv('CATALOG_SNAPSHOT_ENABLED', 'False').lower() == 'true'
+    CATALOG_REFRESH_INTERVAL = float(os.getenv('CATALOG_REFRESH_INTERVAL', '30'))  # refresco incremental
+    CATALOG_FULL_RELOAD_INTERVAL = float(os.getenv('CATALOG_FULL_RELOAD_INTERVAL', '900'))  # recarga completa
+
+    # Caché de listas de categorías y conteos de productos por categoría
+    CATEGORY_CACHE_TTL = float(os.getenv('CATEGORY_CACHE_TTL', '60'))
+    CATEGORY_CACHE_MAX_ENTRIES = int(os.getenv('CATEGORY_CACHE_MAX_ENTRIES', '64'))
+
+    # Caché del reporte semanal: semana en curso / semana ISO ya terminada (segundos)
+    WEEKLY_REPORT_CACHE_TTL = float(os.getenv('WEEKLY_REPORT_CACHE_TTL', '300'))
+    WEEKLY_REPORT_CLOSED_WEEK_TTL = float(os.getenv('WEEKLY_REPORT_CLOSED_WEEK_TTL', '604800'))
+
+    # Autocompletado de /products/suggest (servido desde la copia en memoria del catálogo)
+    PRODUCT_SUGGEST_ENABLED = os.getenv('PRODUCT_SUGGEST_ENABLED', 'True').lower() == 'true'
+    PRODUCT_SUGGEST_DEFAULT_LIMIT = int(os.getenv('PRODUCT_SUGGEST_DEFAULT_LIMIT', '8'))
+    PRODUCT_SUGGEST_MAX_LIMIT = int(os.getenv('PRODUCT_SUGGEST_MAX_LIMIT', '20'))
+
     GEMINI_API_KEY= os.getenv('GEMINI_API_KEY')
     
     # Configuración de CORS
@@ -35,6 +78,55 @@ class Config:
     DEEPSEEK_MODEL = os.getenv('DEEPSEEK_MODEL', 'deepseek-chat')
     REMOVE_BG_API_KEY = os.getenv('REMOVE_BG_API_KEY')
 
+    # Sesión de rembg (una por worker, cargada al iniciar)
+    REMBG_MODEL = os.getenv('REMBG_MODEL', 'u2net')
+    REMBG_INTRA_OP_THREADS = int(os.getenv('REMBG_INTRA_OP_THREADS', '0'))  # 0 = valor de ONNX Runtime
+    REMBG_INTER_OP_THREADS = int(os.getenv('REMBG_INTER_OP_THREADS', '0'))
+    REMBG_PRELOAD = os.getenv('REMBG_PRELOAD', 'True').lower() == 'true'
+    REMBG_WARMUP = os.getenv('REMBG_WARMUP', 'True').lower() == 'true'
+    REMBG_MAX_CONCURRENT = int(os.getenv('REMBG_MAX_CONCURRENT', '1'))  # inferencias simultáneas por worker
+
+    # Procesamiento de la imagen: tamaño máximo de trabajo, tamaño de inferencia y codificación
+    REMBG_MAX_DIMENSION = int(os.getenv('REMBG_MAX_DIMENSION', '2048'))  # lado mayor, 0 = sin límite
+    REMBG_INFERENCE_SIZE = int(os.getenv('REMBG_INFERENCE_SIZE', '320'))  # entrada del modelo, 0 = imagen completa
+    REMBG_PNG_COMPRESS_LEVEL = int(os.getenv('REMBG_PNG_COMPRESS_LEVEL', '3'))
+    REMBG_WEBP_QUALITY = int(os.getenv('REMBG_WEBP_QUALITY', '90'))
+
+    # Caché en disco de resultados de quitar fondo y códigos QR (clave = hash del contenido)
+    RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'True').lower() == 'true'
+    RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', '')  # vacío = directorio temporal del sistema
+    RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+    RESULT_CACHE_MAX_AGE = int(os.getenv('RESULT_CACHE_MAX_AGE', '86400'))  # Cache-Control max-age
+
+    # Pool de procesos para quitar fondo (0 = en el hilo de la petición)
+    REMBG_POOL_WORKERS = int(os.getenv('REMBG_POOL_WORKERS', '1'))  # procesos por worker de la API
+    REMBG_QUEUE_SIZE = int(os.getenv('REMBG_QUEUE_SIZE', '4'))  # imágenes en espera (en todo el host) antes de responder 429
+    REMBG_POOL_START_METHOD = os.getenv('REMBG_POOL_START_METHOD', 'spawn')
+    # Peticiones mode=sync esperando a la vez en todo el host: cada una bloquea
+    # un worker de la API, así que debe ser menor que la cantidad de workers
+    REMBG_SYNC_SLOTS = int(os.getenv('REMBG_SYNC_SLOTS', '1'))
+    REMBG_JOB_TIMEOUT = float(os.getenv('REMBG_JOB_TIMEOUT', '25'))  # espera máxima en modo síncrono (< timeout de gunicorn)
+    REMBG_JOB_DIR = os.getenv('REMBG_JOB_DIR', '')  # vacío = directorio temporal del sistema
+    REMBG_JOB_TTL = float(os.getenv('REMBG_JOB_TTL', '3600'))  # vida de los resultados asíncronos
+
+    # Códigos QR: opciones por defecto y lotes
+    QR_DEFAULT_BOX_SIZE = int(os.getenv('QR_DEFAULT_BOX_SIZE', '10'))  # píxeles por módulo
+    QR_MAX_BOX_SIZE = int(os.getenv('QR_MAX_BOX_SIZE', '40'))
+    QR_BATCH_MAX_ITEMS = int(os.getenv('QR_BATCH_MAX_ITEMS', '500'))  # códigos por petición de lote
+    QR_SPRITE_MAX_PIXELS = int(os.getenv('QR_SPRITE_MAX_PIXELS', str(64 * 1024 * 1024)))  # tamaño máximo de output=sprite
+    QR_POOL_WORKERS = int(os.getenv('QR_POOL_WORKERS', '2'))  # procesos por worker de la API, 0 = en el hilo de la petición
+    QR_POOL_MIN_BATCH = int(os.getenv('QR_POOL_MIN_BATCH', '16'))  # lotes más chicos se renderizan en el hilo
+    QR_POOL_START_METHOD = os.getenv('QR_POOL_START_METHOD', 'spawn')
+
+    # Logs: nivel, formato ('json' o 'text') y fracción de registros DEBUG que se escriben
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1.0'))
+
+    # Métricas de Prometheus en /metrics (token vacío = sin autenticación)
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
     # Flask Configuration
     HOST = os.getenv('FLASK_HOST', '0.0.0.0')  # Para Docker
     PORT = int(os.getenv('PORT', '5000'))
@@ -43,6 +135,36 @@ class Config:
     DEEPSEEK_TEMPERATURE = float(os.getenv('DEEPSEEK_TEMPERATURE', '0.7'))
     DEEPSEEK_MAX_TOKENS = int(os.getenv('DEEPSEEK_MAX_TOKENS', '200'))
 
+    # Cliente HTTP de DeepSeek: timeouts, reintentos, pool de conexiones y circuito
+    DEEPSEEK_CONNECT_TIMEOUT = float(os.getenv('DEEPSEEK_CONNECT_TIMEOUT', '3.05'))
+    DEEPSEEK_READ_TIMEOUT = float(os.getenv('DEEPSEEK_READ_TIMEOUT', '20'))
+    # Tiempo total de una llamada con sus reintentos; debe quedar por debajo
+    # del timeout del worker de gunicorn (30 s por defecto) para responder 504
+    # antes de que gunicorn mate al worker
+    DEEPSEEK_TOTAL_TIMEOUT = float(os.getenv('DEEPSEEK_TOTAL_TIMEOUT', '25'))  # 0 = sin límite
+    DEEPSEEK_MAX_RETRIES = int(os.getenv('DEEPSEEK_MAX_RETRIES', '2'))
+    DEEPSEEK_BACKOFF_BASE = float(os.getenv('DEEPSEEK_BACKOFF_BASE', '0.5'))  # segundos
+    DEEPSEEK_BACKOFF_MAX = float(os.getenv('DEEPSEEK_BACKOFF_MAX', '8'))
+    DEEPSEEK_POOL_SIZE = int(os.getenv('DEEPSEEK_POOL_SIZE', '10'))  # conexiones keep-alive por worker
+    DEEPSEEK_CIRCUIT_FAILURES = int(os.getenv('DEEPSEEK_CIRCUIT_FAILURES', '5'))  # 0 = sin circuito
+    DEEPSEEK_CIRCUIT_RESET = float(os.getenv('DEEPSEEK_CIRCUIT_RESET', '30'))  # segundos abierto
+
+    # Caché de respuestas de IA por prompt normalizado (memoria + SQLite opcional)
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True').lower() == 'true'
+    LLM_CACHE_TTL = float(os.getenv('LLM_CACHE_TTL', '86400'))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1024'))  # entradas en memoria por worker
+    LLM_CACHE_SQLITE_PATH = os.getenv('LLM_CACHE_SQLITE_PATH', '')  # vacío = solo memoria
+    LLM_CACHE_SQLITE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_SQLITE_MAX_ENTRIES', '50000'))
+
+    # Trabajos en lote de descripciones de productos
+    DESCRIPTION_JOB_CONCURRENCY = int(os.getenv('DESCRIPTION_JOB_CONCURRENCY', '4'))  # llamadas simultáneas por worker
+    DESCRIPTION_JOB_RATE_PER_MINUTE = float(os.getenv('DESCRIPTION_JOB_RATE_PER_MINUTE', '60'))  # en todo el host, 0 = sin límite
+    DESCRIPTION_JOB_MAX_ITEMS = int(os.getenv('DESCRIPTION_JOB_MAX_ITEMS', '500'))
+    DESCRIPTION_JOB_MAX_ACTIVE = int(os.getenv('DESCRIPTION_JOB_MAX_ACTIVE', '2'))  # trabajos en curso en todo el host
+    DESCRIPTION_JOB_WRITE_BATCH = int(os.getenv('DESCRIPTION_JOB_WRITE_BATCH', '25'))  # productos por escritura
+    DESCRIPTION_JOB_DIR = os.getenv('DESCRIPTION_JOB_DIR', '')  # vacío = directorio temporal del sistema
+    DESCRIPTION_JOB_TTL = float(os.getenv('DESCRIPTION_JOB_TTL', '86400'))
+
     #swagger
     SWAGGER_PREFIX = '/api/v1/docs'
     API_URL = '/swagger.json'
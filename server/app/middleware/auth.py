@@ -1,57 +1,115 @@
 from functools import wraps
 from flask import request, jsonify
 import jwt
+import hashlib
+import time
 from datetime import datetime
 import os
 from ..config import Config
 from ..services.user_service import UserService
+from ..utils.cache import TTLCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Tokens ya verificados, indexados por su huella SHA-256; cada entrada expira
+# junto con el token (claim exp)
+_verified_tokens = TTLCache(
+    max_entries=Config.JWT_CACHE_MAX_ENTRIES,
+    ttl=Config.JWT_CACHE_MAX_TTL if Config.JWT_CACHE_ENABLED else 0,
+    name='jwt'
+)
+
+
+def get_token_cache_stats():
+    """Obtener contadores de aciertos y fallos de la caché de tokens verificados"""
+    return _verified_tokens.stats()
+
+
+def _decode_token(token):
+    """
+    Verificar la firma, audiencia y expiración de un JWT de Supabase
+
+    Usa la caché de tokens verificados para no repetir la verificación
+    HS256 cada vez que la misma sesión reutiliza su token.
+
+    Raises:
+        jwt.ExpiredSignatureError: Si el token expiró
+        jwt.InvalidTokenError: Si el token no es válido
+    """
+    digest = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    data = _verified_tokens.get(digest)
+    if data is not None:
+        exp = data.get('exp')
+        if exp and time.time() > exp:
+            _verified_tokens.invalidate(digest)
+            raise jwt.ExpiredSignatureError('Token expirado')
+        # Copia para que ninguna ruta modifique la entrada cacheada
+        return dict(data)
+
+    data = jwt.decode(
+        token,
+        Config.SUPABASE_JWT_SECRET,
+        algorithms=['HS256'],
+        audience="authenticated"
+    )
+
+    # Verificar si el token ha expirado
+    exp = data.get('exp')
+    if exp and datetime.now() > datetime.fromtimestamp(exp):
+        raise jwt.ExpiredSignatureError('Token expirado')
+
+    # Solo se cachean tokens con expiración, y como máximo hasta ella
+    if exp:
+        ttl = min(exp - time.time(), Config.JWT_CACHE_MAX_TTL)
+        _verified_tokens.set(digest, dict(data), ttl=ttl)
+
+    return data
+
+
+def _authenticate():
+    """
+    Extraer y verificar el token del header Authorization
+
+    Returns:
+        Tupla (datos del token, None) o (None, respuesta de error)
+    """
+    token = None
+    # Obtener el token del header Authorization
+    if 'Authorization' in request.headers:
+        auth_header = request.headers['Authorization']
+
+        try:
+            token = auth_header.split(" ")[1]
+        except IndexError:
+            return None, (jsonify({'message': 'Token inválido'}), 401)
+
+    if not token:
+        return None, (jsonify({'message': 'Token no proporcionado'}), 401)
+
+    try:
+        return _decode_token(token), None
+    except jwt.ExpiredSignatureError:
+        return None, (jsonify({'message': 'Token expirado'}), 401)
+    except jwt.InvalidTokenError:
+        return None, (jsonify({'message': 'Token inválido'}), 401)
+    except Exception as e:
+        logger.warning("Error de autenticación: %s", e)
+        return None, (jsonify({'message': f'Error de autenticación: {str(e)}'}), 401)
+
 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        print("token_required")
         if request.method == 'OPTIONS':
             return '', 200  # Permitir preflight sin validar token
 
-        token = None
-        # Obtener el token del header Authorization
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token inválido'}), 401
-
-        if not token:
-            return jsonify({'message': 'Token no proporcionado'}), 401
-
-        try:
-            # Verificar el token con la clave secreta de Supabase
-            data = jwt.decode(
-                token,
-                Config.SUPABASE_JWT_SECRET,
-                algorithms=['HS256'],
-                audience="authenticated"
-            )
-            
-            # Verificar si el token ha expirado
-            exp = data.get('exp')
-            current_time = datetime.now()
-            
-            if exp and current_time > datetime.fromtimestamp(exp):
-                return jsonify({'message': 'Token expirado'}), 401
+        data, error = _authenticate()
+        if error:
+            return error
 
-            # Agregar la información del usuario al request
-            request.user = data
-            
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token expirado'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Token inválido'}), 401
-        except Exception as e:
-            print(f"Error de autenticación: {str(e)}")
-            return jsonify({'message': f'Error de autenticación: {str(e)}'}), 401
+        # Agregar la información del usuario al request
+        request.user = data
 
         return f(*args, **kwargs)
 
@@ -67,61 +125,31 @@ def admin_required(f):
             return '', 200  # Permitir preflight sin validar token
 
         # Primero verificar el token
-        token = None
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(" ")[1]
-            except IndexError:
-                return jsonify({'message': 'Token inválido'}), 401
+        data, error = _authenticate()
+        if error:
+            return error
 
-        if not token:
-            return jsonify({'message': 'Token no proporcionado'}), 401
+        # Verificar rol de administrador
+        user_id = data.get('sub')  # ID del usuario del token
+        if not user_id:
+            return jsonify({'message': 'ID de usuario no encontrado en el token'}), 401
 
         try:
-            # Verificar el token
-            data = jwt.decode(
-                token,
-                Config.SUPABASE_JWT_SECRET,
-                algorithms=['HS256'],
-                audience="authenticated"
-            )
+            user_service = UserService()
+            user = user_service.get_auth_user(user_id)
+            
+            if not user:
+                return jsonify({'message': 'Usuario no encontrado'}), 404
             
-            # Verificar si el token ha expirado
-            exp = data.get('exp')
-            current_time = datetime.now()
+            if user.get('role') != 'admin':
+                return jsonify({'message': 'Acceso denegado. Se requiere rol de administrador'}), 403
             
-            if exp and current_time > datetime.fromtimestamp(exp):
-                return jsonify({'message': 'Token expirado'}), 401
-
-            # Verificar rol de administrador
-            user_id = data.get('sub')  # ID del usuario del token
-            if not user_id:
-                return jsonify({'message': 'ID de usuario no encontrado en el token'}), 401
-
-            try:
-                user_service = UserService()
-                user = user_service.get_user_by_id(user_id)
-                
-                if not user:
-                    return jsonify({'message': 'Usuario no encontrado'}), 404
-                
-                if user.get('role') != 'admin':
-                    return jsonify({'message': 'Acceso denegado. Se requiere rol de administrador'}), 403
-                
-                # Agregar la información del usuario al request
-                request.user = data
-                request.admin_user = user
-                
-            except Exception as e:
-                return jsonify({'message': f'Error al verificar rol de administrador: {str(e)}'}), 500
+            # Agregar la información del usuario al request
+            request.user = data
+            request.admin_user = user
             
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token expirado'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Token inválido'}), 401
         except Exception as e:
-            return jsonify({'message': f'Error de autenticación: {str(e)}'}), 401
+            return jsonify({'message': f'Error al verificar rol de administrador: {str(e)}'}), 500
 
         return f(*args, **kwargs)
 
@@ -1,8 +1,6 @@
-from flask import jsonify, abort, request, send_file, Blueprint
-import requests
-from rembg import remove
-from PIL import Image
+from flask import jsonify, abort, request, send_file, Blueprint, make_response, Response, stream_with_context
 import io
+import json
 from app.config import Config
 from .services.user_service import UserService
 from .services.product_service import ProductService
@@ -10,13 +8,108 @@ from .services.category_service import CategoryService
 from .services.order_service import OrderService
 from .services.product_rating_service import ProductRatingService
 from .services.analytics_service import AnalyticsService
+from .services.background_removal_service import BackgroundRemovalService, get_rembg_status
+from .services.qr_service import QRService
+from .services.ai_tools_service import AIToolsService
+from .services.description_jobs import JobLimitError, get_description_job_manager
+from .services.llm_client import CircuitOpenError, LLMError, LLMTimeoutError, get_llm_client
+from .services.background_removal_jobs import (
+    QueueFullError, get_background_removal_queue, is_background_removal_pool_ready
+)
 from .middleware.auth import token_required, admin_required
-import qrcode
+from .utils.result_cache import DiskResultCache, get_result_cache
+from .utils.prompt_cache import get_prompt_cache
 from datetime import datetime
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import logging
 
+logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('/api/v1', __name__)
 
+
+def _send_cacheable_result(data: bytes, mimetype: str, cache_key: str):
+    """Responder un resultado de la caché de resultados con ETag y Cache-Control"""
+    response = send_file(io.BytesIO(data), mimetype=mimetype)
+    response.set_etag(cache_key)
+    response.headers['Cache-Control'] = f'private, max-age={Config.RESULT_CACHE_MAX_AGE}'
+    return response
+
+
+def _cached_result_response(cache_key: str, mimetype: str):
+    """
+    Responder desde la caché de resultados si es posible
+
+    Returns:
+        304 si el cliente ya tiene la versión (If-None-Match), la respuesta
+        con el resultado cacheado, o None si hay que generarlo
+    """
+    cache = get_result_cache()
+    if request.if_none_match.contains(cache_key) and cache.contains(cache_key):
+        response = make_response('', 304)
+        response.set_etag(cache_key)
+        response.headers['Cache-Control'] = f'private, max-age={Config.RESULT_CACHE_MAX_AGE}'
+        return response
+
+    data = cache.get(cache_key)
+    if data is None:
+        return None
+    return _send_cacheable_result(data, mimetype, cache_key)
+
+def _llm_error_response(error: LLMError):
+    """Respuesta de error de las herramientas de IA según el tipo de falla"""
+    response = jsonify({
+        'error': 'Error al comunicarse con el servicio de Bapesu IA',
+        'details': str(error)
+    })
+    if isinstance(error, CircuitOpenError):
+        response.headers['Retry-After'] = str(int(error.retry_after))
+        return response, 503
+    if isinstance(error, LLMTimeoutError):
+        return response, 504
+    return response, 500
+
+def _request_flag(data, name: str) -> bool:
+    """True si el cliente activó una opción (?name=true o "name": true en el cuerpo)"""
+    if request.args.get(name, '').lower() == 'true':
+        return True
+    return isinstance(data, dict) and data.get(name) is True
+
+
+def _sse_event(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ''
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _stream_llm_response(chunks):
+    """
+    Reenviar los fragmentos del servicio de IA como Server-Sent Events
+
+    Se espera el primer fragmento antes de responder, así los errores de
+    conexión, timeout o circuito abierto devuelven su código HTTP normal.
+    Luego se envía un evento por fragmento ({"delta"}) y al final un evento
+    "done" con el texto completo ({"description", "status"}).
+    """
+    first = next(chunks, None)
+
+    def events():
+        parts = []
+        try:
+            if first is not None:
+                parts.append(first)
+                yield _sse_event({'delta': first})
+            for delta in chunks:
+                parts.append(delta)
+                yield _sse_event({'delta': delta})
+            yield _sse_event({'description': ''.join(parts), 'status': 'success'}, 'done')
+        except LLMError as e:
+            yield _sse_event({'error': 'Error al comunicarse con el servicio de Bapesu IA', 'details': str(e)}, 'error')
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @api_bp.route('/')
 def hello():
     try:
@@ -102,18 +195,146 @@ def remove_background():
     if file.filename == '':
         return 'No selected file', 400
 
-    # Leer la imagen
-    input_image = Image.open(file.stream)
+    # Formato de salida: png (por defecto) o webp
+    output_format = request.args.get('format', request.form.get('format', 'png')).lower()
+    mode = request.args.get('mode', request.form.get('mode', 'sync'))
+    image_bytes = file.read()
+    
+    # Misma imagen y mismos parámetros: se responde sin volver a procesar
+    cache_key = DiskResultCache.make_key('remove-background', image_bytes, {
+        'format': output_format,
+        'model': Config.REMBG_MODEL,
+        'max_dimension': Config.REMBG_MAX_DIMENSION,
+        'inference_size': Config.REMBG_INFERENCE_SIZE
+    })
+    if mode != 'async' and output_format in ('png', 'webp'):
+        cached_response = _cached_result_response(cache_key, f'image/{output_format}')
+        if cached_response is not None:
+            return cached_response
     
-    # Remover el fondo
-    output_image = remove(input_image)
+    try:
+        if Config.REMBG_POOL_WORKERS <= 0:
+            # Remover el fondo con la sesión del worker
+            output_bytes, mimetype = BackgroundRemovalService().remove_background_bytes(image_bytes, output_format)
+            get_result_cache().set(cache_key, output_bytes)
+            return _send_cacheable_result(output_bytes, mimetype, cache_key)
+        
+        # Procesar en el pool de procesos: mode=sync espera el resultado,
+        # mode=async devuelve un job_id para consultar después
+        queue = get_background_removal_queue()
+        
+        if mode == 'async':
+            job = queue.submit_job(image_bytes, output_format)
+            return jsonify({
+                'success': True,
+                'data': job
+            }), 202
+        
+        output_bytes, mimetype = queue.remove_background(image_bytes, output_format)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except QueueFullError as e:
+        response = jsonify({
+            'success': False,
+            'error': str(e)
+        })
+        response.headers['Retry-After'] = '5'
+        return response, 429
+    except FutureTimeoutError:
+        return jsonify({
+            'success': False,
+            'error': 'El procesamiento de la imagen tardó demasiado'
+        }), 504
+    
+    get_result_cache().set(cache_key, output_bytes)
+    return _send_cacheable_result(output_bytes, mimetype, cache_key)
+
+
+@api_bp.route('/tools/remove-background/jobs/<job_id>', methods=['GET', 'OPTIONS'])
+@token_required
+def get_remove_background_job(job_id):
+    """
+    Consultar el estado de un trabajo asíncrono de quitar fondo
+    """
+    if request.method == 'OPTIONS':
+        response = jsonify(message='OPTIONS request received')
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "*")
+        response.headers.add("Access-Control-Allow-Methods", "*")
+        return response, 200
+
+    job = get_background_removal_queue().get_job(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Trabajo no encontrado'
+        }), 404
     
-    # Convertir la imagen procesada a bytes
-    img_io = io.BytesIO()
-    output_image.save(img_io, 'PNG')
-    img_io.seek(0)
+    return jsonify({
+        'success': True,
+        'data': job
+    }), 200
+
+
+@api_bp.route('/tools/remove-background/jobs/<job_id>/result', methods=['GET', 'OPTIONS'])
+@token_required
+def download_remove_background_job(job_id):
+    """
+    Descargar la imagen de un trabajo asíncrono terminado
+    """
+    if request.method == 'OPTIONS':
+        response = jsonify(message='OPTIONS request received')
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "*")
+        response.headers.add("Access-Control-Allow-Methods", "*")
+        return response, 200
+
+    queue = get_background_removal_queue()
+    result = queue.get_job_result_path(job_id)
+    if result is None:
+        job = queue.get_job(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': 'Trabajo no encontrado'
+            }), 404
+        return jsonify({
+            'success': False,
+            'data': job,
+            'error': 'El trabajo todavía no tiene resultado'
+        }), 409
     
-    return send_file(img_io, mimetype='image/png')
+    result_path, mimetype = result
+    return send_file(result_path, mimetype=mimetype)
+
+
+@api_bp.route('/tools/remove-background/status', methods=['GET', 'OPTIONS'])
+def remove_background_status():
+    """
+    Estado del modelo de rembg en este worker (503 hasta que esté listo)
+    """
+    if request.method == 'OPTIONS':
+        response = jsonify(message='OPTIONS request received')
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "*")
+        response.headers.add("Access-Control-Allow-Methods", "*")
+        return response, 200
+
+    status = get_rembg_status()
+    if Config.REMBG_POOL_WORKERS > 0:
+        # El modelo vive en los procesos del pool, no en este worker
+        status['ready'] = is_background_removal_pool_ready()
+        status['pool_workers'] = Config.REMBG_POOL_WORKERS
+        status['queue_size'] = Config.REMBG_QUEUE_SIZE
+        status['queued'] = get_background_removal_queue().queued()
+        status['sync_slots'] = Config.REMBG_SYNC_SLOTS
+    return jsonify({
+        'success': True,
+        'data': status
+    }), 200 if status['ready'] else 503
 
 
 @api_bp.route('/tools/generate-description', methods=['POST','OPTIONS'])
@@ -129,64 +350,23 @@ def generate_description():
 
     try:
         data = request.json
-        # Validar datos requeridos
-        required_fields = ['name', 'category', 'features', 'targetAudience', 'tone']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Campo requerido faltante: {field}'}), 400
-
-        # Construir el prompt para DeepSeek
-        prompt = f"""
-            Redacta una descripción profesional en español (60-100 palabras) para el siguiente producto o servicio:
-
-            - Nombre: {data['name']}
-            - Categoría: {data['category']}
-            - Características: {data['features']}
-            - Público objetivo: {data['targetAudience']}
-            - Tono: {data['tone']}
-
-            Instrucciones:
-            - Sé persuasivo y enfocado en ventas.
-            - Adapta el texto al tono y público especificado.
-            - Destaca las características principales con claridad.
-            - Usa lenguaje profesional, evita repeticiones y frases genéricas.
-            - La descripción debe estar completa y finalizar con un punto.
-            - No incluyas explicaciones ni encabezados, solo la descripción.
-            """
-
-        # Configurar la llamada a la API de DeepSeek
-        headers = {
-            "Authorization": f"Bearer {Config.DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        # regenerate: ignorar la respuesta guardada para el mismo prompt
+        regenerate = _request_flag(data, 'regenerate')
+        if _request_flag(data, 'stream'):
+            return _stream_llm_response(AIToolsService().stream_description(data, regenerate))
 
-        payload = {
-            "model": Config.DEEPSEEK_MODEL,
-            "messages": [
-                {"role": "system", "content": "Eres un experto en marketing y copywriting."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": Config.DEEPSEEK_TEMPERATURE,
-            "max_tokens": Config.DEEPSEEK_MAX_TOKENS
-        }
+        result = AIToolsService().generate_description(data, regenerate)
 
-        # Realizar la llamada a la API
-        response = requests.post(Config.DEEPSEEK_API_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        
-        # Extraer la descripción generada
-        generated_text = response.json()['choices'][0]['message']['content']
-        
         return jsonify({
-            'description': generated_text,
+            'description': result['text'],
+            'cached': result['cached'],
             'status': 'success'
         })
 
-    except requests.exceptions.RequestException as e:
-        return jsonify({
-            'error': 'Error al comunicarse con el servicio de Bapesu IA',
-            'details': str(e)
-        }), 500
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LLMError as e:
+        return _llm_error_response(e)
     except Exception as e:
         return jsonify({
             'error': 'Error al procesar la solicitud',
@@ -203,47 +383,107 @@ def generate_ideas_videos():
        response.headers.add("Access-Control-Allow-Headers", "*")
        response.headers.add("Access-Control-Allow-Methods", "*")
        return response, 200
-    
-    data = request.json
-    # Validar datos api
-    required_fields = ['prompt']
-    
-    for field in required_fields:
-        if field not in data:
-            return jsonify({'error': f'Campo requerido faltante: {field}'}), 400
-        
-    prompt = f"""
-            Eres un filmmaker profesional y eres el mejor creativo del mundo, orientado a emprendedores y creativos, creame un video corto de 1 minuto para la siguiente idea:
-            {data['prompt']}
-        """
-
-    # Configurar la llamada a la API de DeepSeek
-    headers = {
-            "Authorization": f"Bearer {Config.DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        }
 
-    payload = {
-            "model": Config.DEEPSEEK_MODEL,
-            "messages": [
-                {"role": "system", "content": "Eres un experto en marketing y filmmaking."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": Config.DEEPSEEK_TEMPERATURE,
-            "max_tokens": Config.DEEPSEEK_MAX_TOKENS
-        }
+    try:
+        data = request.json
+        # regenerate: ignorar la respuesta guardada para el mismo prompt
+        regenerate = _request_flag(data, 'regenerate')
+        if _request_flag(data, 'stream'):
+            return _stream_llm_response(AIToolsService().stream_video_ideas(data, regenerate))
 
-        # Realizar la llamada a la API
-    response = requests.post(Config.DEEPSEEK_API_URL, headers=headers, json=payload)
-    response.raise_for_status()
-        
-        # Extraer la descripción generada
-    generated_text = response.json()['choices'][0]['message']['content']
-        
-    return jsonify({
-            'description': generated_text,
+        result = AIToolsService().generate_video_ideas(data, regenerate)
+
+        return jsonify({
+            'description': result['text'],
+            'cached': result['cached'],
             'status': 'success'
-    })
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LLMError as e:
+        return _llm_error_response(e)
+    except Exception as e:
+        return jsonify({
+            'error': 'Error al procesar la solicitud',
+            'details': str(e)
+        }), 500
+
+
+@api_bp.route('/tools/generate-description/bulk', methods=['POST', 'OPTIONS'])
+@admin_required
+def generate_descriptions_bulk():
+    """
+    Generar descripciones para muchos productos en segundo plano
+
+    Body:
+        product_ids: IDs de productos existentes, o
+        products: Lista de {name, category, features, targetAudience, tone, id opcional}
+        targetAudience, tone: Valores por defecto para los productos
+        overwrite: Reemplazar descripciones existentes (por defecto false)
+        save: Guardar las descripciones en los productos (por defecto true)
+        regenerate: Ignorar la caché de respuestas
+    """
+    if request.method == 'OPTIONS':
+        response = jsonify(message='OPTIONS request received')
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "*")
+        response.headers.add("Access-Control-Allow-Methods", "*")
+        return response, 200
+
+    try:
+        data = request.get_json() or {}
+        options = {key: data.get(key) for key in ('targetAudience', 'tone', 'overwrite', 'save', 'regenerate')}
+        job = get_description_job_manager().submit(data.get('product_ids'), data.get('products'), options)
+        return jsonify({'success': True, 'data': job}), 202
+
+    except JobLimitError as e:
+        response = jsonify({'success': False, 'error': str(e)})
+        response.headers['Retry-After'] = '60'
+        return response, 429
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/tools/generate-description/jobs/<job_id>', methods=['GET', 'OPTIONS'])
+@admin_required
+def get_description_job(job_id):
+    """
+    Progreso de un trabajo de descripciones (?results=false para omitir los resultados)
+    """
+    if request.method == 'OPTIONS':
+        response = jsonify(message='OPTIONS request received')
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "*")
+        response.headers.add("Access-Control-Allow-Methods", "*")
+        return response, 200
+
+    include_results = request.args.get('results', 'true').lower() != 'false'
+    job = get_description_job_manager().get_job(job_id, include_results)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Trabajo no encontrado o expirado'}), 404
+
+    return jsonify({'success': True, 'data': job}), 200
+
+
+@api_bp.route('/tools/ai/stats', methods=['GET', 'OPTIONS'])
+@admin_required
+def get_ai_tools_stats():
+    """
+    Latencia, reintentos, tokens, estado del circuito y caché de respuestas del cliente de IA (worker actual)
+    """
+    if request.method == 'OPTIONS':
+        response = jsonify(message='OPTIONS request received')
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "*")
+        response.headers.add("Access-Control-Allow-Methods", "*")
+        return response, 200
+
+    return jsonify({
+        'success': True,
+        'data': {**get_llm_client().stats(), 'cache': get_prompt_cache().stats()}
+    }), 200
 
 
 @api_bp.route('/tools/qr_generator', methods=['POST', 'OPTIONS'])
@@ -263,24 +503,92 @@ def qr_generator():
         if 'content' not in data or not data['content'].strip():
             return jsonify({'error': 'No se proporcionó el contenido para el código QR'}), 400
 
-        import qrcode
-        import io
-        from flask import send_file
-
-        qr = qrcode.make(data['content'])
+        qr_service = QRService()
+        options = qr_service.parse_options(data)
 
-        img_io = io.BytesIO()
-        qr.save(img_io, 'PNG')
-        img_io.seek(0)
+        # Mismo contenido y opciones: se responde sin volver a generar el QR
+        cache_key = qr_service.cache_key(data['content'], options)
+        cached_response = _cached_result_response(cache_key, 'image/png')
+        if cached_response is not None:
+            return cached_response
 
-        return send_file(img_io, mimetype='image/png')
+        png = qr_service.render_png(data['content'], options)
+        return _send_cacheable_result(png, 'image/png', cache_key)
 
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({
             'error': 'Error al generar el código QR',
             'details': str(e)
         }), 500
 
+@api_bp.route('/tools/qr_generator/batch', methods=['POST', 'OPTIONS'])
+@token_required
+def qr_generator_batch():
+    """
+    Generar varios códigos QR en una sola petición
+
+    Body:
+        items: Lista de textos o de {'content': str, 'name': str}
+        output: 'zip' (un PNG por código, por defecto), 'sprite' (una
+            imagen PNG en cuadrícula) o 'svg' (documento vectorial)
+        box_size, border, error_correction (L, M, Q, H): opcionales
+    """
+    if request.method == 'OPTIONS':
+        response = jsonify(message='OPTIONS request received')
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "*")
+        response.headers.add("Access-Control-Allow-Methods", "*")
+        return response, 200
+
+    try:
+        data = request.get_json() or {}
+        raw_items = data.get('items')
+        if not isinstance(raw_items, list) or not raw_items:
+            return jsonify({'error': 'Se requiere una lista de contenidos en items'}), 400
+
+        items = []
+        for raw_item in raw_items:
+            item = raw_item if isinstance(raw_item, dict) else {'content': raw_item}
+            if not isinstance(item.get('content'), str) or not item['content'].strip():
+                return jsonify({'error': 'Todos los elementos deben tener contenido'}), 400
+            items.append(item)
+
+        qr_service = QRService()
+        options = qr_service.parse_options(data)
+        output = str(data.get('output', 'zip')).lower()
+
+        output_bytes, mimetype, filename = qr_service.render_batch(items, output, options)
+        return send_file(io.BytesIO(output_bytes), mimetype=mimetype,
+                         as_attachment=True, download_name=filename)
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            'error': 'Error al generar los códigos QR',
+            'details': str(e)
+        }), 500
+
+@api_bp.route('/tools/cache/stats', methods=['GET', 'OPTIONS'])
+@admin_required
+def get_tools_cache_stats():
+    """
+    Aciertos, fallos y bytes ahorrados de la caché de resultados de las herramientas (worker actual)
+    """
+    if request.method == 'OPTIONS':
+        response = jsonify(message='OPTIONS request received')
+        response.headers.add("Access-Control-Allow-Origin", "*")
+        response.headers.add("Access-Control-Allow-Headers", "*")
+        response.headers.add("Access-Control-Allow-Methods", "*")
+        return response, 200
+
+    return jsonify({
+        'success': True,
+        'data': get_result_cache().stats()
+    }), 200
+
 # ============================================================================
 # RUTAS CRUD PARA USUARIOS (Solo administradores)
 # ============================================================================
@@ -297,6 +605,8 @@ def get_users():
     - status: Filtro por estado (all, Activo, Inactivo)
     - role: Filtro por rol (all, customer, admin, vendor)
     - search: Término de búsqueda
+    - cursor: Activa la paginación por cursor (vacío para la primera página,
+      luego el next_cursor recibido); ignora page
     """
     try:
         # Obtener parámetros de query
@@ -322,8 +632,23 @@ def get_users():
         if search:
             filters['search'] = search
         
-        # Obtener usuarios
         user_service = UserService()
+        
+        # Paginación por cursor (opcional)
+        if 'cursor' in request.args:
+            result = user_service.get_users_after(request.args.get('cursor'), per_page=per_page, filters=filters)
+            
+            return jsonify({
+                'success': True,
+                'data': result['users'],
+                'pagination': {
+                    'per_page': result['per_page'],
+                    'next_cursor': result['next_cursor'],
+                    'has_more': result['has_more']
+                }
+            }), 200
+        
+        # Obtener usuarios
         result = user_service.get_users(page=page, per_page=per_page, filters=filters)
         
         return jsonify({
@@ -337,6 +662,11 @@ def get_users():
             }
         }), 200
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -647,14 +977,31 @@ def get_products():
         if request.args.get('in_stock') is not None:
             filters['in_stock'] = request.args.get('in_stock').lower() == 'true'
         
+        # Paginación por cursor (opcional, sin total)
+        if 'cursor' in request.args:
+            result = product_service.get_products_after(request.args.get('cursor'), per_page=per_page, filters=filters)
+            
+            return jsonify({
+                'success': True,
+                'data': result
+            }), 200
+        
+        # Tipo de conteo del total (exact, planned, estimated)
+        count_mode = request.args.get('count')
+        
         # Obtener productos
-        result = product_service.get_products(page=page, per_page=per_page, filters=filters)
+        result = product_service.get_products(page=page, per_page=per_page, filters=filters, count_mode=count_mode)
         
         return jsonify({
             'success': True,
             'data': result
         }), 200
         
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -756,10 +1103,6 @@ def update_product(product_id):
             response.headers.add("Access-Control-Allow-Methods", "*")
             return response, 200
         
-        print(f"=== DEBUG: Endpoint update_product llamado ===")
-        print(f"Product ID: {product_id}")
-        print(f"Request data: {request.get_json()}")
-        
         product_service = ProductService()
         
         # Obtener datos del request
@@ -781,13 +1124,13 @@ def update_product(product_id):
         }), 200
         
     except ValueError as e:
-        print(f"=== ERROR: ValueError en update_product: {str(e)} ===")
+        logger.info("update_product %s rechazado: %s", product_id, e)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 400
     except Exception as e:
-        print(f"=== ERROR: Exception en update_product: {str(e)} ===")
+        logger.error("Error en update_product %s: %s", product_id, e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -991,6 +1334,7 @@ def search_products():
         
         search_term = request.args.get('q', '')
         limit = int(request.args.get('limit', 10))
+        offset = int(request.args.get('offset', 0))
         
         if not search_term:
             return jsonify({
@@ -998,7 +1342,7 @@ def search_products():
                 'error': 'Término de búsqueda requerido'
             }), 400
         
-        products = product_service.search_products(search_term, limit)
+        products = product_service.search_products(search_term, limit, offset)
         
         return jsonify({
             'success': True,
@@ -1012,6 +1356,44 @@ def search_products():
         }), 500
 
 
+@api_bp.route('/products/suggest', methods=['GET', 'OPTIONS'])
+def suggest_products():
+    """
+    Sugerencias de autocompletado para el buscador (productos y categorías)
+    """
+    try:
+        if request.method == 'OPTIONS':
+            response = jsonify(message='OPTIONS request received')
+            response.headers.add("Access-Control-Allow-Origin", "*")
+            response.headers.add("Access-Control-Allow-Headers", "*")
+            response.headers.add("Access-Control-Allow-Methods", "*")
+            return response, 200
+        
+        product_service = ProductService()
+        
+        prefix = request.args.get('q', '')
+        limit = request.args.get('limit', type=int)
+        
+        if not prefix.strip():
+            return jsonify({
+                'success': True,
+                'data': {'products': [], 'categories': []}
+            }), 200
+        
+        suggestions = product_service.suggest_products(prefix, limit)
+        
+        return jsonify({
+            'success': True,
+            'data': suggestions
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 # ============================================================================
 # RUTAS PARA CATEGORÍAS
 # ============================================================================
@@ -1207,8 +1589,6 @@ def orders_endpoint():
             # Crear una nueva orden
             data = request.get_json()
             
-            print(f"Received order data: {data}")
-            
             if not data:
                 return jsonify({'success': False, 'error': 'Datos requeridos'}), 400
             
@@ -1232,13 +1612,10 @@ def orders_endpoint():
             user_id = request.user.get('sub')
             data['user_id'] = user_id
             
-            print(f"Creating order with user_id: {user_id}")
-            print(f"request.user: {request.user}")
-            print(f"Final order data: {data}")
-            
             result = order_service.create_order(data)
             
-            print(f"Order creation result: {result}")
+            if not result['success']:
+                logger.warning("No se pudo crear la orden del usuario %s: %s", user_id, result.get('error'))
             
             if result['success']:
                 return jsonify(result), 201
@@ -1249,11 +1626,12 @@ def orders_endpoint():
             # Obtener las órdenes del usuario autenticado
             user_id = request.user.get('sub')
             
-            # Parámetros de paginación
+            # Parámetros de paginación (cursor opcional en lugar de offset)
             limit = request.args.get('limit', 50, type=int)
             offset = request.args.get('offset', 0, type=int)
+            cursor = request.args.get('cursor')
             
-            result = order_service.get_user_orders(user_id, limit, offset)
+            result = order_service.get_user_orders(user_id, limit, offset, cursor=cursor)
             
             if result['success']:
                 return jsonify(result), 200
@@ -1306,6 +1684,7 @@ def get_user_orders():
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 10, type=int)
         status = request.args.get('status', None)
+        cursor = request.args.get('cursor')
         
         # Calcular offset
         offset = (page - 1) * limit
@@ -1314,7 +1693,7 @@ def get_user_orders():
         user_id = request.user.get('sub')
         
         # Obtener órdenes del usuario
-        result = order_service.get_user_orders(user_id, limit=limit, offset=offset)
+        result = order_service.get_user_orders(user_id, limit=limit, offset=offset, cursor=cursor)
      
         
         if result['success']:
@@ -1331,7 +1710,8 @@ def get_user_orders():
                     'page': page,
                     'limit': limit,
                     'total': len(orders),
-                    'has_more': len(orders) == limit
+                    'has_more': result['has_more'] if cursor is not None else len(orders) == limit,
+                    'next_cursor': result.get('next_cursor')
                 },
                 'message': 'Órdenes obtenidas exitosamente'
             }
@@ -1363,8 +1743,9 @@ def get_all_orders():
         limit = request.args.get('limit', 50, type=int)
         offset = request.args.get('offset', 0, type=int)
         status = request.args.get('status')
+        cursor = request.args.get('cursor')
         
-        result = order_service.get_all_orders(limit, offset, status)
+        result = order_service.get_all_orders(limit, offset, status, cursor=cursor)
         
         if result['success']:
             return jsonify(result), 200
@@ -1499,7 +1880,6 @@ def test_user_orders():
             return response, 200
         
         user_id = request.user.get('sub')
-        print(f"Usuario autenticado: {user_id}")
         
         order_service = OrderService()
         result = order_service.get_user_orders(user_id, limit=5, offset=0)
@@ -1596,7 +1976,6 @@ def create_product_rating():
             return response, 200
         
         data = request.get_json()
-        print(f"DEBUG: Received data: {data}")  # Debug log
         
         if not data:
             return jsonify({'success': False, 'error': 'Datos requeridos'}), 400
@@ -1606,7 +1985,6 @@ def create_product_rating():
         missing_fields = [field for field in required_fields if field not in data or data[field] is None]
         
         if missing_fields:
-            print(f"DEBUG: Missing fields: {missing_fields}")  # Debug log
             return jsonify({
                 'success': False, 
                 'error': f'Campos requeridos faltantes: {", ".join(missing_fields)}'
@@ -1614,17 +1992,12 @@ def create_product_rating():
         
         # Validar que la calificación esté entre 1 y 5
         if not (1 <= data['rating'] <= 5):
-            print(f"DEBUG: Invalid rating: {data['rating']}")  # Debug log
             return jsonify({
                 'success': False, 
                 'error': 'La calificación debe estar entre 1 y 5'
             }), 400
         
         user_id = request.user.get('sub')
-        print(f"DEBUG: User ID: {user_id}")  # Debug log
-        print(f"DEBUG: Product ID: {data['product_id']}")  # Debug log
-        print(f"DEBUG: Order ID: {data['order_id']}")  # Debug log
-        print(f"DEBUG: Rating: {data['rating']}")  # Debug log
         
         rating_service = ProductRatingService()
         
@@ -1634,14 +2007,14 @@ def create_product_rating():
             product_id=data['product_id'],
             order_id=data['order_id']
         )
-        print(f"DEBUG: Can user rate: {can_rate}")  # Debug log
         
         if not can_rate:
             return jsonify({
                 'success': False,
                 'error': 'No puedes calificar este producto. Verifica que el pedido esté entregado y que hayas comprado este producto.'
             }), 400
-        print(f"DEBUG: Creating rating , user_id: {user_id}, product_id: {data['product_id']}, order_id: {data['order_id']}, rating: {data['rating']}, comment: {data.get('comment')}")
+        logger.debug("Creando calificación: usuario %s, producto %s, orden %s, rating %s",
+                     user_id, data['product_id'], data['order_id'], data['rating'])
         result = rating_service.create_rating(
             user_id=user_id,
             product_id=data['product_id'],
@@ -1650,15 +2023,13 @@ def create_product_rating():
             comment=data.get('comment')
         )
         
-        print(f"DEBUG: Service result: {result}")  # Debug log
-        
         if result and result.get('success'):
             return jsonify(result), 201
         else:
             return jsonify(result), 400
             
     except Exception as e:
-        print(f"DEBUG: Exception occurred: {str(e)}")  # Debug log
+        logger.error("Error al crear la calificación: %s", e)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -1677,9 +2048,10 @@ def get_product_ratings(product_id):
         
         page = int(request.args.get('page', 1))
         per_page = int(request.args.get('per_page', 10))
+        cursor = request.args.get('cursor')
         
         rating_service = ProductRatingService()
-        result = rating_service.get_product_ratings(product_id, page, per_page)
+        result = rating_service.get_product_ratings(product_id, page, per_page, cursor=cursor)
         
         if result['success']:
             return jsonify(result), 200
@@ -1734,14 +2106,11 @@ def can_user_rate_product(product_id):
             return jsonify({'success': False, 'error': 'order_id es requerido'}), 400
         
         user_id = request.user.get('sub')
-        print(f"DEBUG: Checking if user {user_id} can rate product {product_id} for order {order_id}")
         
         rating_service = ProductRatingService()
         
         can_rate = rating_service.can_user_rate_product(user_id, product_id, order_id)
         
-        print(f"DEBUG: Can rate result: {can_rate}")
-        
         return jsonify({
             'success': True,
             'data': {
@@ -2317,9 +2686,14 @@ def get_weekly_report():
     try:
         analytics_service = AnalyticsService()
         
-        report = analytics_service.generate_weekly_report()
+        report = analytics_service.generate_weekly_report(request.args.get('week'))
         
         return jsonify(report), 200 if report['success'] else 500
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
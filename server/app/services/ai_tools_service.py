@@ -0,0 +1,169 @@
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.config import Config
+from app.utils.prompt_cache import get_prompt_cache
+from .llm_client import get_llm_client
+
+logger = logging.getLogger(__name__)
+
+DESCRIPTION_FIELDS = ['name', 'category', 'features', 'targetAudience', 'tone']
+
+
+def description_messages(data: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Mensajes para generar la descripción de un producto o servicio"""
+    prompt = f"""
+            Redacta una descripción profesional en español (60-100 palabras) para el siguiente producto o servicio:
+
+            - Nombre: {data['name']}
+            - Categoría: {data['category']}
+            - Características: {data['features']}
+            - Público objetivo: {data['targetAudience']}
+            - Tono: {data['tone']}
+
+            Instrucciones:
+            - Sé persuasivo y enfocado en ventas.
+            - Adapta el texto al tono y público especificado.
+            - Destaca las características principales con claridad.
+            - Usa lenguaje profesional, evita repeticiones y frases genéricas.
+            - La descripción debe estar completa y finalizar con un punto.
+            - No incluyas explicaciones ni encabezados, solo la descripción.
+            """
+    return [
+        {"role": "system", "content": "Eres un experto en marketing y copywriting."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def video_ideas_messages(data: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Mensajes para generar la idea de un video corto"""
+    prompt = f"""
+            Eres un filmmaker profesional y eres el mejor creativo del mundo, orientado a emprendedores y creativos, creame un video corto de 1 minuto para la siguiente idea:
+            {data['prompt']}
+        """
+    return [
+        {"role": "system", "content": "Eres un experto en marketing y filmmaking."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+class AIToolsService:
+    """Herramientas de generación de texto con Bapesu IA (DeepSeek)"""
+
+    def __init__(self):
+        self.client = get_llm_client()
+        self.cache = get_prompt_cache()
+
+    def validate(self, data: Dict[str, Any], required_fields: List[str]) -> None:
+        """
+        Verificar los campos requeridos
+
+        Raises:
+            ValueError: Si falta algún campo
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Se requiere un cuerpo JSON")
+        for field in required_fields:
+            if field not in data:
+                raise ValueError(f"Campo requerido faltante: {field}")
+
+    def _cache_key(self, namespace: str, messages: List[Dict[str, str]]) -> str:
+        return self.cache.make_key(namespace, messages, {
+            'model': self.client.model,
+            'temperature': Config.DEEPSEEK_TEMPERATURE,
+            'max_tokens': Config.DEEPSEEK_MAX_TOKENS
+        })
+
+    def _generate(self, namespace: str, messages: List[Dict[str, str]], regenerate: bool) -> Dict[str, Any]:
+        """
+        Responder desde la caché o llamar al servicio y guardar la respuesta
+
+        Con regenerate se ignora la respuesta guardada y la nueva la reemplaza.
+        """
+        key = self._cache_key(namespace, messages)
+        if not regenerate:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return {'text': cached, 'cached': True}
+
+        text = self.client.chat(messages)['content']
+        self.cache.set(key, text)
+        return {'text': text, 'cached': False}
+
+    def _stream(self, namespace: str, messages: List[Dict[str, str]], regenerate: bool) -> Iterator[str]:
+        """Versión en streaming de _generate: un acierto se envía como un solo fragmento"""
+        key = self._cache_key(namespace, messages)
+        if not regenerate:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return iter([cached])
+
+        return self._stream_and_store(key, self.client.stream_chat(messages))
+
+    def _stream_and_store(self, key: str, chunks: Iterator[str]) -> Iterator[str]:
+        parts = []
+        for delta in chunks:
+            parts.append(delta)
+            yield delta
+        # Solo se guarda la respuesta completa (si el cliente cortó, no se llega aquí)
+        self.cache.set(key, ''.join(parts))
+
+    def generate_description(self, data: Dict[str, Any], regenerate: bool = False) -> Dict[str, Any]:
+        """
+        Generar la descripción de un producto
+
+        Args:
+            data: name, category, features, targetAudience y tone
+            regenerate: Ignorar la respuesta guardada en la caché
+
+        Returns:
+            Dict con text y cached
+
+        Raises:
+            ValueError: Si falta algún campo
+            LLMError: Si falla la llamada al servicio
+        """
+        self.validate(data, DESCRIPTION_FIELDS)
+        return self._generate('description', description_messages(data), regenerate)
+
+    def get_cached_description(self, data: Dict[str, Any]) -> Optional[str]:
+        """Descripción guardada en la caché para estos datos (None si no está)"""
+        self.validate(data, DESCRIPTION_FIELDS)
+        return self.cache.get(self._cache_key('description', description_messages(data)))
+
+    def generate_video_ideas(self, data: Dict[str, Any], regenerate: bool = False) -> Dict[str, Any]:
+        """
+        Generar la idea de un video corto
+
+        Args:
+            data: prompt con la idea
+            regenerate: Ignorar la respuesta guardada en la caché
+
+        Raises:
+            ValueError: Si falta el prompt
+            LLMError: Si falla la llamada al servicio
+        """
+        self.validate(data, ['prompt'])
+        return self._generate('video-ideas', video_ideas_messages(data), regenerate)
+
+    def stream_description(self, data: Dict[str, Any], regenerate: bool = False) -> Iterator[str]:
+        """
+        Generar la descripción de un producto en streaming
+
+        Los campos se validan al llamar; el texto llega al iterar.
+
+        Raises:
+            ValueError: Si falta algún campo
+        """
+        self.validate(data, DESCRIPTION_FIELDS)
+        return self._stream('description', description_messages(data), regenerate)
+
+    def stream_video_ideas(self, data: Dict[str, Any], regenerate: bool = False) -> Iterator[str]:
+        """
+        Generar la idea de un video corto en streaming
+
+        Raises:
+            ValueError: Si falta el prompt
+        """
+        self.validate(data, ['prompt'])
+        return self._stream('video-ideas', video_ideas_messages(data), regenerate)
@@ -1,22 +1,23 @@
-import os
-from supabase import create_client, Client
+from supabase import Client
 from typing import Dict, List, Optional, Any
 import logging
+from app.config import Config
+from app.utils.cache import TTLCache
+from app.utils.concurrency import run_concurrently
+from .supabase_client import get_supabase_client
 from datetime import datetime, date, timedelta
 import json
 
 logger = logging.getLogger(__name__)
 
+# Reportes semanales ya generados (por worker). Una semana ISO terminada
+# no cambia, así que se guarda con WEEKLY_REPORT_CLOSED_WEEK_TTL.
+_weekly_report_cache = TTLCache(max_entries=64, ttl=Config.WEEKLY_REPORT_CACHE_TTL, name='weekly_report')
+
 class AnalyticsService:
     def __init__(self):
         """Inicializar el cliente de Supabase"""
-        supabase_url = os.getenv('SUPABASE_URL')
-        supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
-        
-        if not supabase_url or not supabase_key:
-            raise ValueError("SUPABASE_URL y SUPABASE_SERVICE_KEY deben estar configurados")
-        
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+        self.supabase: Client = get_supabase_client()
     
     def log_system_activity(self, activity_type: str, entity_id: str = None, 
                            entity_name: str = None, user_id: str = None, 
@@ -306,27 +307,58 @@ class AnalyticsService:
             logger.error(f"Error getting sales metrics: {str(e)}")
             return []
     
-    def generate_weekly_report(self) -> Dict[str, Any]:
+    def generate_weekly_report(self, week: str = None) -> Dict[str, Any]:
         """
         Generar reporte semanal de métricas
         
+        Args:
+            week: Semana ISO ('2024-W05'). Si no se indica, los últimos 7 días.
+        
         Returns:
             Dict con el reporte semanal
+        
+        Raises:
+            ValueError: Si week no tiene el formato AAAA-Wss
         """
-        try:
-            end_date = date.today()
+        today = date.today()
+        if week:
+            try:
+                year, week_number = week.upper().split('-W')
+                start_date = date.fromisocalendar(int(year), int(week_number), 1)
+            except ValueError:
+                raise ValueError("Semana inválida, usar el formato AAAA-Wss (por ejemplo 2024-W05)")
+            end_date = start_date + timedelta(days=6)
+            # Límite exclusivo: incluye todo el domingo
+            until = (end_date + timedelta(days=1)).isoformat()
+            closed = end_date < today
+        else:
+            end_date = today
             start_date = end_date - timedelta(days=7)
-            
-            # Obtener métricas de la semana
-            dashboard_result = self.supabase.table('dashboard_metrics').select('*').gte('date', start_date.isoformat()).lte('date', end_date.isoformat()).execute()
-            
-            # Obtener actividad de la semana
-            activity_result = self.supabase.table('system_activity').select('*').gte('created_at', start_date.isoformat()).lte('created_at', end_date.isoformat()).execute()
-            
-            # Obtener alertas de la semana
-            alerts_result = self.supabase.table('system_alerts').select('*').gte('created_at', start_date.isoformat()).lte('created_at', end_date.isoformat()).execute()
-            
-            return {
+            until = None
+            closed = False
+        
+        cache_key = (start_date.isoformat(), end_date.isoformat(), week is None)
+        cached = _weekly_report_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        try:
+            def in_period(query, column):
+                query = query.gte(column, start_date.isoformat())
+                return query.lt(column, until) if until else query.lte(column, end_date.isoformat())
+            
+            def count(query):
+                return lambda: query.execute().count or 0
+            
+            # Solo conteos en la base de datos, en paralelo
+            dashboard_result, activity_count, alerts_count, resolved_alerts = run_concurrently(
+                in_period(self.supabase.table('dashboard_metrics').select('*'), 'date').execute,
+                count(in_period(self.supabase.table('system_activity').select('id', count='exact', head=True), 'created_at')),
+                count(in_period(self.supabase.table('system_alerts').select('id', count='exact', head=True), 'created_at')),
+                count(in_period(self.supabase.table('system_alerts').select('id', count='exact', head=True), 'created_at').eq('is_resolved', True))
+            )
+            
+            report = {
                 'success': True,
                 'data': {
                     'period': {
@@ -334,11 +366,15 @@ class AnalyticsService:
                         'end': end_date.isoformat()
                     },
                     'dashboard_metrics': dashboard_result.data if dashboard_result.data else [],
-                    'activity_count': len(activity_result.data) if activity_result.data else 0,
-                    'alerts_count': len(alerts_result.data) if alerts_result.data else 0,
-                    'resolved_alerts': len([a for a in alerts_result.data if a.get('is_resolved')]) if alerts_result.data else 0
+                    'activity_count': activity_count,
+                    'alerts_count': alerts_count,
+                    'resolved_alerts': resolved_alerts
                 }
             }
+            
+            ttl = Config.WEEKLY_REPORT_CLOSED_WEEK_TTL if closed else None
+            _weekly_report_cache.set(cache_key, report, ttl=ttl)
+            return report
         except Exception as e:
             logger.error(f"Error generating weekly report: {str(e)}")
             return {
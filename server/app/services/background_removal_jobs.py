@@ -0,0 +1,259 @@
+import os
+import re
+import time
+import uuid
+import tempfile
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import Config
+from app.utils.file_slots import FileSlots
+from .background_removal_service import OUTPUT_FORMATS
+
+logger = logging.getLogger(__name__)
+
+_JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class QueueFullError(Exception):
+    """La cola de procesamiento de imágenes está llena"""
+
+
+def _init_pool_process() -> None:
+    """Cargar y precalentar el modelo de rembg en cada proceso del pool"""
+    from .background_removal_service import warm_up_rembg_session
+    warm_up_rembg_session()
+
+
+def _process_image(image_bytes: bytes, output_format: str = 'png',
+                   result_path: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+    """
+    Quitar el fondo dentro de un proceso del pool
+
+    Args:
+        image_bytes: Imagen subida
+        output_format: 'png' o 'webp'
+        result_path: Si se indica, el resultado se escribe ahí (modo asíncrono)
+
+    Returns:
+        Tupla (bytes, mimetype), o None si se escribió en result_path
+    """
+    from .background_removal_service import BackgroundRemovalService
+
+    output_bytes, mimetype = BackgroundRemovalService().remove_background_bytes(image_bytes, output_format)
+
+    if result_path is None:
+        return output_bytes, mimetype
+
+    # Escritura atómica: los demás workers solo ven el archivo completo
+    tmp_path = f"{result_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(output_bytes)
+    os.replace(tmp_path, result_path)
+    return None
+
+
+class BackgroundRemovalQueue:
+    """
+    Pool de procesos para quitar fondos con una cola acotada
+
+    Cada worker de la API tiene su propio pool con REMBG_POOL_WORKERS
+    procesos, pero la admisión es global: entre todos los workers del host
+    hay como máximo REMBG_POOL_WORKERS + REMBG_QUEUE_SIZE imágenes en
+    proceso o esperando (plazas con flock en REMBG_JOB_DIR). Si no queda
+    plaza se rechaza la petición (429) en lugar de acumularla, también con
+    workers síncronos de gunicorn, donde cada worker atiende una petición a
+    la vez y un límite por proceso nunca se alcanzaría.
+    El modo síncrono además bloquea al worker de la API mientras espera, así
+    que solo REMBG_SYNC_SLOTS peticiones síncronas pueden esperar a la vez en
+    el host (menos que los workers de la API): las demás reciben 429 y
+    siempre quedan workers libres para el resto de las rutas.
+    Los trabajos asíncronos se guardan en REMBG_JOB_DIR para que cualquier
+    worker pueda responder la consulta de estado y la descarga.
+    """
+
+    def __init__(self):
+        self.workers = max(Config.REMBG_POOL_WORKERS, 1)
+        self.capacity = self.workers + max(Config.REMBG_QUEUE_SIZE, 0)
+        self.job_dir = Config.REMBG_JOB_DIR or os.path.join(tempfile.gettempdir(), 'bapesu-rembg-jobs')
+        os.makedirs(self.job_dir, exist_ok=True)
+        self._slots = FileSlots(os.path.join(self.job_dir, 'slots'), 'rembg', self.capacity)
+        self._sync_slots = FileSlots(os.path.join(self.job_dir, 'slots'), 'rembg-sync', Config.REMBG_SYNC_SLOTS)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(Config.REMBG_POOL_START_METHOD),
+            initializer=_init_pool_process
+        )
+        self.ready = False
+
+    def start(self) -> None:
+        """Arrancar los procesos del pool (cargan el modelo al iniciar)"""
+        self._executor.submit(int).result()
+        self.ready = True
+
+    def _submit(self, image_bytes: bytes, output_format: str, result_path: Optional[str] = None) -> Future:
+        slot = self._slots.try_acquire()
+        if slot is None:
+            raise QueueFullError("La cola de procesamiento de imágenes está llena, intenta de nuevo en unos segundos")
+
+        try:
+            future = self._executor.submit(_process_image, image_bytes, output_format, result_path)
+        except Exception:
+            self._slots.release(slot)
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release(slot))
+        return future
+
+    def queued(self) -> int:
+        """Imágenes en proceso o esperando en todo el host"""
+        return self._slots.in_use()
+
+    def remove_background(self, image_bytes: bytes, output_format: str = 'png') -> Tuple[bytes, str]:
+        """
+        Quitar el fondo y esperar el resultado
+
+        Returns:
+            Tupla (bytes, mimetype)
+
+        Raises:
+            QueueFullError: Si no hay lugar en la cola o ya hay
+                REMBG_SYNC_SLOTS peticiones síncronas esperando
+            concurrent.futures.TimeoutError: Si supera REMBG_JOB_TIMEOUT
+        """
+        sync_slot = self._sync_slots.try_acquire()
+        if sync_slot is None:
+            raise QueueFullError("Hay demasiadas imágenes procesándose en modo síncrono, "
+                                 "usa mode=async o intenta de nuevo en unos segundos")
+        try:
+            return self._submit(image_bytes, output_format).result(timeout=Config.REMBG_JOB_TIMEOUT)
+        finally:
+            self._sync_slots.release(sync_slot)
+
+    def submit_job(self, image_bytes: bytes, output_format: str = 'png') -> Dict[str, Any]:
+        """
+        Encolar un trabajo asíncrono
+
+        Returns:
+            Dict con job_id y status 'pending'
+
+        Raises:
+            QueueFullError: Si no hay lugar en la cola
+            ValueError: Si el formato de salida no está admitido
+        """
+        output_format = (output_format or 'png').lower()
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Formato de salida no admitido: {output_format} (usar png o webp)")
+
+        self._cleanup_expired_jobs()
+
+        job_id = uuid.uuid4().hex
+        pending_path = self._job_path(job_id, 'pending')
+        open(pending_path, 'w').close()
+
+        try:
+            future = self._submit(image_bytes, output_format, self._job_path(job_id, output_format))
+        except Exception:
+            os.remove(pending_path)
+            raise
+
+        future.add_done_callback(lambda done: self._finish_job(job_id, done))
+        return {'job_id': job_id, 'status': 'pending'}
+
+    def _finish_job(self, job_id: str, future: Future) -> None:
+        error = future.exception()
+        if error is not None:
+            logger.error(f"Error en el trabajo de quitar fondo {job_id}: {str(error)}")
+            with open(self._job_path(job_id, 'error'), 'w') as f:
+                f.write(str(error))
+        try:
+            os.remove(self._job_path(job_id, 'pending'))
+        except OSError:
+            pass
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Consultar el estado de un trabajo
+
+        Returns:
+            Dict con job_id, status ('pending', 'done', 'failed') y error,
+            o None si no existe o ya expiró
+        """
+        if not _JOB_ID_PATTERN.match(job_id or ''):
+            return None
+
+        if self.get_job_result_path(job_id) is not None:
+            return {'job_id': job_id, 'status': 'done'}
+
+        if os.path.exists(self._job_path(job_id, 'error')):
+            with open(self._job_path(job_id, 'error')) as f:
+                return {'job_id': job_id, 'status': 'failed', 'error': f.read()}
+
+        if os.path.exists(self._job_path(job_id, 'pending')):
+            return {'job_id': job_id, 'status': 'pending'}
+
+        return None
+
+    def get_job_result_path(self, job_id: str) -> Optional[Tuple[str, str]]:
+        """Ruta y mimetype del resultado de un trabajo terminado (None si no está listo)"""
+        if not _JOB_ID_PATTERN.match(job_id or ''):
+            return None
+        for output_format, (_, mimetype) in OUTPUT_FORMATS.items():
+            path = self._job_path(job_id, output_format)
+            if os.path.exists(path):
+                return path, mimetype
+        return None
+
+    def _job_path(self, job_id: str, extension: str) -> str:
+        return os.path.join(self.job_dir, f"{job_id}.{extension}")
+
+    def _cleanup_expired_jobs(self) -> None:
+        """Borrar los archivos de trabajos más viejos que REMBG_JOB_TTL"""
+        limit = time.time() - Config.REMBG_JOB_TTL
+        try:
+            with os.scandir(self.job_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.stat().st_mtime < limit:
+                        os.remove(entry.path)
+        except OSError as e:
+            logger.warning(f"No se pudieron limpiar los trabajos de quitar fondo: {str(e)}")
+
+
+_queue: Optional[BackgroundRemovalQueue] = None
+_queue_pid: Optional[int] = None
+_queue_lock = threading.Lock()
+
+
+def get_background_removal_queue() -> BackgroundRemovalQueue:
+    """Obtener el pool de quitar fondo del worker actual (se crea uno por proceso)"""
+    global _queue, _queue_pid
+
+    pid = os.getpid()
+    if _queue is not None and _queue_pid == pid:
+        return _queue
+
+    with _queue_lock:
+        if _queue is None or _queue_pid != pid:
+            _queue = BackgroundRemovalQueue()
+            _queue_pid = pid
+        return _queue
+
+
+def is_background_removal_pool_ready() -> bool:
+    """True si el pool del worker actual ya arrancó"""
+    return _queue is not None and _queue_pid == os.getpid() and _queue.ready
+
+
+def start_background_removal_pool() -> None:
+    """Arrancar el pool en segundo plano al iniciar el worker"""
+    def start():
+        try:
+            get_background_removal_queue().start()
+            logger.info("Pool de quitar fondo listo")
+        except Exception as e:
+            logger.error(f"Error al arrancar el pool de quitar fondo: {str(e)}")
+
+    threading.Thread(target=start, name='rembg-pool-start', daemon=True).start()
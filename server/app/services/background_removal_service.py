@@ -0,0 +1,193 @@
+import io
+import os
+import threading
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+from rembg import remove, new_session
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Formatos de salida admitidos: formato → (formato de PIL, mimetype)
+OUTPUT_FORMATS = {
+    'png': ('PNG', 'image/png'),
+    'webp': ('WEBP', 'image/webp')
+}
+
+_session = None
+_session_pid: Optional[int] = None
+_session_lock = threading.Lock()
+_ready = threading.Event()
+_inference_slots: Optional[threading.BoundedSemaphore] = None
+
+
+def _create_session():
+    """Crear la sesión de ONNX Runtime para el modelo configurado"""
+    try:
+        import onnxruntime as ort
+        from rembg.sessions import sessions_class
+
+        sess_opts = ort.SessionOptions()
+        if Config.REMBG_INTRA_OP_THREADS > 0:
+            sess_opts.intra_op_num_threads = Config.REMBG_INTRA_OP_THREADS
+        if Config.REMBG_INTER_OP_THREADS > 0:
+            sess_opts.inter_op_num_threads = Config.REMBG_INTER_OP_THREADS
+
+        session_class = next(cls for cls in sessions_class if cls.name() == Config.REMBG_MODEL)
+        return session_class(Config.REMBG_MODEL, sess_opts, None)
+    except (ImportError, StopIteration) as e:
+        # Versión de rembg sin sessions_class o modelo desconocido: sesión por defecto
+        logger.warning(f"No se pudo configurar la sesión de rembg, usando new_session: {str(e)}")
+        return new_session(Config.REMBG_MODEL)
+
+
+def get_rembg_session():
+    """
+    Obtener la sesión de rembg del proceso actual
+
+    Se crea una vez por worker (el modelo ONNX se carga en memoria una sola
+    vez) y se reutiliza en todas las peticiones.
+    """
+    global _session, _session_pid, _inference_slots
+
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            _ready.clear()
+            logger.info(f"Cargando modelo de rembg '{Config.REMBG_MODEL}' (pid {pid})")
+            _session = _create_session()
+            _session_pid = pid
+            _inference_slots = threading.BoundedSemaphore(max(Config.REMBG_MAX_CONCURRENT, 1))
+        return _session
+
+
+def warm_up_rembg_session() -> None:
+    """Cargar la sesión y ejecutar una inferencia de prueba; marca el servicio como listo"""
+    try:
+        session = get_rembg_session()
+        if Config.REMBG_WARMUP:
+            remove(Image.new('RGB', (64, 64), (255, 255, 255)), session=session)
+        _ready.set()
+        logger.info("Sesión de rembg lista")
+    except Exception as e:
+        logger.error(f"Error al preparar la sesión de rembg: {str(e)}")
+
+
+def start_rembg_warmup() -> None:
+    """Preparar la sesión en segundo plano al iniciar el worker"""
+    threading.Thread(target=warm_up_rembg_session, name='rembg-warmup', daemon=True).start()
+
+
+def is_rembg_ready() -> bool:
+    """True si la sesión del proceso actual está cargada y precalentada"""
+    return _ready.is_set() and _session_pid == os.getpid()
+
+
+def get_rembg_status() -> Dict[str, Any]:
+    """Estado de la sesión de rembg del worker"""
+    return {
+        'ready': is_rembg_ready(),
+        'model': Config.REMBG_MODEL,
+        'intra_op_threads': Config.REMBG_INTRA_OP_THREADS,
+        'inter_op_threads': Config.REMBG_INTER_OP_THREADS,
+        'max_concurrent': Config.REMBG_MAX_CONCURRENT
+    }
+
+
+class BackgroundRemovalService:
+    def __init__(self):
+        """Obtener la sesión de rembg compartida del worker"""
+        self.session = get_rembg_session()
+
+    def remove_background_bytes(self, image_bytes: bytes, output_format: str = 'png') -> Tuple[bytes, str]:
+        """
+        Quitar el fondo de una imagen subida y codificar el resultado
+
+        La imagen se decodifica reducida (modo draft de PIL) hasta
+        REMBG_MAX_DIMENSION, la inferencia corre sobre una copia del tamaño
+        del modelo (REMBG_INFERENCE_SIZE) y solo la máscara se escala al
+        tamaño de trabajo, en lugar de procesar la foto completa.
+
+        Args:
+            image_bytes: Imagen subida
+            output_format: 'png' o 'webp'
+
+        Returns:
+            Tupla (bytes codificados, mimetype)
+
+        Raises:
+            ValueError: Si el formato no está admitido o la imagen no es válida
+        """
+        output_format = (output_format or 'png').lower()
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Formato de salida no admitido: {output_format} (usar png o webp)")
+
+        image = self._load_image(image_bytes)
+        mask = self._predict_mask(image)
+        image.putalpha(mask)
+
+        pil_format, mimetype = OUTPUT_FORMATS[output_format]
+        img_io = io.BytesIO()
+        if pil_format == 'WEBP':
+            image.save(img_io, pil_format, quality=Config.REMBG_WEBP_QUALITY, method=4)
+        else:
+            image.save(img_io, pil_format, compress_level=Config.REMBG_PNG_COMPRESS_LEVEL)
+        return img_io.getvalue(), mimetype
+
+    def _load_image(self, image_bytes: bytes) -> Image.Image:
+        """
+        Decodificar la imagen limitada a REMBG_MAX_DIMENSION (0 = sin límite)
+
+        Raises:
+            ValueError: Si el archivo no es una imagen, está dañado o excede
+                el límite de píxeles de Pillow (la ruta responde 400)
+        """
+        max_dimension = Config.REMBG_MAX_DIMENSION
+        try:
+            image = Image.open(io.BytesIO(image_bytes))
+            if max_dimension > 0:
+                # JPEG: el decodificador reduce en potencias de 2 sin leer la resolución completa
+                image.draft('RGB', (max_dimension, max_dimension))
+            # Image.open solo lee la cabecera: los datos dañados o truncados
+            # fallan al decodificar, que debe ocurrir dentro de este try
+            image.load()
+        except Image.DecompressionBombError:
+            raise ValueError("La imagen tiene demasiados píxeles")
+        except Exception:
+            raise ValueError("El archivo no es una imagen válida")
+
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGB')
+
+        if max_dimension > 0 and max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        return image
+
+    def _predict_mask(self, image: Image.Image) -> Image.Image:
+        """
+        Calcular la máscara a la resolución del modelo y escalarla al tamaño de la imagen
+
+        Las inferencias simultáneas del worker se limitan a
+        REMBG_MAX_CONCURRENT para acotar el pico de memoria.
+        """
+        inference_size = Config.REMBG_INFERENCE_SIZE
+        source = image
+        if inference_size > 0 and max(image.size) > inference_size:
+            source = image.copy()
+            source.thumbnail((inference_size, inference_size), Image.BILINEAR)
+
+        with _inference_slots:
+            mask = remove(source, session=self.session, only_mask=True)
+        _ready.set()
+
+        mask = mask.convert('L')
+        if mask.size != image.size:
+            mask = mask.resize(image.size, Image.BILINEAR)
+        return mask
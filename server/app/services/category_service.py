@@ -1,21 +1,34 @@
-import os
-from supabase import create_client, Client
+from supabase import Client
 from typing import Dict, List, Optional, Any
 import logging
+from app.config import Config
+from app.utils.cache import TTLCache
+from .supabase_client import get_supabase_client, is_missing_function_error
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Listas de categorías y conteo de productos por categoría (por worker)
+_category_cache = TTLCache(
+    max_entries=Config.CATEGORY_CACHE_MAX_ENTRIES,
+    ttl=Config.CATEGORY_CACHE_TTL,
+    name='category'
+)
+
+
+def invalidate_category_cache() -> None:
+    """Invalidar las listas y conteos de categorías cacheados"""
+    _category_cache.clear()
+
+
+def get_category_cache_stats() -> Dict[str, Any]:
+    """Obtener contadores de aciertos y fallos de la caché de categorías"""
+    return _category_cache.stats()
+
 class CategoryService:
     def __init__(self):
         """Inicializar el cliente de Supabase"""
-        supabase_url = os.getenv('SUPABASE_URL')
-        supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
-        
-        if not supabase_url or not supabase_key:
-            raise ValueError("SUPABASE_URL y SUPABASE_SERVICE_KEY deben estar configurados")
-        
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+        self.supabase: Client = get_supabase_client()
     
     def get_categories(self, include_inactive: bool = False, filters: Dict = None) -> List[Dict]:
         """
@@ -29,6 +42,11 @@ class CategoryService:
             Lista de categorías
         """
         try:
+            cache_key = ('categories', include_inactive, tuple(sorted((filters or {}).items())))
+            cached = _category_cache.get(cache_key)
+            if cached is not None:
+                return list(cached)
+            
             query = self.supabase.table('categories').select('*')
             
             # Aplicar filtros si se proporcionan
@@ -59,7 +77,9 @@ class CategoryService:
             query = query.order('sort_order', desc=False).order('name', desc=False)
             result = query.execute()
             
-            return result.data or []
+            categories = result.data or []
+            _category_cache.set(cache_key, categories)
+            return list(categories)
             
         except Exception as e:
             logger.error(f"Error en get_categories: {str(e)}")
@@ -143,6 +163,7 @@ class CategoryService:
             
             # Insertar categoría
             result = self.supabase.table('categories').insert(insert_data).execute()
+            invalidate_category_cache()
             
             if result.data and len(result.data) > 0:
                 return result.data[0]
@@ -189,6 +210,7 @@ class CategoryService:
             
             # Actualizar categoría
             result = self.supabase.table('categories').update(update_data).eq('id', category_id).execute()
+            invalidate_category_cache()
             
             if result.data and len(result.data) > 0:
                 return result.data[0]
@@ -218,7 +240,7 @@ class CategoryService:
             # Verificar que no haya productos usando esta categoría
             # Primero obtener el nombre de la categoría
             category_name = existing_category['name']
-            products = self.supabase.table('products').select('id').eq('category', category_name).execute()
+            products = self.supabase.table('products').select('id').eq('category', category_name).limit(1).execute()
             if products.data and len(products.data) > 0:
                 raise ValueError("No se puede eliminar la categoría porque tiene productos asociados")
             
@@ -226,6 +248,7 @@ class CategoryService:
             result = self.supabase.table('categories').update({
                 'is_active': False
             }).eq('id', category_id).execute()
+            invalidate_category_cache()
             
             return len(result.data) > 0
             
@@ -241,8 +264,14 @@ class CategoryService:
             Lista de categorías destacadas
         """
         try:
+            cached = _category_cache.get(('featured',))
+            if cached is not None:
+                return list(cached)
+            
             result = self.supabase.table('categories').select('*').eq('is_featured', True).eq('is_active', True).order('sort_order', desc=False).execute()
-            return result.data or []
+            categories = result.data or []
+            _category_cache.set(('featured',), categories)
+            return list(categories)
             
         except Exception as e:
             logger.error(f"Error en get_featured_categories: {str(e)}")
@@ -259,28 +288,53 @@ class CategoryService:
             # Obtener todas las categorías activas
             categories = self.get_categories(include_inactive=False)
             
-            # Contar productos por categoría
-            stats = {
+            # Contar productos por categoría (una sola consulta agrupada)
+            counts = self.get_product_counts()
+            product_counts = {category['name']: counts.get(category['name'], 0) for category in categories}
+            
+            with_products = len([name for name, count in product_counts.items() if count > 0])
+            
+            return {
                 'total_categories': len(categories),
                 'featured_categories': len([c for c in categories if c.get('is_featured')]),
-                'categories_with_products': 0,
-                'categories_without_products': 0
+                'categories_with_products': with_products,
+                'categories_without_products': len(categories) - with_products,
+                'product_counts': product_counts
             }
             
-            for category in categories:
-                products = self.supabase.table('products').select('id').eq('category', category['name']).eq('is_active', True).execute()
-                if products.data and len(products.data) > 0:
-                    stats['categories_with_products'] += 1
-                else:
-                    stats['categories_without_products'] += 1
-            
-            return stats
-            
         except Exception as e:
             logger.error(f"Error en get_category_stats: {str(e)}")
             return {
                 'total_categories': 0,
                 'featured_categories': 0,
                 'categories_with_products': 0,
-                'categories_without_products': 0
-            } 
\ No newline at end of file
+                'categories_without_products': 0,
+                'product_counts': {}
+            }
+    
+    def get_product_counts(self) -> Dict[str, int]:
+        """
+        Obtener la cantidad de productos activos por nombre de categoría
+        
+        Returns:
+            Dict {categoría: cantidad}; las categorías sin productos no aparecen
+        """
+        cached = _category_cache.get(('product_counts',))
+        if cached is not None:
+            return dict(cached)
+        
+        try:
+            result = self.supabase.rpc('get_category_product_counts', {}).execute()
+            counts = {row['category']: int(row['products']) for row in (result.data or [])}
+        except Exception as rpc_error:
+            # Fallback solo si la función RPC no existe: una consulta y conteo en Python
+            if not is_missing_function_error(rpc_error):
+                raise
+            logger.warning(f"RPC get_category_product_counts no disponible, contando en Python: {str(rpc_error)}")
+            result = self.supabase.table('products').select('category').eq('is_active', True).execute()
+            counts = {}
+            for product in result.data or []:
+                counts[product['category']] = counts.get(product['category'], 0) + 1
+        
+        _category_cache.set(('product_counts',), counts)
+        return dict(counts) 
\ No newline at end of file
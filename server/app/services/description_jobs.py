@@ -0,0 +1,370 @@
+import json
+import os
+import re
+import socket
+import time
+import uuid
+import tempfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import Config
+from app.utils.file_slots import FileSlots
+from app.utils.rate_limit import SharedRateLimiter
+from .ai_tools_service import AIToolsService, DESCRIPTION_FIELDS
+from .llm_client import CircuitOpenError
+from .product_service import ProductService
+
+logger = logging.getLogger(__name__)
+
+_JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# Cada cuánto (segundos) escribir el progreso en el archivo del trabajo
+PROGRESS_INTERVAL = 1.0
+
+# Intentos por producto cuando el circuito del servicio de IA está abierto
+CIRCUIT_RETRIES = 3
+
+# Datos internos del archivo del trabajo que no se devuelven en la API
+_INTERNAL_FIELDS = ('host', 'pid')
+
+
+class JobLimitError(Exception):
+    """Hay demasiados trabajos de descripciones en curso"""
+
+
+def _product_features(product: Dict[str, Any]) -> str:
+    """Armar las características de un producto a partir de sus datos"""
+    features = []
+    specifications = product.get('specifications') or {}
+    if isinstance(specifications, dict):
+        features.extend(f"{key}: {value}" for key, value in specifications.items() if value not in (None, ''))
+    tags = product.get('tags') or []
+    if isinstance(tags, list) and tags:
+        features.append(', '.join(str(tag) for tag in tags))
+    if not features and product.get('description'):
+        features.append(product['description'])
+    return '; '.join(features) or product.get('name', '')
+
+
+class DescriptionJobManager:
+    """
+    Trabajos en lote de generación de descripciones de productos
+
+    Cada trabajo corre en un hilo del worker que lo recibió. Las llamadas al
+    servicio de IA de los trabajos del worker comparten un pool de
+    DESCRIPTION_JOB_CONCURRENCY hilos. El límite de
+    DESCRIPTION_JOB_MAX_ACTIVE trabajos en curso y el de
+    DESCRIPTION_JOB_RATE_PER_MINUTE llamadas por minuto son de todo el host:
+    se comparten entre workers con archivos bloqueados con flock en
+    DESCRIPTION_JOB_DIR. Las descripciones se guardan en bloques de
+    DESCRIPTION_JOB_WRITE_BATCH productos y el progreso se escribe en
+    DESCRIPTION_JOB_DIR para que cualquier worker pueda responder la
+    consulta de estado; un trabajo cuyo worker murió se informa como fallido.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(Config.DESCRIPTION_JOB_CONCURRENCY, 1),
+            thread_name_prefix='bapesu-descriptions'
+        )
+        self.job_dir = Config.DESCRIPTION_JOB_DIR or os.path.join(tempfile.gettempdir(), 'bapesu-description-jobs')
+        os.makedirs(self.job_dir, exist_ok=True)
+        self._limiter = SharedRateLimiter(os.path.join(self.job_dir, 'limits', 'rate.json'),
+                                          Config.DESCRIPTION_JOB_RATE_PER_MINUTE,
+                                          burst=max(Config.DESCRIPTION_JOB_CONCURRENCY, 1))
+        self._active = FileSlots(os.path.join(self.job_dir, 'limits'), 'active',
+                                 max(Config.DESCRIPTION_JOB_MAX_ACTIVE, 1))
+
+    def submit(self, product_ids: Optional[List[Any]] = None, products: Optional[List[Dict[str, Any]]] = None,
+               options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Crear un trabajo
+
+        Args:
+            product_ids: IDs de productos existentes (se leen con ProductService)
+            products: Especificaciones (name, category, features, targetAudience,
+                tone; con id opcional para guardar el resultado en el producto)
+            options: targetAudience y tone por defecto, overwrite (reemplazar
+                descripciones existentes), save (guardar en los productos) y
+                regenerate (ignorar la caché de respuestas)
+
+        Returns:
+            Estado inicial del trabajo
+
+        Raises:
+            ValueError: Si la entrada no es válida
+            JobLimitError: Si ya hay DESCRIPTION_JOB_MAX_ACTIVE trabajos en curso
+        """
+        options = options or {}
+        if bool(product_ids) == bool(products):
+            raise ValueError("Se requiere product_ids o products (solo uno de los dos)")
+
+        if products:
+            for spec in products:
+                if not isinstance(spec, dict) or 'name' not in spec or 'category' not in spec:
+                    raise ValueError("Cada producto debe tener al menos name y category")
+                if spec.get('id') is not None:
+                    try:
+                        spec['id'] = int(spec['id'])
+                    except (ValueError, TypeError):
+                        raise ValueError("Los IDs de producto deben ser números enteros")
+        else:
+            try:
+                product_ids = list(dict.fromkeys(int(product_id) for product_id in product_ids))
+            except (ValueError, TypeError):
+                raise ValueError("Los IDs de producto deben ser números enteros")
+
+        total = len(product_ids or products)
+        if total > Config.DESCRIPTION_JOB_MAX_ITEMS:
+            raise ValueError(f"El lote admite como máximo {Config.DESCRIPTION_JOB_MAX_ITEMS} productos")
+
+        slot = self._active.try_acquire()
+        if slot is None:
+            raise JobLimitError("Hay demasiados trabajos de descripciones en curso, intenta de nuevo más tarde")
+
+        self._cleanup_expired_jobs()
+
+        now = datetime.utcnow().isoformat()
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'status': 'pending',
+            'total': total,
+            'completed': 0,
+            'failed': 0,
+            'skipped': 0,
+            'saved': 0,
+            'results': [],
+            'error': None,
+            # Dueño del trabajo: si ese proceso muere, get_job lo informa como fallido
+            'host': socket.gethostname(),
+            'pid': os.getpid(),
+            'created_at': now,
+            'updated_at': now
+        }
+        self._write_job(job)
+
+        threading.Thread(
+            target=self._run, args=(job, slot, product_ids, products, options),
+            name=f"description-job-{job['job_id'][:8]}", daemon=True
+        ).start()
+        return self._summary(job)
+
+    def _run(self, job: Dict[str, Any], slot: int, product_ids: Optional[List[int]],
+             products: Optional[List[Dict[str, Any]]], options: Dict[str, Any]) -> None:
+        try:
+            job['status'] = 'running'
+            specs = self._build_specs(job, product_ids, products, options)
+            self._write_job(job)
+            self._generate_all(job, specs, options)
+            job['status'] = 'done'
+        except Exception as e:
+            logger.error(f"Error en el trabajo de descripciones {job['job_id']}: {str(e)}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        finally:
+            self._active.release(slot)
+            self._write_job(job)
+
+    def _build_specs(self, job: Dict[str, Any], product_ids: Optional[List[int]],
+                     products: Optional[List[Dict[str, Any]]], options: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Armar los datos del prompt de cada producto; omite los que ya tienen descripción"""
+        defaults = {
+            'targetAudience': options.get('targetAudience') or 'Público general',
+            'tone': options.get('tone') or 'Profesional'
+        }
+        overwrite = bool(options.get('overwrite'))
+
+        if products:
+            # Las especificaciones con id siguen la misma regla que product_ids
+            existing = {}
+            linked_ids = [spec['id'] for spec in products if spec.get('id') is not None]
+            if linked_ids and not overwrite:
+                existing = {product['id']: product for product in ProductService().get_products_by_ids(linked_ids)}
+
+            specs = []
+            for spec in products:
+                product = existing.get(spec.get('id'))
+                if product is not None and product.get('description'):
+                    job['skipped'] += 1
+                    job['results'].append({'id': spec['id'], 'name': spec.get('name'), 'status': 'skipped'})
+                    continue
+                spec = {**defaults, **spec}
+                spec.setdefault('features', spec.get('description') or spec['name'])
+                specs.append(spec)
+            return specs
+
+        found = {product['id']: product for product in ProductService().get_products_by_ids(product_ids)}
+        specs = []
+        for product_id in product_ids:
+            product = found.get(product_id)
+            if product is None:
+                job['failed'] += 1
+                job['results'].append({'id': product_id, 'status': 'failed', 'error': 'Producto no encontrado'})
+                continue
+            if product.get('description') and not overwrite:
+                job['skipped'] += 1
+                job['results'].append({'id': product_id, 'name': product.get('name'), 'status': 'skipped'})
+                continue
+            specs.append({
+                **defaults,
+                'id': product_id,
+                'name': product.get('name', ''),
+                'category': product.get('category', ''),
+                'features': _product_features(product)
+            })
+        return specs
+
+    def _generate_all(self, job: Dict[str, Any], specs: List[Dict[str, Any]], options: Dict[str, Any]) -> None:
+        """Generar las descripciones en paralelo y guardarlas en bloques"""
+        save = options.get('save', True) is not False
+        regenerate = bool(options.get('regenerate'))
+        pending_writes: Dict[int, str] = {}
+        last_progress = time.monotonic()
+
+        futures = {self._executor.submit(self._generate_one, spec, regenerate): spec for spec in specs}
+        for future in as_completed(futures):
+            spec = futures[future]
+            result = {'id': spec.get('id'), 'name': spec.get('name')}
+            try:
+                result['description'] = future.result()
+                result['status'] = 'done'
+                job['completed'] += 1
+                if save and spec.get('id') is not None:
+                    pending_writes[spec['id']] = result['description']
+            except Exception as e:
+                result['status'] = 'failed'
+                result['error'] = str(e)
+                job['failed'] += 1
+            job['results'].append(result)
+
+            if len(pending_writes) >= Config.DESCRIPTION_JOB_WRITE_BATCH:
+                self._save(job, pending_writes)
+            if time.monotonic() - last_progress >= PROGRESS_INTERVAL:
+                self._write_job(job)
+                last_progress = time.monotonic()
+
+        self._save(job, pending_writes)
+
+    def _generate_one(self, spec: Dict[str, Any], regenerate: bool) -> str:
+        """Generar una descripción respetando el ritmo y esperando si el circuito está abierto"""
+        service = AIToolsService()
+        data = {field: spec[field] for field in DESCRIPTION_FIELDS}
+
+        # Los aciertos de la caché no consumen cupo del limitador
+        if not regenerate:
+            cached = service.get_cached_description(data)
+            if cached is not None:
+                return cached
+
+        for attempt in range(1, CIRCUIT_RETRIES + 1):
+            self._limiter.acquire()
+            try:
+                # La caché ya se consultó: se llama al servicio y se guarda la respuesta
+                return service.generate_description(data, regenerate=True)['text']
+            except CircuitOpenError as e:
+                if attempt == CIRCUIT_RETRIES:
+                    raise
+                time.sleep(e.retry_after)
+
+    def _save(self, job: Dict[str, Any], pending_writes: Dict[int, str]) -> None:
+        """Guardar el bloque de descripciones pendientes"""
+        if not pending_writes:
+            return
+        try:
+            updated = ProductService().update_product_descriptions(dict(pending_writes))
+            job['saved'] += len(updated)
+        except Exception as e:
+            logger.error(f"Error al guardar descripciones del trabajo {job['job_id']}: {str(e)}")
+        pending_writes.clear()
+
+    def get_job(self, job_id: str, include_results: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Consultar un trabajo
+
+        Returns:
+            Estado del trabajo (con los resultados si include_results), o
+            None si no existe o ya expiró
+        """
+        if not _JOB_ID_PATTERN.match(job_id or ''):
+            return None
+        try:
+            with open(self._job_path(job_id)) as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if job.get('status') in ('pending', 'running') and self._owner_died(job):
+            logger.warning(f"El worker del trabajo de descripciones {job_id} (pid {job.get('pid')}) terminó sin completarlo")
+            job['status'] = 'failed'
+            job['error'] = 'El proceso que ejecutaba el trabajo terminó antes de completarlo'
+            self._write_job(job)
+
+        if include_results:
+            return {key: value for key, value in job.items() if key not in _INTERNAL_FIELDS}
+        return self._summary(job)
+
+    def _summary(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in job.items() if key != 'results' and key not in _INTERNAL_FIELDS}
+
+    def _owner_died(self, job: Dict[str, Any]) -> bool:
+        """True si el proceso dueño del trabajo (en este mismo host) ya no existe"""
+        pid = job.get('pid')
+        if not pid or job.get('host') != socket.gethostname():
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            return False
+        return False
+
+    def _write_job(self, job: Dict[str, Any]) -> None:
+        job['updated_at'] = datetime.utcnow().isoformat()
+        path = self._job_path(job['job_id'])
+        # Escritura atómica: otro worker puede estar leyendo el estado
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(job, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el estado del trabajo {job['job_id']}: {str(e)}")
+
+    def _job_path(self, job_id: str) -> str:
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def _cleanup_expired_jobs(self) -> None:
+        """Borrar los archivos de trabajos más viejos que DESCRIPTION_JOB_TTL"""
+        limit = time.time() - Config.DESCRIPTION_JOB_TTL
+        try:
+            with os.scandir(self.job_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.stat().st_mtime < limit:
+                        os.remove(entry.path)
+        except OSError as e:
+            logger.warning(f"No se pudieron limpiar los trabajos de descripciones: {str(e)}")
+
+
+_manager: Optional[DescriptionJobManager] = None
+_manager_pid: Optional[int] = None
+_manager_lock = threading.Lock()
+
+
+def get_description_job_manager() -> DescriptionJobManager:
+    """Obtener el gestor de trabajos de descripciones del worker actual"""
+    global _manager, _manager_pid
+
+    pid = os.getpid()
+    if _manager is not None and _manager_pid == pid:
+        return _manager
+
+    with _manager_lock:
+        if _manager is None or _manager_pid != pid:
+            _manager = DescriptionJobManager()
+            _manager_pid = pid
+        return _manager
@@ -0,0 +1,451 @@
+import os
+import json
+import time
+import random
+import threading
+import logging
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import Config
+from app.utils.metrics import record_llm_call
+
+logger = logging.getLogger(__name__)
+
+# Códigos de respuesta que vale la pena reintentar
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Error al llamar al servicio de generación de texto"""
+
+
+class LLMTimeoutError(LLMError):
+    """El servicio de generación de texto no respondió a tiempo"""
+
+
+class CircuitOpenError(LLMError):
+    """El circuito está abierto: el servicio falló varias veces seguidas"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuito para cortar las llamadas a un servicio que está fallando
+
+    Después de failure_threshold fallos seguidos se abre y rechaza las
+    llamadas durante reset_timeout segundos; luego deja pasar una sola
+    llamada de prueba (semiabierto) y se cierra si sale bien.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def before_call(self) -> None:
+        """
+        Verificar si se puede llamar al servicio
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto o ya hay una llamada de prueba en curso
+        """
+        if self.failure_threshold <= 0:
+            return
+
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            retry_after = max(self.reset_timeout - (time.monotonic() - self._opened_at), 1.0)
+
+        raise CircuitOpenError("El servicio de Bapesu IA no está disponible, intenta de nuevo en unos segundos",
+                               retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"Circuito del servicio de IA abierto tras {self._failures} fallos")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class LLMMetrics:
+    """Contadores de llamadas, latencia y tokens del proceso actual"""
+
+    # Cantidad de latencias recientes para calcular percentiles
+    WINDOW = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=self.WINDOW)
+        self._ttfts = deque(maxlen=self.WINDOW)
+        self.calls = 0
+        self.streams = 0
+        self.errors = 0
+        self.retries = 0
+        self.circuit_rejections = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def record_call(self, latency_ms: float, usage: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            self.calls += 1
+            self._latencies.append(latency_ms)
+            if usage:
+                self.prompt_tokens += usage.get('prompt_tokens') or 0
+                self.completion_tokens += usage.get('completion_tokens') or 0
+
+    def record_first_token(self, ttft_ms: float) -> None:
+        """Tiempo hasta el primer token de una respuesta en streaming"""
+        with self._lock:
+            self.streams += 1
+            self._ttfts.append(ttft_ms)
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def record_rejection(self) -> None:
+        with self._lock:
+            self.circuit_rejections += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            ttfts = sorted(self._ttfts)
+            stats = {
+                'calls': self.calls,
+                'streams': self.streams,
+                'errors': self.errors,
+                'retries': self.retries,
+                'circuit_rejections': self.circuit_rejections,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'total_tokens': self.prompt_tokens + self.completion_tokens
+            }
+
+        for name, percentile in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+            stats[f'{name}_ms'] = self._percentile(latencies, percentile)
+            stats[f'ttft_{name}_ms'] = self._percentile(ttfts, percentile)
+        return stats
+
+    @staticmethod
+    def _percentile(values: List[float], percentile: float) -> Optional[float]:
+        if not values:
+            return None
+        return round(values[min(int(len(values) * percentile), len(values) - 1)], 1)
+
+
+class LLMClient:
+    """
+    Cliente HTTP para la API de chat completions (DeepSeek)
+
+    Reutiliza las conexiones (keep-alive) con un pool de requests.Session,
+    aplica timeouts de conexión y lectura, reintenta los errores transitorios
+    con backoff exponencial con jitter sin pasarse de total_timeout (la suma
+    de intentos y esperas) y corta las llamadas con un circuito
+    cuando el servicio falla seguido. La URL se recibe en el constructor,
+    así que se puede apuntar a un servidor local de prueba.
+    """
+
+    def __init__(self, api_url: str, api_key: Optional[str], model: str,
+                 connect_timeout: float = 3.05, read_timeout: float = 20.0,
+                 total_timeout: float = 25.0, max_retries: int = 2, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 pool_size: int = 10, breaker: Optional[CircuitBreaker] = None):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.timeout = (connect_timeout, read_timeout)
+        self.total_timeout = total_timeout
+        self.max_retries = max(max_retries, 0)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker(0, 0)
+        self.metrics = LLMMetrics()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json'
+        })
+
+    def build_payload(self, messages: List[Dict[str, str]], temperature: Optional[float] = None,
+                      max_tokens: Optional[int] = None, **extra) -> Dict[str, Any]:
+        """Cuerpo de la petición de chat completions"""
+        payload = {
+            'model': self.model,
+            'messages': messages,
+            'temperature': Config.DEEPSEEK_TEMPERATURE if temperature is None else temperature,
+            'max_tokens': Config.DEEPSEEK_MAX_TOKENS if max_tokens is None else max_tokens
+        }
+        payload.update(extra)
+        return payload
+
+    def chat(self, messages: List[Dict[str, str]], temperature: Optional[float] = None,
+             max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Generar una respuesta completa
+
+        Args:
+            messages: Mensajes del chat ({'role', 'content'})
+            temperature: Temperatura (por defecto DEEPSEEK_TEMPERATURE)
+            max_tokens: Máximo de tokens (por defecto DEEPSEEK_MAX_TOKENS)
+
+        Returns:
+            Dict con content, usage, latency_ms y attempts
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto
+            LLMTimeoutError: Si se agotaron los reintentos por timeout
+            LLMError: Si el servicio respondió con error o una respuesta inválida
+        """
+        payload = self.build_payload(messages, temperature, max_tokens)
+        start = time.perf_counter()
+        response, attempts = self._post(payload)
+
+        try:
+            body = response.json()
+            content = body['choices'][0]['message']['content']
+        except (ValueError, KeyError, IndexError, TypeError):
+            self.metrics.record_error()
+            raise LLMError("Respuesta inválida del servicio de Bapesu IA")
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        usage = body.get('usage') or {}
+        self.metrics.record_call(latency_ms, usage)
+        record_llm_call('chat', latency_ms / 1000, usage)
+        logger.info(
+            "Llamada al servicio de IA: %.0f ms, %d intento(s)", latency_ms, attempts,
+            extra={'latency_ms': round(latency_ms, 1), 'attempts': attempts,
+                   'prompt_tokens': usage.get('prompt_tokens', 0),
+                   'completion_tokens': usage.get('completion_tokens', 0)}
+        )
+
+        return {
+            'content': content,
+            'usage': usage,
+            'latency_ms': round(latency_ms, 1),
+            'attempts': attempts
+        }
+
+    def stream_chat(self, messages: List[Dict[str, str]], temperature: Optional[float] = None,
+                    max_tokens: Optional[int] = None) -> Iterator[str]:
+        """
+        Generar una respuesta en streaming (stream: true), fragmento por fragmento
+
+        Los reintentos y el circuito solo aplican hasta que el servicio
+        acepta la petición; un corte a mitad de la respuesta no se reintenta.
+        La respuesta completa no puede pasar de total_timeout.
+
+        Yields:
+            Fragmentos de texto a medida que llegan
+
+        Raises:
+            CircuitOpenError, LLMTimeoutError, LLMError: Igual que chat()
+        """
+        payload = self.build_payload(messages, temperature, max_tokens,
+                                     stream=True, stream_options={'include_usage': True})
+        start = time.perf_counter()
+        deadline = time.monotonic() + self.total_timeout if self.total_timeout > 0 else None
+        response, attempts = self._post(payload, stream=True)
+
+        ttft_ms = None
+        usage = {}
+        try:
+            for line in response.iter_lines():
+                # total_timeout también limita la respuesta completa, no solo el primer byte
+                if deadline is not None and time.monotonic() > deadline:
+                    self.metrics.record_error()
+                    raise LLMTimeoutError("La respuesta del servicio de Bapesu IA superó el tiempo máximo")
+                # Eventos SSE: "data: {...}" por fragmento y "data: [DONE]" al final
+                if not line.startswith(b'data:'):
+                    continue
+                data = line[5:].strip()
+                if data == b'[DONE]':
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+
+                if chunk.get('usage'):
+                    usage = chunk['usage']
+                for choice in chunk.get('choices') or []:
+                    delta = (choice.get('delta') or {}).get('content')
+                    if delta:
+                        if ttft_ms is None:
+                            ttft_ms = (time.perf_counter() - start) * 1000
+                            self.metrics.record_first_token(ttft_ms)
+                        yield delta
+        except requests.exceptions.RequestException as e:
+            self.metrics.record_error()
+            raise LLMError(f"Se cortó la respuesta del servicio de Bapesu IA: {str(e)}")
+        finally:
+            response.close()
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.metrics.record_call(latency_ms, usage)
+        record_llm_call('stream', latency_ms / 1000, usage, ttft_ms / 1000 if ttft_ms is not None else None)
+        logger.info(
+            "Llamada al servicio de IA (streaming): primer token en %.0f ms, total %.0f ms, %d intento(s)",
+            ttft_ms or 0, latency_ms, attempts,
+            extra={'ttft_ms': round(ttft_ms, 1) if ttft_ms is not None else None,
+                   'latency_ms': round(latency_ms, 1), 'attempts': attempts,
+                   'prompt_tokens': usage.get('prompt_tokens', 0),
+                   'completion_tokens': usage.get('completion_tokens', 0)}
+        )
+
+    def _post(self, payload: Dict[str, Any], stream: bool = False):
+        """
+        Enviar la petición con reintentos
+
+        Returns:
+            Tupla (respuesta exitosa, cantidad de intentos)
+        """
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.metrics.record_rejection()
+            raise
+
+        deadline = time.monotonic() + self.total_timeout if self.total_timeout > 0 else None
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            timeout = self.timeout
+            if deadline is not None:
+                # El último intento no puede pasarse del tiempo total
+                remaining = max(deadline - time.monotonic(), 0.001)
+                timeout = (min(self.timeout[0], remaining), min(self.timeout[1], remaining))
+            try:
+                response = self.session.post(self.api_url, json=payload, timeout=timeout, stream=stream)
+                if response.status_code >= 400:
+                    error = LLMError(f"El servicio de Bapesu IA respondió {response.status_code}: {response.text[:200]}")
+                    retry_after = response.headers.get('Retry-After')
+                    response.close()
+            except requests.exceptions.Timeout as e:
+                response = None
+                error = LLMTimeoutError(f"Timeout al comunicarse con el servicio de Bapesu IA: {str(e)}")
+            except requests.exceptions.RequestException as e:
+                # Conexión rechazada o cortada, cuerpo mal codificado, demasiadas redirecciones...
+                response = None
+                error = LLMError(f"Error de conexión con el servicio de Bapesu IA: {str(e)}")
+            except Exception as e:
+                # Siempre registrar el resultado: si era la llamada de prueba, el circuito no debe quedar trabado
+                self.breaker.record_failure()
+                self.metrics.record_error()
+                raise LLMError(f"Error inesperado al llamar al servicio de Bapesu IA: {str(e)}") from e
+
+            if response is not None:
+                if response.status_code < 400:
+                    self.breaker.record_success()
+                    return response, attempt
+
+                if response.status_code not in RETRYABLE_STATUS:
+                    # Error de la petición (4xx): no es una falla del servicio
+                    self.breaker.record_success()
+                    self.metrics.record_error()
+                    raise error
+
+            delay = self._backoff(attempt, retry_after)
+            if attempt > self.max_retries or (deadline is not None and time.monotonic() + delay >= deadline):
+                self.breaker.record_failure()
+                self.metrics.record_error()
+                raise error
+
+            self.metrics.record_retry()
+            time.sleep(delay)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Espera antes del siguiente intento: Retry-After si viene, si no backoff exponencial con jitter completo"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas del cliente y estado del circuito"""
+        return {**self.metrics.snapshot(), 'circuit_state': self.breaker.state}
+
+
+_client: Optional[LLMClient] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Obtener el cliente de IA del worker actual (las conexiones no se comparten entre procesos)"""
+    global _client, _client_pid
+
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = LLMClient(
+                api_url=Config.DEEPSEEK_API_URL,
+                api_key=Config.DEEPSEEK_API_KEY,
+                model=Config.DEEPSEEK_MODEL,
+                connect_timeout=Config.DEEPSEEK_CONNECT_TIMEOUT,
+                read_timeout=Config.DEEPSEEK_READ_TIMEOUT,
+                total_timeout=Config.DEEPSEEK_TOTAL_TIMEOUT,
+                max_retries=Config.DEEPSEEK_MAX_RETRIES,
+                backoff_base=Config.DEEPSEEK_BACKOFF_BASE,
+                backoff_max=Config.DEEPSEEK_BACKOFF_MAX,
+                pool_size=Config.DEEPSEEK_POOL_SIZE,
+                breaker=CircuitBreaker(Config.DEEPSEEK_CIRCUIT_FAILURES, Config.DEEPSEEK_CIRCUIT_RESET)
+            )
+            _client_pid = pid
+        return _client
@@ -1,12 +1,16 @@
-from supabase import create_client, Client
-from app.config import Config
+from supabase import Client
+from app.utils.pagination import apply_keyset, split_page
+from .supabase_client import get_supabase_client, is_missing_function_error
 import uuid
 from datetime import datetime
 from typing import Dict, List, Optional, Any
+import logging
+
+logger = logging.getLogger(__name__)
 
 class OrderService:
     def __init__(self):
-        self.supabase: Client = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
+        self.supabase: Client = get_supabase_client()
     
     def create_order(self, order_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -19,8 +23,7 @@ class OrderService:
             Dict con la orden creada
         """
         try:
-            print(f"OrderService.create_order - Received user_id: {order_data.get('user_id')}")
-            print(f"OrderService.create_order - Full order_data: {order_data}")
+            logger.debug("create_order: user_id=%s, %d items", order_data.get('user_id'), len(order_data.get('items') or []))
             
             # Preparar los datos de la orden
             order_payload = {
@@ -127,7 +130,8 @@ class OrderService:
                 'message': 'Error al obtener la orden'
             }
     
-    def get_user_orders(self, user_id: str, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+    def get_user_orders(self, user_id: str, limit: int = 50, offset: int = 0,
+                        cursor: Optional[str] = None) -> Dict[str, Any]:
         """
         Obtener todas las órdenes de un usuario
         
@@ -135,14 +139,21 @@ class OrderService:
             user_id: ID del usuario
             limit: Límite de resultados
             offset: Offset para paginación
+            cursor: Cursor de la página anterior; si se indica (aunque sea vacío)
+                se usa paginación por cursor en lugar de offset
             
         Returns:
             Dict con las órdenes del usuario
         """
         try:
-            print(f"User ID: {user_id} , offset: {offset} , limit: {limit}")
+            logger.debug("get_user_orders: user_id=%s, offset=%s, limit=%s", user_id, offset, limit)
             # Usar la clave de servicio para bypass RLS ya que estamos en el backend
-            result = self.supabase.table('orders').select('*').eq('user_id', user_id).order('created_at', desc=True).range(offset, offset + limit - 1).execute()
+            query = self.supabase.table('orders').select('*').eq('user_id', user_id)
+            
+            if cursor is not None:
+                return self._get_orders_page_after(query, cursor, limit)
+            
+            result = query.order('created_at', desc=True).range(offset, offset + limit - 1).execute()
             
             return {
                 'success': True,
@@ -151,14 +162,15 @@ class OrderService:
             }
             
         except Exception as e:
-            print(f"Error en get_user_orders: {str(e)}")
+            logger.error("Error en get_user_orders: %s", e)
             return {
                 'success': False,
                 'error': str(e),
                 'message': 'Error al obtener las órdenes'
             }
     
-    def get_all_orders(self, limit: int = 50, offset: int = 0, status: Optional[str] = None) -> Dict[str, Any]:
+    def get_all_orders(self, limit: int = 50, offset: int = 0, status: Optional[str] = None,
+                       cursor: Optional[str] = None) -> Dict[str, Any]:
         """
         Obtener todas las órdenes (solo para administradores)
         
@@ -166,17 +178,22 @@ class OrderService:
             limit: Límite de resultados
             offset: Offset para paginación
             status: Filtrar por estado
+            cursor: Cursor de la página anterior; si se indica (aunque sea vacío)
+                se usa paginación por cursor en lugar de offset
             
         Returns:
             Dict con todas las órdenes
         """
         try:
-            query = self.supabase.table('orders').select('*').order('created_at', desc=True)
+            query = self.supabase.table('orders').select('*')
             
             if status:
                 query = query.eq('status', status)
             
-            result = query.range(offset, offset + limit - 1).execute()
+            if cursor is not None:
+                return self._get_orders_page_after(query, cursor, limit)
+            
+            result = query.order('created_at', desc=True).range(offset, offset + limit - 1).execute()
             
             return {
                 'success': True,
@@ -191,6 +208,30 @@ class OrderService:
                 'message': 'Error al obtener las órdenes'
             }
     
+    def _get_orders_page_after(self, query, cursor: str, limit: int) -> Dict[str, Any]:
+        """
+        Ejecutar una consulta de órdenes con paginación por cursor
+        (keyset sobre created_at, id)
+        """
+        try:
+            result = apply_keyset(query, cursor).limit(limit + 1).execute()
+        except ValueError as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'message': 'Cursor de paginación inválido'
+            }
+        
+        orders, next_cursor = split_page(result.data, limit)
+        
+        return {
+            'success': True,
+            'data': orders,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'message': 'Órdenes obtenidas exitosamente'
+        }
+    
     def update_order_status(self, order_id: str, status: str) -> Dict[str, Any]:
         """
         Actualizar el estado de una orden
@@ -303,29 +344,19 @@ class OrderService:
             Dict con las estadísticas
         """
         try:
-            # Obtener total de órdenes
-            total_result = self.supabase.table('orders').select('id', count='exact').execute()
-            total_orders = total_result.count if total_result.count else 0
-            
-            # Obtener órdenes por estado
-            status_result = self.supabase.table('orders').select('status').execute()
-            status_counts = {}
-            if status_result.data:
-                for order in status_result.data:
-                    status = order['status']
-                    status_counts[status] = status_counts.get(status, 0) + 1
-            
-            # Obtener total de ventas
-            sales_result = self.supabase.table('orders').select('total_amount').eq('status', 'delivered').execute()
-            total_sales = sum(order['total_amount'] for order in sales_result.data) if sales_result.data else 0
+            try:
+                result = self.supabase.rpc('get_order_stats', {}).execute()
+                stats = result.data
+            except Exception as rpc_error:
+                # Fallback solo si la función RPC no existe en la base de datos
+                if not is_missing_function_error(rpc_error):
+                    raise
+                logger.warning("RPC get_order_stats no disponible, calculando en Python: %s", rpc_error)
+                stats = self._calculate_order_stats_manually()
             
             return {
                 'success': True,
-                'data': {
-                    'total_orders': total_orders,
-                    'status_counts': status_counts,
-                    'total_sales': total_sales
-                },
+                'data': stats,
                 'message': 'Estadísticas obtenidas exitosamente'
             }
             
@@ -335,6 +366,30 @@ class OrderService:
                 'error': str(e),
                 'message': 'Error al obtener las estadísticas'
             }
+    
+    def _calculate_order_stats_manually(self) -> Dict[str, Any]:
+        """Calcular las estadísticas descargando las órdenes (si la RPC no existe)"""
+        # Obtener total de órdenes
+        total_result = self.supabase.table('orders').select('id', count='exact').execute()
+        total_orders = total_result.count if total_result.count else 0
+        
+        # Obtener órdenes por estado
+        status_result = self.supabase.table('orders').select('status').execute()
+        status_counts = {}
+        if status_result.data:
+            for order in status_result.data:
+                status = order['status']
+                status_counts[status] = status_counts.get(status, 0) + 1
+        
+        # Obtener total de ventas
+        sales_result = self.supabase.table('orders').select('total_amount').eq('status', 'delivered').execute()
+        total_sales = sum(order['total_amount'] for order in sales_result.data) if sales_result.data else 0
+        
+        return {
+            'total_orders': total_orders,
+            'status_counts': status_counts,
+            'total_sales': total_sales
+        }
 
     def delete_order(self, order_id: str) -> Dict[str, Any]:
         """
@@ -390,7 +445,7 @@ class OrderService:
             result = self.supabase.table('orders').select('*').eq('status', 'pending').is_('deleted_at', 'null').execute()
             return result.data if result.data else []
         except Exception as e:
-            print(f"Error getting pending orders: {e}")
+            logger.error("Error getting pending orders: %s", e)
             return []
 
     def get_recent_orders(self, limit: int = 5) -> List[Dict[str, Any]]:
@@ -407,5 +462,5 @@ class OrderService:
             result = self.supabase.table('orders').select('*').is_('deleted_at', 'null').order('created_at', desc=True).limit(limit).execute()
             return result.data if result.data else []
         except Exception as e:
-            print(f"Error getting recent orders: {e}")
+            logger.error("Error getting recent orders: %s", e)
             return [] 
\ No newline at end of file
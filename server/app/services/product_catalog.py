@@ -0,0 +1,507 @@
+import os
+import bisect
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional, Any, Set
+import logging
+
+from app.config import Config
+from app.utils.prefix_index import PrefixIndex, normalize_text
+from .supabase_client import get_supabase_client
+
+logger = logging.getLogger(__name__)
+
+# Columnas de products que solo usa la base de datos (ver §1 de
+# database/api_functions.sql) y no forman parte de las respuestas
+INTERNAL_PRODUCT_COLUMNS = ('search_vector',)
+
+
+def strip_internal_columns(row: Optional[Dict]) -> Optional[Dict]:
+    """Quitar de una fila de products las columnas internas de la base"""
+    if row:
+        for column in INTERNAL_PRODUCT_COLUMNS:
+            row.pop(column, None)
+    return row
+
+
+class ProductCatalog:
+    """
+    Copia en memoria (por worker) del catálogo de productos activos
+
+    Guarda los productos activos con índices secundarios por categoría,
+    destacado, estado, stock y precio, junto con los agregados de calificaciones, y
+    resuelve listados con la misma semántica que ProductService._apply_filters.
+    Se refresca de forma incremental con la marca updated_at y las rutas de
+    administración la marcan como desactualizada tras cada cambio. Los
+    borrados definitivos hechos desde otro worker se detectan comparando el
+    conteo de productos activos y, si no coincide, el conjunto de IDs.
+    """
+
+    LOAD_PAGE_SIZE = 1000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._products: Dict[Any, Dict] = {}
+        self._search_text: Dict[Any, str] = {}
+        self._ratings: Dict[Any, Dict] = {}
+        self._by_category: Dict[str, Set] = {}
+        self._featured: Set = set()
+        self._by_status: Dict[Any, Set] = {}
+        self._in_stock: Set = set()
+        self._price_index: List[tuple] = []
+        self._prices: List[float] = []
+        self._ordered: List = []
+        self._indexes_dirty = True
+        self._product_suggestions: Optional[PrefixIndex] = None
+        self._category_suggestions: Optional[PrefixIndex] = None
+        self._category_counts: Dict[str, int] = {}
+        self._products_watermark: Optional[str] = None
+        self._ratings_watermark: Optional[str] = None
+        self._loaded_at = 0.0
+        self._refreshed_at = 0.0
+        self._stale = True
+
+    # ------------------------------------------------------------------
+    # Refresco
+    # ------------------------------------------------------------------
+
+    def mark_stale(self) -> None:
+        """Forzar un refresco incremental en la próxima lectura"""
+        self._stale = True
+
+    def remove(self, product_id) -> None:
+        """Quitar un producto de la copia (borrado definitivo)"""
+        with self._lock:
+            self._drop(self._normalize_id(product_id))
+            self._indexes_dirty = True
+
+    def _ensure_fresh(self) -> None:
+        """Cargar o refrescar la copia si está vencida"""
+        now = time.monotonic()
+        if (not self._stale
+                and now - self._refreshed_at < Config.CATALOG_REFRESH_INTERVAL
+                and now - self._loaded_at < Config.CATALOG_FULL_RELOAD_INTERVAL):
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            if not self._loaded_at or now - self._loaded_at >= Config.CATALOG_FULL_RELOAD_INTERVAL:
+                self._full_load()
+            elif self._stale or now - self._refreshed_at >= Config.CATALOG_REFRESH_INTERVAL:
+                self._incremental_refresh()
+
+    def _full_load(self) -> None:
+        """Cargar todos los productos activos y sus agregados de calificaciones"""
+        supabase = get_supabase_client()
+
+        self._products.clear()
+        self._search_text.clear()
+        self._ratings.clear()
+        self._products_watermark = None
+        self._ratings_watermark = None
+
+        for row in self._fetch_all(supabase.table('products').select('*').eq('is_active', True).order('id')):
+            self._upsert(row)
+
+        self._load_ratings(supabase, incremental=False)
+
+        self._indexes_dirty = True
+        self._loaded_at = self._refreshed_at = time.monotonic()
+        self._stale = False
+        logger.info(f"Catálogo cargado en memoria: {len(self._products)} productos (pid {os.getpid()})")
+
+    def _incremental_refresh(self) -> None:
+        """Aplicar los productos y calificaciones modificados desde la última marca"""
+        if self._products_watermark is None:
+            self._full_load()
+            return
+
+        supabase = get_supabase_client()
+
+        query = supabase.table('products').select('*').gte('updated_at', self._products_watermark).order('updated_at')
+        changed = 0
+        for row in self._fetch_all(query):
+            # Las filas con updated_at igual a la marca vuelven en cada refresco
+            strip_internal_columns(row)
+            if row.get('is_active'):
+                if self._products.get(row['id']) != row:
+                    self._upsert(row)
+                    changed += 1
+            elif row['id'] in self._products:
+                self._drop(row['id'])
+                changed += 1
+            self._advance_product_watermark(row)
+
+        changed += self._drop_deleted(supabase)
+
+        self._load_ratings(supabase, incremental=True)
+
+        if changed:
+            self._indexes_dirty = True
+        self._refreshed_at = time.monotonic()
+        self._stale = False
+
+    def _drop_deleted(self, supabase) -> int:
+        """
+        Quitar de la copia los productos borrados definitivamente
+
+        Un DELETE no deja una fila con updated_at nueva y mark_catalog_stale
+        solo avisa al worker que atendió el borrado. Si el conteo de activos
+        en la base no coincide con la copia, se leen los IDs activos y se
+        quitan los que ya no están.
+
+        Returns:
+            Cantidad de productos quitados
+        """
+        result = supabase.table('products').select('id', count='exact', head=True).eq('is_active', True).execute()
+        if result.count is None or result.count == len(self._products):
+            return 0
+
+        active_ids = {
+            row['id'] for row in self._fetch_all(supabase.table('products').select('id').eq('is_active', True).order('id'))
+        }
+        removed = [product_id for product_id in self._products if product_id not in active_ids]
+        for product_id in removed:
+            self._drop(product_id)
+        if removed:
+            logger.info(f"Catálogo: {len(removed)} productos borrados en la base quitados de la copia")
+        return len(removed)
+
+    def _load_ratings(self, supabase, incremental: bool) -> None:
+        """Cargar los agregados de product_rating_stats"""
+        query = supabase.table('product_rating_stats').select('product_id, ratings_count, ratings_sum, updated_at')
+        if incremental and self._ratings_watermark:
+            query = query.gte('updated_at', self._ratings_watermark)
+
+        try:
+            rows = self._fetch_all(query.order('updated_at'))
+        except Exception as e:
+            logger.warning(f"No se pudieron cargar los agregados de calificaciones: {str(e)}")
+            return
+
+        for row in rows:
+            count = int(row.get('ratings_count') or 0)
+            stats = {
+                'rating': round(row['ratings_sum'] / count, 1) if count else 0.0,
+                'reviews': count
+            }
+            if self._ratings.get(row['product_id']) != stats:
+                self._ratings[row['product_id']] = stats
+                # La popularidad de las sugerencias depende de las calificaciones
+                self._product_suggestions = None
+            if row.get('updated_at') and (self._ratings_watermark is None or row['updated_at'] > self._ratings_watermark):
+                self._ratings_watermark = row['updated_at']
+
+    def _fetch_all(self, query) -> List[Dict]:
+        """Leer todas las filas de una consulta en bloques"""
+        rows = []
+        offset = 0
+        while True:
+            result = query.range(offset, offset + self.LOAD_PAGE_SIZE - 1).execute()
+            batch = result.data or []
+            rows.extend(batch)
+            if len(batch) < self.LOAD_PAGE_SIZE:
+                return rows
+            offset += self.LOAD_PAGE_SIZE
+
+    def _upsert(self, row: Dict) -> None:
+        strip_internal_columns(row)
+        product_id = row['id']
+        self._products[product_id] = row
+        self._search_text[product_id] = '\n'.join(
+            str(row.get(field) or '').lower() for field in ('name', 'description', 'sku')
+        )
+        self._advance_product_watermark(row)
+
+    def _drop(self, product_id) -> None:
+        self._products.pop(product_id, None)
+        self._search_text.pop(product_id, None)
+
+    def _advance_product_watermark(self, row: Dict) -> None:
+        updated_at = row.get('updated_at')
+        if updated_at and (self._products_watermark is None or updated_at > self._products_watermark):
+            self._products_watermark = updated_at
+
+    def _normalize_id(self, product_id):
+        try:
+            return int(product_id)
+        except (ValueError, TypeError):
+            return product_id
+
+    # ------------------------------------------------------------------
+    # Índices
+    # ------------------------------------------------------------------
+
+    def _rebuild_indexes(self) -> None:
+        """Reconstruir los índices secundarios tras cambios en los productos"""
+        by_category: Dict[str, Set] = {}
+        featured: Set = set()
+        by_status: Dict[Any, Set] = {}
+        in_stock: Set = set()
+        price_index = []
+
+        for product_id, row in self._products.items():
+            by_category.setdefault(row.get('category'), set()).add(product_id)
+            if row.get('is_featured'):
+                featured.add(product_id)
+            by_status.setdefault(row.get('status'), set()).add(product_id)
+            if int(row.get('stock') or 0) > 0:
+                in_stock.add(product_id)
+            price_index.append((float(row.get('price') or 0), product_id))
+
+        price_index.sort(key=lambda item: item[0])
+
+        self._by_category = by_category
+        self._featured = featured
+        self._by_status = by_status
+        self._in_stock = in_stock
+        self._price_index = price_index
+        self._prices = [item[0] for item in price_index]
+        self._ordered = sorted(self._products, key=self._order_key)
+        self._product_suggestions = None
+        self._category_suggestions = None
+        self._indexes_dirty = False
+
+    def _order_key(self, product_id):
+        # Mismo orden que list_products: created_at DESC, id DESC
+        row = self._products[product_id]
+        return (row.get('created_at') or '', product_id)
+
+    def _price_range(self, min_price: Optional[float], max_price: Optional[float]) -> Set:
+        # _prices es la lista de precios de _price_index, en el mismo orden
+        start = bisect.bisect_left(self._prices, min_price) if min_price is not None else 0
+        end = bisect.bisect_right(self._prices, max_price) if max_price is not None else len(self._prices)
+        return {item[1] for item in self._price_index[start:end]}
+
+    # ------------------------------------------------------------------
+    # Lecturas
+    # ------------------------------------------------------------------
+
+    def list_products(self, page: int, per_page: int, filters: Dict = None) -> Dict[str, Any]:
+        """
+        Listar productos activos con filtros y paginación
+
+        Args:
+            page: Número de página (1-based)
+            per_page: Elementos por página
+            filters: Mismos filtros que ProductService._apply_filters
+
+        Returns:
+            Dict con productos (con rating y reviews) y total
+        """
+        self._ensure_fresh()
+        filters = filters or {}
+
+        with self._lock:
+            if self._indexes_dirty:
+                self._rebuild_indexes()
+
+            # Los filtros exactos se resuelven con los índices; solo la
+            # búsqueda de texto necesita revisar fila por fila
+            candidates = None
+
+            def narrow(ids: Set) -> None:
+                nonlocal candidates
+                candidates = ids if candidates is None else candidates & ids
+
+            category = filters.get('category')
+            if category and category != 'all':
+                narrow(self._by_category.get(category, set()))
+
+            if filters.get('featured') is not None:
+                narrow(self._featured if filters['featured'] else set(self._products) - self._featured)
+
+            min_price = float(filters['min_price']) if filters.get('min_price') else None
+            max_price = float(filters['max_price']) if filters.get('max_price') else None
+            if min_price is not None or max_price is not None:
+                narrow(self._price_range(min_price, max_price))
+
+            if filters.get('status') and filters['status'] != 'all':
+                narrow(self._by_status.get(filters['status'], set()))
+
+            if filters.get('in_stock') is True:
+                narrow(self._in_stock)
+
+            search = filters['search'].lower() if filters.get('search') else None
+            start = (page - 1) * per_page
+            end = start + per_page
+
+            if search is None and candidates is None:
+                # Sin filtros: la página sale directo de _ordered (ascendente),
+                # contando desde el final para el orden DESC
+                size = len(self._ordered)
+                page_ids = self._ordered[max(size - end, 0):max(size - start, 0)][::-1]
+                total = size
+            elif search is None:
+                # Solo filtros indexados: el total es el tamaño del conjunto y
+                # basta ordenar los primeros `end` para armar la página
+                page_ids = heapq.nlargest(end, candidates, key=self._order_key)[start:]
+                total = len(candidates)
+            else:
+                ordered = self._ordered if candidates is None else sorted(candidates, key=self._order_key)
+                # ordered está en orden ascendente; se recorre al revés (DESC)
+                matches = [product_id for product_id in reversed(ordered)
+                           if search in self._search_text[product_id]]
+                page_ids = matches[start:end]
+                total = len(matches)
+
+            data = [self._with_ratings(product_id) for product_id in page_ids]
+
+            return {
+                'data': data,
+                'total': total,
+                'total_is_estimate': False
+            }
+
+    def get_product(self, product_id) -> Optional[Dict]:
+        """Obtener un producto activo de la copia (None si no está)"""
+        self._ensure_fresh()
+        with self._lock:
+            product_id = self._normalize_id(product_id)
+            if product_id not in self._products:
+                return None
+            return dict(self._products[product_id])
+
+    def get_categories(self) -> List[str]:
+        """Obtener las categorías con productos activos"""
+        self._ensure_fresh()
+        with self._lock:
+            if self._indexes_dirty:
+                self._rebuild_indexes()
+            return sorted(category for category, ids in self._by_category.items() if category and ids)
+
+    def suggest(self, prefix: str, limit: int = 8) -> Dict[str, List[Dict]]:
+        """
+        Sugerencias de autocompletado para un prefijo
+
+        Busca al inicio de cualquier palabra del nombre, en el SKU y en las
+        categorías, ordenando por popularidad (destacado, cantidad y promedio
+        de calificaciones).
+
+        Returns:
+            Dict con products y categories
+        """
+        self._ensure_fresh()
+        with self._lock:
+            if self._indexes_dirty:
+                self._rebuild_indexes()
+            if self._product_suggestions is None or self._category_suggestions is None:
+                self._rebuild_suggestions()
+
+            product_ids = self._product_suggestions.search(prefix, limit)
+            categories = self._category_suggestions.search(prefix, limit)
+
+            return {
+                'products': [self._suggestion(product_id) for product_id in product_ids],
+                'categories': [
+                    {'name': category, 'products': self._category_counts.get(category, 0)}
+                    for category in categories
+                ]
+            }
+
+    def _rebuild_suggestions(self) -> None:
+        """Reconstruir los índices de prefijos de productos y categorías"""
+        entries = []
+        for product_id, row in self._products.items():
+            # Cada sufijo que empieza en una palabra: 'zapato rojo' → 'zapato rojo', 'rojo'
+            words = normalize_text(row.get('name')).split()
+            for position in range(len(words)):
+                entries.append((' '.join(words[position:]), product_id))
+            if row.get('sku'):
+                entries.append((row['sku'], product_id))
+
+        def product_popularity(product_id):
+            stats = self._ratings.get(product_id, {'rating': 0.0, 'reviews': 0})
+            row = self._products[product_id]
+            return (bool(row.get('is_featured')), stats['reviews'], stats['rating'], row.get('created_at') or '', product_id)
+
+        self._category_counts = {
+            category: len(ids) for category, ids in self._by_category.items() if category and ids
+        }
+        category_entries = []
+        for category in self._category_counts:
+            words = normalize_text(category).split()
+            for position in range(len(words)):
+                category_entries.append((' '.join(words[position:]), category))
+
+        head_size = Config.PRODUCT_SUGGEST_MAX_LIMIT
+        self._product_suggestions = PrefixIndex(head_size=head_size).build(entries, product_popularity)
+        self._category_suggestions = PrefixIndex(head_size=head_size).build(
+            category_entries, lambda category: (self._category_counts[category], category)
+        )
+
+    def _suggestion(self, product_id) -> Dict:
+        row = self._products[product_id]
+        return {
+            'id': product_id,
+            'name': row.get('name'),
+            'sku': row.get('sku'),
+            'category': row.get('category'),
+            'price': row.get('price'),
+            'image_url': row.get('image_url')
+        }
+
+    def _with_ratings(self, product_id) -> Dict:
+        stats = self._ratings.get(product_id, {'rating': 0.0, 'reviews': 0})
+        return {**self._products[product_id], 'rating': stats['rating'], 'reviews': stats['reviews']}
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado de la copia en memoria"""
+        with self._lock:
+            return {
+                'products': len(self._products),
+                'products_watermark': self._products_watermark,
+                'ratings_watermark': self._ratings_watermark,
+                'stale': self._stale
+            }
+
+
+_catalog: Optional[ProductCatalog] = None
+_catalog_pid: Optional[int] = None
+_catalog_lock = threading.Lock()
+
+
+def get_product_catalog(required: bool = False) -> Optional[ProductCatalog]:
+    """
+    Obtener la copia del catálogo del proceso actual
+
+    Args:
+        required: Crear la copia aunque CATALOG_SNAPSHOT_ENABLED esté
+            desactivado (la usan las sugerencias de /products/suggest)
+
+    Returns:
+        ProductCatalog o None si CATALOG_SNAPSHOT_ENABLED está desactivado
+    """
+    global _catalog, _catalog_pid
+
+    if not Config.CATALOG_SNAPSHOT_ENABLED and not required:
+        return None
+
+    pid = os.getpid()
+    if _catalog is not None and _catalog_pid == pid:
+        return _catalog
+
+    with _catalog_lock:
+        if _catalog is None or _catalog_pid != pid:
+            _catalog = ProductCatalog()
+            _catalog_pid = pid
+        return _catalog
+
+
+def mark_catalog_stale(product_id=None, removed: bool = False) -> None:
+    """
+    Avisar a la copia del catálogo de un cambio en productos o calificaciones
+
+    Args:
+        product_id: ID del producto afectado
+        removed: True si el producto se eliminó definitivamente
+    """
+    # Solo la copia ya creada en este proceso (listados o sugerencias)
+    catalog = _catalog if _catalog_pid == os.getpid() else None
+    if catalog is None:
+        return
+
+    if removed and product_id is not None:
+        catalog.remove(product_id)
+    catalog.mark_stale()
@@ -1,12 +1,20 @@
-from supabase import create_client, Client
-from app.config import Config
+from supabase import Client
+from app.utils.pagination import apply_keyset, split_page
+from .supabase_client import get_supabase_client
+from .product_catalog import mark_catalog_stale
 import json
 from datetime import datetime
 from typing import Dict, List, Optional, Any
+import logging
+
+logger = logging.getLogger(__name__)
 
 class ProductRatingService:
+    # Intentos de update_rating cuando otra petición cambia la misma calificación
+    UPDATE_ATTEMPTS = 3
+    
     def __init__(self):
-        self.supabase: Client = create_client(Config.SUPABASE_URL, Config.SUPABASE_SERVICE_KEY)
+        self.supabase: Client = get_supabase_client()
     
     def create_rating(self, user_id: str, product_id: int, order_id: str, rating: int, comment: str = None) -> Dict[str, Any]:
         """
@@ -37,6 +45,8 @@ class ProductRatingService:
             result = self.supabase.table('product_ratings').insert(rating_data).execute()
             
             if result.data:
+                if rating_data['is_approved']:
+                    self._apply_stats_delta(product_id, added=rating)
                 return {
                     'success': True,
                     'data': result.data[0],
@@ -63,7 +73,7 @@ class ProductRatingService:
             return None
             
         except Exception as e:
-            print(f"Error getting user product rating: {e}")
+            logger.error("Error getting user product rating: %s", e)
             return None
     
     def can_user_rate_product(self, user_id: str, product_id: int, order_id: str) -> bool:
@@ -71,8 +81,6 @@ class ProductRatingService:
         Verificar si un usuario puede calificar un producto
         """
         try:
-            print(f"DEBUG: Checking if user {user_id} can rate product {product_id} for order {order_id}")
-            
             # Verificar que el usuario haya comprado el producto en la orden y que esté entregada
             result = self.supabase.rpc('can_user_rate_product', {
                 'user_id_param': user_id,
@@ -80,8 +88,6 @@ class ProductRatingService:
                 'order_id_param': order_id
             }).execute()
             
-            print(f"DEBUG: RPC result: {result.data}")
-            
             # Manejar diferentes tipos de respuesta
             if result.data is None:
                 can_rate = False
@@ -92,19 +98,42 @@ class ProductRatingService:
             else:
                 can_rate = False
                 
-            print(f"DEBUG: Can rate result: {can_rate}")
+            logger.debug("can_user_rate_product: user %s, product %s, order %s -> %s",
+                         user_id, product_id, order_id, can_rate)
             
             return can_rate
             
         except Exception as e:
-            print(f"Error checking if user can rate product: {e}")
+            logger.error("Error checking if user can rate product: %s", e)
             return False
     
-    def get_product_ratings(self, product_id: int, page: int = 1, per_page: int = 10) -> Dict[str, Any]:
+    def get_product_ratings(self, product_id: int, page: int = 1, per_page: int = 10,
+                            cursor: Optional[str] = None) -> Dict[str, Any]:
         """
         Obtener calificaciones de un producto con paginación
+        
+        Si se indica cursor (aunque sea vacío) se usa paginación por cursor
+        sobre (created_at, id) en lugar de offset y no se calcula el total.
         """
         try:
+            if cursor is not None:
+                query = self.supabase.table('product_ratings').select(
+                    '*, users(first_name, last_name)'
+                ).eq('product_id', product_id).eq('is_approved', True)
+                
+                result = apply_keyset(query, cursor).limit(per_page + 1).execute()
+                ratings, next_cursor = split_page(result.data, per_page)
+                
+                return {
+                    'success': True,
+                    'data': ratings,
+                    'pagination': {
+                        'per_page': per_page,
+                        'next_cursor': next_cursor,
+                        'has_more': next_cursor is not None
+                    }
+                }
+            
             # Calcular offset
             offset = (page - 1) * per_page
             
@@ -137,28 +166,38 @@ class ProductRatingService:
     def get_product_rating_stats(self, product_id: int) -> Dict[str, Any]:
         """
         Obtener estadísticas de calificaciones de un producto
+        
+        Lee los agregados de product_rating_stats (mantenidos en cada
+        escritura) en lugar de recalcularlos sobre product_ratings.
         """
         try:
-            # Usar la función RPC para obtener estadísticas
-            result = self.supabase.rpc('get_product_rating_stats', {
-                'product_id_param': product_id
-            }).execute()
+            try:
+                stats_result = self.supabase.table('product_rating_stats').select('*').eq('product_id', product_id).execute()
+            except Exception as e:
+                # Fallback si la tabla de agregados no existe
+                logger.warning("No se pudo leer product_rating_stats, usando RPC: %s", e)
+                return self._get_product_rating_stats_rpc(product_id)
+            
+            stats = stats_result.data[0] if stats_result.data else {}
+            total = int(stats.get('ratings_count') or 0)
+            average = round(int(stats.get('ratings_sum') or 0) / total, 2) if total else 0.00
+            
+            recent_ratings = []
+            if total:
+                recent_result = self.supabase.table('product_ratings').select(
+                    'id, rating, comment, created_at, users(first_name, last_name)'
+                ).eq('product_id', product_id).eq('is_approved', True).order('created_at', desc=True).limit(5).execute()
+                recent_ratings = recent_result.data or []
             
-            if result.data:
-                return {
-                    'success': True,
-                    'data': result.data[0]
-                }
-            else:
-                return {
-                    'success': True,
-                    'data': {
-                        'average_rating': 0.00,
-                        'total_ratings': 0,
-                        'rating_distribution': {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0},
-                        'recent_ratings': []
-                    }
+            return {
+                'success': True,
+                'data': {
+                    'average_rating': average,
+                    'total_ratings': total,
+                    'rating_distribution': {str(star): int(stats.get(f'count_{star}') or 0) for star in range(1, 6)},
+                    'recent_ratings': recent_ratings
                 }
+            }
                 
         except Exception as e:
             return {
@@ -166,34 +205,121 @@ class ProductRatingService:
                 'error': str(e)
             }
     
-    def update_rating(self, rating_id: str, user_id: str, rating: int, comment: str = None) -> Dict[str, Any]:
+    def _get_product_rating_stats_rpc(self, product_id: int) -> Dict[str, Any]:
         """
-        Actualizar una calificación existente
+        Obtener estadísticas de calificaciones agregando product_ratings con la RPC
+        """
+        # Usar la función RPC para obtener estadísticas
+        result = self.supabase.rpc('get_product_rating_stats', {
+            'product_id_param': product_id
+        }).execute()
+        
+        if result.data:
+            return {
+                'success': True,
+                'data': result.data[0]
+            }
+        else:
+            return {
+                'success': True,
+                'data': {
+                    'average_rating': 0.00,
+                    'total_ratings': 0,
+                    'rating_distribution': {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0},
+                    'recent_ratings': []
+                }
+            }
+    
+    def _apply_stats_delta(self, product_id: int, removed: Optional[int] = None, added: Optional[int] = None) -> None:
         """
+        Actualizar de forma incremental los agregados de un producto
+        
+        Args:
+            product_id: ID del producto
+            removed: Calificación aprobada que deja de contar
+            added: Calificación aprobada que empieza a contar
+        """
+        if removed is None and added is None:
+            return
+        
         try:
-            # Verificar que la calificación pertenezca al usuario
-            existing_rating = self.supabase.table('product_ratings').select('*').eq('id', rating_id).eq('user_id', user_id).execute()
-            
-            if not existing_rating.data:
-                raise Exception("Calificación no encontrada o no tienes permisos para editarla")
+            self.supabase.rpc('apply_product_rating_delta', {
+                'p_product_id': product_id,
+                'p_removed': removed,
+                'p_added': added
+            }).execute()
+            mark_catalog_stale(product_id)
+        except Exception as e:
+            # No fallar la escritura; rebuild_rating_stats repara el desvío
+            logger.error("Error updating product rating stats for product %s: %s", product_id, e)
+    
+    def rebuild_rating_stats(self, product_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Recalcular los agregados de calificaciones desde product_ratings
+        
+        Args:
+            product_id: ID del producto (None recalcula todos)
+        """
+        try:
+            result = self.supabase.rpc('rebuild_product_rating_stats', {
+                'p_product_id': product_id
+            }).execute()
             
-            # Actualizar la calificación
-            update_data = {
-                'rating': rating,
-                'comment': comment,
-                'updated_at': datetime.utcnow().isoformat()
+            return {
+                'success': True,
+                'data': {'products_rebuilt': result.data if result.data is not None else 0},
+                'message': 'Estadísticas de calificaciones recalculadas exitosamente'
             }
             
-            result = self.supabase.table('product_ratings').update(update_data).eq('id', rating_id).eq('user_id', user_id).execute()
-            
-            if result.data:
-                return {
-                    'success': True,
-                    'data': result.data[0],
-                    'message': 'Calificación actualizada exitosamente'
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def update_rating(self, rating_id: str, user_id: str, rating: int, comment: str = None) -> Dict[str, Any]:
+        """
+        Actualizar una calificación existente
+        
+        La escritura es condicional sobre la calificación y el estado de
+        aprobación leídos: si otra petición los cambió entre medio, se vuelve
+        a leer y se reintenta, así el cambio en los agregados sale de la fila
+        que realmente se modificó.
+        """
+        try:
+            for _ in range(self.UPDATE_ATTEMPTS):
+                # Verificar que la calificación pertenezca al usuario
+                existing_rating = self.supabase.table('product_ratings').select('*').eq('id', rating_id).eq('user_id', user_id).execute()
+                
+                if not existing_rating.data:
+                    raise Exception("Calificación no encontrada o no tienes permisos para editarla")
+                
+                previous = existing_rating.data[0]
+                
+                # Actualizar la calificación solo si sigue como se leyó
+                update_data = {
+                    'rating': rating,
+                    'comment': comment,
+                    'updated_at': datetime.utcnow().isoformat()
                 }
-            else:
-                raise Exception("Error al actualizar la calificación")
+                
+                query = self.supabase.table('product_ratings').update(update_data).eq('id', rating_id).eq('user_id', user_id).eq('rating', previous.get('rating'))
+                if previous.get('is_approved'):
+                    query = query.eq('is_approved', True)
+                else:
+                    query = query.not_.is_('is_approved', 'true')
+                result = query.execute()
+                
+                if result.data:
+                    if previous.get('is_approved'):
+                        self._apply_stats_delta(previous['product_id'], removed=previous.get('rating'), added=rating)
+                    return {
+                        'success': True,
+                        'data': result.data[0],
+                        'message': 'Calificación actualizada exitosamente'
+                    }
+            
+            raise Exception("Error al actualizar la calificación: se modificó al mismo tiempo, intenta de nuevo")
                 
         except Exception as e:
             return {
@@ -215,6 +341,10 @@ class ProductRatingService:
             # Eliminar la calificación
             result = self.supabase.table('product_ratings').delete().eq('id', rating_id).eq('user_id', user_id).execute()
             
+            previous = existing_rating.data[0]
+            if result.data and previous.get('is_approved'):
+                self._apply_stats_delta(previous['product_id'], removed=previous.get('rating'))
+            
             return {
                 'success': True,
                 'message': 'Calificación eliminada exitosamente'
@@ -297,21 +427,34 @@ class ProductRatingService:
     def approve_rating(self, rating_id: str) -> Dict[str, Any]:
         """
         Aprobar una calificación (solo para admins)
+        
+        El cambio de estado es condicional (solo si aún no estaba aprobada),
+        así dos aprobaciones simultáneas no suman la calificación dos veces.
         """
         try:
             result = self.supabase.table('product_ratings').update({
                 'is_approved': True,
                 'updated_at': datetime.utcnow().isoformat()
-            }).eq('id', rating_id).execute()
+            }).eq('id', rating_id).not_.is_('is_approved', 'true').execute()
             
             if result.data:
+                approved = result.data[0]
+                self._apply_stats_delta(approved['product_id'], added=approved.get('rating'))
                 return {
                     'success': True,
-                    'data': result.data[0],
+                    'data': approved,
                     'message': 'Calificación aprobada exitosamente'
                 }
-            else:
-                raise Exception("Error al aprobar la calificación")
+            
+            # Ya estaba aprobada (o no existe): no hay cambio en los agregados
+            current = self.supabase.table('product_ratings').select('*').eq('id', rating_id).execute()
+            if current.data:
+                return {
+                    'success': True,
+                    'data': current.data[0],
+                    'message': 'Calificación aprobada exitosamente'
+                }
+            raise Exception("Error al aprobar la calificación")
                 
         except Exception as e:
             return {
@@ -322,14 +465,25 @@ class ProductRatingService:
     def reject_rating(self, rating_id: str, reason: str) -> Dict[str, Any]:
         """
         Rechazar una calificación (solo para admins)
+        
+        Solo se descuenta de los agregados si esta llamada fue la que la pasó
+        de aprobada a rechazada.
         """
         try:
-            result = self.supabase.table('product_ratings').update({
+            rejection = {
                 'is_approved': False,
                 'is_flagged': True,
                 'flag_reason': reason,
                 'updated_at': datetime.utcnow().isoformat()
-            }).eq('id', rating_id).execute()
+            }
+            
+            result = self.supabase.table('product_ratings').update(rejection).eq('id', rating_id).eq('is_approved', True).execute()
+            
+            if result.data:
+                self._apply_stats_delta(result.data[0]['product_id'], removed=result.data[0].get('rating'))
+            else:
+                # No estaba aprobada: solo registrar la marca y el motivo
+                result = self.supabase.table('product_ratings').update(rejection).eq('id', rating_id).execute()
             
             if result.data:
                 return {
@@ -344,4 +498,4 @@ class ProductRatingService:
             return {
                 'success': False,
                 'error': str(e)
-            } 
\ No newline at end of file
+            }
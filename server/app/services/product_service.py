@@ -1,24 +1,28 @@
-import os
-from supabase import create_client, Client
+import re
+from supabase import Client
 from typing import Dict, List, Optional, Any
 import logging
+from app.config import Config
+from app.utils.concurrency import run_concurrently
+from app.utils.pagination import apply_keyset, split_page
+from .supabase_client import get_supabase_client, is_missing_column_error, is_missing_function_error
+from .product_catalog import get_product_catalog, mark_catalog_stale, strip_internal_columns
+from .category_service import invalidate_category_cache
 from datetime import datetime
 import uuid
 
 logger = logging.getLogger(__name__)
 
 class ProductService:
+    # Tipos de conteo soportados por PostgREST y por la RPC list_products
+    COUNT_MODES = ('exact', 'planned', 'estimated')
+    
     def __init__(self):
         """Inicializar el cliente de Supabase"""
-        supabase_url = os.getenv('SUPABASE_URL')
-        supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
-        
-        if not supabase_url or not supabase_key:
-            raise ValueError("SUPABASE_URL y SUPABASE_SERVICE_KEY deben estar configurados")
-        
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+        self.supabase: Client = get_supabase_client()
     
-    def get_products(self, page: int = 1, per_page: int = 10, filters: Dict = None) -> Dict[str, Any]:
+    def get_products(self, page: int = 1, per_page: int = 10, filters: Dict = None,
+                     count_mode: str = None) -> Dict[str, Any]:
         """
         Obtener productos con paginación y filtros
         
@@ -26,46 +30,36 @@ class ProductService:
             page: Número de página (1-based)
             per_page: Elementos por página
             filters: Diccionario con filtros (category, status, search, min_price, max_price)
+            count_mode: Tipo de conteo del total ('exact', 'planned', 'estimated').
+                Si no se indica se usa PRODUCTS_COUNT_MODE, pasando a 'estimated'
+                desde la página PRODUCTS_ESTIMATED_COUNT_FROM_PAGE
         
         Returns:
             Dict con productos, total y metadata
         """
         try:
-            print(f"=== DEBUG: Iniciando get_products ===")
-            print(f"Parámetros: page={page}, per_page={per_page}, filters={filters}")
-            
-            # Primero obtener el total sin paginación para el conteo
-            count_query = self.supabase.table('products').select('id', count='exact').eq('is_active', True)
-            
-            # Aplicar filtros al conteo
-            if filters:
-                count_query = self._apply_filters(count_query, filters)
+            logger.debug("get_products: page=%s, per_page=%s, filters=%s", page, per_page, filters)
             
-            # Ejecutar conteo
-            count_result = count_query.execute()
-            total_count = count_result.count
+            result = self._list_products_catalog(page, per_page, filters or {})
             
-            # Ahora obtener los datos con paginación
-            query = self.supabase.table('products').select('*').eq('is_active', True)
-            
-            # Aplicar filtros a la consulta de datos
-            if filters:
-                query = self._apply_filters(query, filters)
-            
-            # Aplicar paginación
-            from_range = (page - 1) * per_page
-            to_range = from_range + per_page - 1
-            query = query.range(from_range, to_range)
-            
-            # Ejecutar consulta de datos
-            result = query.execute()
+            if result is None:
+                count_mode = self._resolve_count_mode(page, count_mode)
+                
+                try:
+                    result = self._list_products_rpc(page, per_page, filters or {}, count_mode)
+                except Exception as rpc_error:
+                    # Fallback solo si la función RPC no existe en la base de datos
+                    if not is_missing_function_error(rpc_error):
+                        raise
+                    logger.warning(f"RPC list_products no disponible, usando consultas separadas: {str(rpc_error)}")
+                    result = self._list_products_queries(page, per_page, filters, count_mode)
             
-            # Obtener estadísticas de calificaciones para los productos
-            products_with_ratings = self._add_rating_stats_to_products(result.data or [])
+            total_count = result['total'] or 0
             
             return {
-                'data': products_with_ratings,
+                'data': result['data'],
                 'total': total_count,
+                'total_is_estimate': result['total_is_estimate'],
                 'page': page,
                 'per_page': per_page,
                 'total_pages': (total_count + per_page - 1) // per_page
@@ -75,25 +69,155 @@ class ProductService:
             logger.error(f"Error en get_products: {str(e)}")
             raise Exception(f"Error al obtener productos: {str(e)}")
     
+    def get_products_after(self, cursor: Optional[str], per_page: int = 10, filters: Dict = None) -> Dict[str, Any]:
+        """
+        Obtener productos con paginación por cursor (keyset sobre created_at, id)
+        
+        Args:
+            cursor: Cursor devuelto en la página anterior (None o vacío para la primera)
+            per_page: Elementos por página
+            filters: Diccionario con filtros (category, status, search, min_price, max_price)
+        
+        Returns:
+            Dict con productos, next_cursor y has_more
+        """
+        try:
+            def build_query(full_text: bool):
+                query = self.supabase.table('products').select('*').eq('is_active', True)
+                if filters:
+                    query = self._apply_filters(query, filters, full_text=full_text)
+                return apply_keyset(query, cursor).limit(per_page + 1)
+            
+            if filters and filters.get('search'):
+                try:
+                    result = build_query(full_text=True).execute()
+                except ValueError:
+                    raise
+                except Exception as search_error:
+                    # Fallback solo si la columna search_vector no existe en la base de datos
+                    if not is_missing_column_error(search_error):
+                        raise
+                    logger.warning(f"Búsqueda de texto completo no disponible, usando ilike: {str(search_error)}")
+                    result = build_query(full_text=False).execute()
+            else:
+                result = build_query(full_text=False).execute()
+            
+            products, next_cursor = split_page([strip_internal_columns(row) for row in result.data or []], per_page)
+            
+            return {
+                'data': self._add_rating_stats_to_products(products),
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+            
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error en get_products_after: {str(e)}")
+            raise Exception(f"Error al obtener productos: {str(e)}")
+    
+    def _list_products_catalog(self, page: int, per_page: int, filters: Dict) -> Optional[Dict[str, Any]]:
+        """Resolver el listado desde la copia en memoria del catálogo (None si no está disponible)"""
+        catalog = get_product_catalog()
+        if catalog is None:
+            return None
+        
+        try:
+            return catalog.list_products(page, per_page, filters)
+        except Exception as catalog_error:
+            logger.warning(f"Catálogo en memoria no disponible, consultando Supabase: {str(catalog_error)}")
+            return None
+    
+    def _resolve_count_mode(self, page: int, count_mode: Optional[str]) -> str:
+        """Elegir el tipo de conteo del total según la configuración y la página"""
+        if count_mode in self.COUNT_MODES:
+            return count_mode
+        
+        count_mode = Config.PRODUCTS_COUNT_MODE if Config.PRODUCTS_COUNT_MODE in self.COUNT_MODES else 'exact'
+        from_page = Config.PRODUCTS_ESTIMATED_COUNT_FROM_PAGE
+        if count_mode == 'exact' and from_page > 0 and page >= from_page:
+            return 'estimated'
+        return count_mode
+    
+    def _list_products_rpc(self, page: int, per_page: int, filters: Dict, count_mode: str) -> Dict[str, Any]:
+        """
+        Obtener la página, el total y las calificaciones en un solo round-trip
+        mediante la función RPC list_products
+        """
+        params = {
+            'p_category': filters['category'] if filters.get('category') and filters['category'] != 'all' else None,
+            'p_status': filters['status'] if filters.get('status') and filters['status'] != 'all' else None,
+            'p_search': filters.get('search') or None,
+            'p_min_price': float(filters['min_price']) if filters.get('min_price') else None,
+            'p_max_price': float(filters['max_price']) if filters.get('max_price') else None,
+            'p_featured': filters.get('featured'),
+            'p_in_stock': True if filters.get('in_stock') is True else None,
+            'p_limit': per_page,
+            'p_offset': (page - 1) * per_page,
+            'p_count_mode': count_mode,
+            'p_estimate_threshold': Config.PRODUCTS_ESTIMATE_THRESHOLD
+        }
+        
+        result = self.supabase.rpc('list_products', params).execute()
+        payload = result.data or {}
+        
+        return {
+            'data': payload.get('data') or [],
+            'total': payload.get('total'),
+            'total_is_estimate': bool(payload.get('total_is_estimate'))
+        }
+    
+    def _list_products_queries(self, page: int, per_page: int, filters: Dict, count_mode: str) -> Dict[str, Any]:
+        """
+        Obtener la página con consultas separadas (conteo, datos y calificaciones)
+        """
+        # Primero obtener el total sin paginación para el conteo
+        count_query = self.supabase.table('products').select('id', count=count_mode).eq('is_active', True)
+        
+        # Aplicar filtros al conteo
+        if filters:
+            count_query = self._apply_filters(count_query, filters)
+        
+        # Ahora obtener los datos con paginación
+        query = self.supabase.table('products').select('*').eq('is_active', True)
+        
+        # Aplicar filtros a la consulta de datos
+        if filters:
+            query = self._apply_filters(query, filters)
+        
+        # Aplicar orden y paginación
+        from_range = (page - 1) * per_page
+        to_range = from_range + per_page - 1
+        query = query.order('created_at', desc=True).order('id', desc=True).range(from_range, to_range)
+        
+        # Ejecutar conteo y datos en paralelo
+        count_result, result = run_concurrently(count_query.execute, query.execute)
+        total_count = count_result.count
+        
+        # Obtener estadísticas de calificaciones para los productos
+        products_with_ratings = self._add_rating_stats_to_products([strip_internal_columns(row) for row in result.data or []])
+        
+        return {
+            'data': products_with_ratings,
+            'total': total_count,
+            'total_is_estimate': count_mode != 'exact'
+        }
+    
     def _add_rating_stats_to_products(self, products: List[Dict]) -> List[Dict]:
         """
         Agregar estadísticas de calificaciones a una lista de productos
         """
         try:
-            print(f"=== DEBUG: _add_rating_stats_to_products ===")
-            print(f"Número de productos: {len(products)}")
-            
             if not products:
-                print("No hay productos, retornando lista vacía")
                 return products
             
             # Obtener IDs de productos
             product_ids = [product['id'] for product in products]
-            print(f"Product IDs extraídos: {product_ids}")
             
             # Obtener estadísticas de calificaciones para todos los productos
             rating_stats = self._get_rating_stats_for_products(product_ids)
-            print(f"Rating stats obtenidos: {rating_stats}")
+            logger.debug("Calificaciones de %d productos (%d con estadísticas)", len(products), len(rating_stats))
             
             # Agregar estadísticas a cada producto
             for product in products:
@@ -105,14 +229,11 @@ class ProductService:
                 
                 product['rating'] = round(stats['average_rating'], 1)
                 product['reviews'] = stats['total_ratings']
-                
-                print(f"Producto {product_id} ({product.get('name', 'N/A')}): rating={product['rating']}, reviews={product['reviews']}")
             
             return products
             
         except Exception as e:
-            print(f"ERROR en _add_rating_stats_to_products: {str(e)}")
-            logger.error(f"Error agregando estadísticas de calificaciones: {str(e)}")
+            logger.error("Error agregando estadísticas de calificaciones: %s", e)
             # Si hay error, devolver productos sin estadísticas
             for product in products:
                 product['rating'] = 0.0
@@ -124,51 +245,69 @@ class ProductService:
         Obtener estadísticas de calificaciones para múltiples productos
         """
         try:
-            print(f"=== DEBUG: _get_rating_stats_for_products ===")
-            print(f"Product IDs recibidos: {product_ids}")
-            
             if not product_ids:
-                print("No hay product_ids, retornando diccionario vacío")
                 return {}
             
+            # Agregados mantenidos en escritura (product_rating_stats)
+            try:
+                aggregates = self.supabase.table('product_rating_stats').select(
+                    'product_id, ratings_count, ratings_sum'
+                ).in_('product_id', product_ids).execute()
+                
+                return {
+                    stat['product_id']: {
+                        'average_rating': stat['ratings_sum'] / stat['ratings_count'] if stat['ratings_count'] else 0.0,
+                        'total_ratings': int(stat['ratings_count'] or 0)
+                    }
+                    for stat in (aggregates.data or [])
+                }
+            except Exception as aggregates_error:
+                # Fallback si la tabla de agregados no existe
+                logger.warning(f"product_rating_stats no disponible, usando RPC: {str(aggregates_error)}")
+            
             # Consulta para obtener estadísticas de calificaciones
-            print(f"Llamando a RPC get_products_rating_stats con: {product_ids}")
             result = self.supabase.rpc('get_products_rating_stats', {
                 'product_ids': product_ids
             }).execute()
             
-            print(f"Resultado RPC: {result.data}")
-            
             if result.data:
                 # Convertir a diccionario con product_id como clave
                 stats_dict = {}
                 for stat in result.data:
-                    print(f"Procesando stat: {stat}")
                     stats_dict[stat['product_id']] = {
                         'average_rating': float(stat['average_rating']) if stat['average_rating'] else 0.0,
                         'total_ratings': int(stat['total_ratings']) if stat['total_ratings'] else 0
                     }
-                
-                print(f"Stats dict final: {stats_dict}")
                 return stats_dict
             else:
-                print("No hay datos en result.data, retornando diccionario vacío")
                 return {}
                 
         except Exception as e:
-            print(f"ERROR en _get_rating_stats_for_products: {str(e)}")
-            logger.error(f"Error obteniendo estadísticas de calificaciones: {str(e)}")
+            logger.error("Error obteniendo estadísticas de calificaciones: %s", e)
             return {}
     
-    def _apply_filters(self, query, filters: Dict):
-        """Aplicar filtros a una consulta"""
+    def _apply_filters(self, query, filters: Dict, full_text: bool = False):
+        """
+        Aplicar filtros a una consulta
+        
+        Con full_text el filtro search usa search_vector (ver §1 de
+        database/api_functions.sql) en lugar de ilike sobre cada columna.
+        """
         if filters.get('category') and filters['category'] != 'all':
             query = query.eq('category', filters['category'])
         
         if filters.get('status') and filters['status'] != 'all':
             query = query.eq('status', filters['status'])
         
-        if filters.get('search'):
+        if filters.get('search') and full_text:
+            search_term = filters['search']
+            tsquery = self._build_search_tsquery(search_term)
+            sku_prefix = self._quote_filter_value(f'{search_term}*')
+            if tsquery:
+                query = query.or_(f'search_vector.fts(es_unaccent).{self._quote_filter_value(tsquery)},sku.ilike.{sku_prefix}')
+            else:
+                query = query.or_(f'sku.ilike.{sku_prefix}')
+        elif filters.get('search'):
             search_term = filters['search']
             query = query.or_(
                 f'name.ilike.%{search_term}%,description.ilike.%{search_term}%,sku.ilike.%{search_term}%'
@@ -188,6 +327,23 @@ class ProductService:
         
         return query
     
+    @staticmethod
+    def _build_search_tsquery(search_term: str) -> Optional[str]:
+        """Convertir el término del usuario en un tsquery con prefijos ('zapato roj' → 'zapato:* & roj:*')"""
+        words = re.findall(r'\w+', search_term.lower())
+        return ' & '.join(f'{word}:*' for word in words) or None
+    
+    @staticmethod
+    def _quote_filter_value(value: str) -> str:
+        """Entrecomillar un valor para usarlo dentro de un filtro or_ de PostgREST"""
+        escaped = value.replace('\\', '\\\\').replace('"', '\\"')
+        return f'"{escaped}"'
+    
+    def _products_changed(self, product_id, removed: bool = False) -> None:
+        """Avisar a las copias en memoria (catálogo y conteos por categoría) de un cambio"""
+        mark_catalog_stale(product_id, removed=removed)
+        invalidate_category_cache()
+    
     def get_product_by_id(self, product_id) -> Optional[Dict]:
         """
         Obtener un producto por ID
@@ -204,18 +360,24 @@ class ProductService:
                 try:
                     product_id_int = int(product_id)
                 except (ValueError, TypeError):
-                    print(f"Error: ID de producto inválido: {product_id}")
+                    logger.warning("ID de producto inválido: %s", product_id)
                     return None
             else:
                 product_id_int = product_id
             
-            print(f"=== DEBUG: Buscando producto con ID: {product_id_int} ===")
-            result = self.supabase.table('products').select('*').eq('id', product_id_int).execute()
+            catalog = get_product_catalog()
+            if catalog is not None:
+                try:
+                    product = catalog.get_product(product_id_int)
+                    if product is not None:
+                        return product
+                except Exception as catalog_error:
+                    logger.warning(f"Catálogo en memoria no disponible, consultando Supabase: {str(catalog_error)}")
             
-            print(f"Resultado de búsqueda: {result.data}")
+            result = self.supabase.table('products').select('*').eq('id', product_id_int).execute()
             
             if result.data and len(result.data) > 0:
-                return result.data[0]
+                return strip_internal_columns(result.data[0])
             return None
             
         except Exception as e:
@@ -281,7 +443,8 @@ class ProductService:
             result = self.supabase.table('products').insert(insert_data).execute()
             
             if result.data and len(result.data) > 0:
-                return result.data[0]
+                self._products_changed(result.data[0].get('id'))
+                return strip_internal_columns(result.data[0])
             else:
                 raise Exception("Error al crear el producto")
                 
@@ -301,8 +464,7 @@ class ProductService:
             Dict con el producto actualizado
         """
         try:
-            print(f"=== DEBUG: Actualizando producto {product_id} ===")
-            print(f"Datos recibidos: {product_data}")
+            logger.debug("update_product %s: campos recibidos %s", product_id, list(product_data))
             
             # Convertir product_id a entero si es necesario
             try:
@@ -313,15 +475,11 @@ class ProductService:
             except (ValueError, TypeError):
                 raise ValueError(f"ID de producto inválido: {product_id}")
             
-            print(f"ID convertido: {product_id_int}, tipo: {type(product_id_int)}")
-            
             # Verificar que el producto existe
             existing_product = self.get_product_by_id(product_id_int)
             if not existing_product:
                 raise ValueError("Producto no encontrado")
             
-            print(f"Producto existente: {existing_product}")
-            
             # Validar precio si se proporciona
             if 'price' in product_data:
                 try:
@@ -367,36 +525,21 @@ class ProductService:
                     except (ValueError, TypeError) as e:
                         raise ValueError(f"Error procesando campo '{field}': {str(e)}")
             
-            print(f"Datos a actualizar: {update_data}")
-            print(f"Campos en update_data: {list(update_data.keys())}")
-            print(f"original_price en update_data: {update_data.get('original_price')}")
-            print(f"Tipo de original_price: {type(update_data.get('original_price'))}")
+            logger.debug("update_product %s: actualizando campos %s", product_id_int, list(update_data))
             
             # Actualizar producto
-            print(f"Ejecutando actualización con ID: {product_id_int}, tipo: {type(product_id_int)}")
-            print(f"Datos de actualización: {update_data}")
-            
             result = self.supabase.table('products').update(update_data).eq('id', product_id_int).execute()
-            
-            print(f"Resultado de actualización: {result.data}")
-            print(f"Tipo de resultado: {type(result.data)}")
-            print(f"Longitud del resultado: {len(result.data) if result.data else 0}")
+            self._products_changed(product_id_int)
             
             if result.data and len(result.data) > 0:
-                updated_product = result.data[0]
-                print(f"Producto actualizado devuelto: {updated_product}")
-                print(f"original_price en producto actualizado: {updated_product.get('original_price')}")
-                return updated_product
+                return strip_internal_columns(result.data[0])
             else:
                 # Intentar obtener el producto después de la actualización para verificar
                 check_result = self.supabase.table('products').select('*').eq('id', product_id_int).execute()
-                print(f"Verificación post-actualización: {check_result.data}")
                 
                 if check_result.data and len(check_result.data) > 0:
-                    checked_product = check_result.data[0]
-                    print("Producto encontrado después de actualización, pero la actualización no devolvió datos")
-                    print(f"original_price en producto verificado: {checked_product.get('original_price')}")
-                    return checked_product
+                    logger.warning("La actualización del producto %s no devolvió datos; se leyó de nuevo", product_id_int)
+                    return strip_internal_columns(check_result.data[0])
                 else:
                     raise Exception("Error al actualizar el producto - producto no encontrado después de actualización")
                 
@@ -404,6 +547,71 @@ class ProductService:
             logger.error(f"Error en update_product: {str(e)}")
             raise Exception(f"Error al actualizar producto: {str(e)}")
     
+    def get_products_by_ids(self, product_ids: List[int]) -> List[Dict]:
+        """
+        Obtener varios productos por ID (en bloques de 200 por consulta)
+        
+        Args:
+            product_ids: IDs de los productos
+        
+        Returns:
+            Lista de productos encontrados (los IDs inexistentes se omiten)
+        """
+        try:
+            ids = list(dict.fromkeys(int(product_id) for product_id in product_ids))
+            products = []
+            for start in range(0, len(ids), 200):
+                result = self.supabase.table('products').select('*').in_('id', ids[start:start + 200]).execute()
+                products.extend(strip_internal_columns(row) for row in result.data or [])
+            return products
+            
+        except (ValueError, TypeError):
+            raise ValueError("Los IDs de producto deben ser números enteros")
+        except Exception as e:
+            logger.error(f"Error en get_products_by_ids: {str(e)}")
+            raise Exception(f"Error al obtener productos: {str(e)}")
+    
+    def update_product_descriptions(self, descriptions: Dict[int, str]) -> List[int]:
+        """
+        Guardar descripciones de varios productos en una sola llamada
+        
+        Usa la RPC update_product_descriptions (ver database/api_functions.sql
+        §8); solo si la función no existe actualiza uno por uno con
+        update_product. Cualquier otro error de la RPC se propaga.
+        
+        Args:
+            descriptions: ID del producto → descripción
+        
+        Returns:
+            IDs de los productos actualizados
+        """
+        if not descriptions:
+            return []
+        
+        try:
+            items = [{'id': int(product_id), 'description': text} for product_id, text in descriptions.items()]
+            result = self.supabase.rpc('update_product_descriptions', {'p_items': items}).execute()
+            updated = [row if isinstance(row, int) else next(iter(row.values())) for row in (result.data or [])]
+        except Exception as rpc_error:
+            # Fallback solo si la función RPC no existe: un error transitorio no
+            # debe convertir una escritura en lote en una por producto
+            if not is_missing_function_error(rpc_error):
+                raise
+            logger.warning(f"RPC update_product_descriptions no disponible, actualizando uno por uno: {str(rpc_error)}")
+            updated = []
+            for product_id, text in descriptions.items():
+                try:
+                    self.update_product(product_id, {'description': text})
+                    updated.append(int(product_id))
+                except Exception as e:
+                    logger.error(f"Error al guardar la descripción del producto {product_id}: {str(e)}")
+            return updated
+        
+        # Las descripciones no cambian los conteos por categoría: solo el catálogo
+        for product_id in updated:
+            mark_catalog_stale(product_id)
+        return updated
+    
     def delete_product(self, product_id: str) -> bool:
         """
         Eliminar un producto (soft delete)
@@ -415,8 +623,6 @@ class ProductService:
             True si se eliminó correctamente
         """
         try:
-            print(f"=== DEBUG: Eliminando producto {product_id} ===")
-            
             # Convertir product_id a entero si es necesario
             try:
                 if isinstance(product_id, str):
@@ -426,23 +632,18 @@ class ProductService:
             except (ValueError, TypeError):
                 raise ValueError(f"ID de producto inválido: {product_id}")
             
-            print(f"ID convertido: {product_id_int}, tipo: {type(product_id_int)}")
-            
             # Verificar que el producto existe
             existing_product = self.get_product_by_id(product_id_int)
             if not existing_product:
                 raise ValueError("Producto no encontrado")
             
-            print(f"Producto encontrado: {existing_product.get('name')}")
-            
             # Soft delete - marcar como inactivo
             result = self.supabase.table('products').update({
                 'is_active': False,
                 'status': 'Inactivo'
             }).eq('id', product_id_int).execute()
-            
-            print(f"Resultado de eliminación: {result.data}")
-            print(f"Filas afectadas: {len(result.data) if result.data else 0}")
+            self._products_changed(product_id_int)
+            logger.info("Producto %s desactivado (%d filas)", product_id_int, len(result.data or []))
             
             return len(result.data) > 0
             
@@ -461,8 +662,6 @@ class ProductService:
             True si se eliminó correctamente
         """
         try:
-            print(f"=== DEBUG: Eliminación permanente de producto {product_id} ===")
-            
             # Convertir product_id a entero si es necesario
             try:
                 if isinstance(product_id, str):
@@ -472,20 +671,15 @@ class ProductService:
             except (ValueError, TypeError):
                 raise ValueError(f"ID de producto inválido: {product_id}")
             
-            print(f"ID convertido: {product_id_int}, tipo: {type(product_id_int)}")
-            
             # Verificar que el producto existe
             existing_product = self.get_product_by_id(product_id_int)
             if not existing_product:
                 raise ValueError("Producto no encontrado")
             
-            print(f"Producto encontrado: {existing_product.get('name')}")
-            
             # Eliminación permanente
             result = self.supabase.table('products').delete().eq('id', product_id_int).execute()
-            
-            print(f"Resultado de eliminación permanente: {result.data}")
-            print(f"Filas eliminadas: {len(result.data) if result.data else 0}")
+            self._products_changed(product_id_int, removed=True)
+            logger.info("Producto %s eliminado permanentemente (%d filas)", product_id_int, len(result.data or []))
             
             return len(result.data) > 0
             
@@ -511,6 +705,7 @@ class ProductService:
             result = self.supabase.table('products').update({
                 'stock': new_stock
             }).eq('id', product_id).execute()
+            self._products_changed(product_id)
             
             if result.data and len(result.data) > 0:
                 return result.data[0]
@@ -533,16 +728,29 @@ class ProductService:
             
             if result.data and len(result.data) > 0:
                 return result.data[0]
-            else:
-                # Fallback si la vista no existe
-                return self._calculate_stats_manually()
                 
         except Exception as e:
             logger.error(f"Error en get_product_stats: {str(e)}")
-            return self._calculate_stats_manually()
+        
+        # Fallback si la vista no existe
+        return self._calculate_stats_manually()
     
     def _calculate_stats_manually(self) -> Dict:
-        """Calcular estadísticas manualmente si la vista no existe"""
+        """
+        Calcular estadísticas si la vista no existe (RPC get_product_stats o, sin ella, en Python)
+        
+        Solo se descargan los productos si la función RPC no está instalada;
+        cualquier otro error de la RPC se propaga.
+        """
+        try:
+            result = self.supabase.rpc('get_product_stats', {}).execute()
+            if result.data:
+                return result.data
+        except Exception as rpc_error:
+            if not is_missing_function_error(rpc_error):
+                raise
+            logger.warning(f"RPC get_product_stats no disponible, calculando en Python: {str(rpc_error)}")
+        
         try:
             # Obtener todos los productos activos
             result = self.supabase.table('products').select('*').eq('is_active', True).execute()
@@ -597,6 +805,13 @@ class ProductService:
             Lista de categorías
         """
         try:
+            catalog = get_product_catalog()
+            if catalog is not None:
+                try:
+                    return catalog.get_categories()
+                except Exception as catalog_error:
+                    logger.warning(f"Catálogo en memoria no disponible, consultando Supabase: {str(catalog_error)}")
+            
             result = self.supabase.table('products').select('category').eq('is_active', True).execute()
             
             if result.data:
@@ -608,25 +823,67 @@ class ProductService:
             logger.error(f"Error en get_categories: {str(e)}")
             return []
     
-    def search_products(self, search_term: str, limit: int = 10) -> List[Dict]:
+    def search_products(self, search_term: str, limit: int = 10, offset: int = 0) -> List[Dict]:
         """
         Buscar productos por término de búsqueda
         
+        Usa la RPC search_products (texto completo en español, sin acentos,
+        con prefijos y ordenada por relevancia); si no existe en la base de
+        datos vuelve al ilike sobre nombre y descripción.
+        
         Args:
             search_term: Término de búsqueda
             limit: Límite de resultados
+            offset: Resultados a saltar
             
         Returns:
             Lista de productos que coinciden con la búsqueda
         """
         try:
+            try:
+                result = self.supabase.rpc('search_products', {
+                    'p_search': search_term,
+                    'p_limit': limit,
+                    'p_offset': offset
+                }).execute()
+                return (result.data or {}).get('data') or []
+            except Exception as rpc_error:
+                # Fallback solo si la función RPC no existe en la base de datos
+                if not is_missing_function_error(rpc_error):
+                    raise
+                logger.warning(f"RPC search_products no disponible, usando ilike: {str(rpc_error)}")
+            
             # Buscar por nombre o descripción
-            result = self.supabase.table('products').select('*').or_(f'name.ilike.%{search_term}%,description.ilike.%{search_term}%').eq('is_active', True).limit(limit).execute()
+            result = self.supabase.table('products').select('*').or_(f'name.ilike.%{search_term}%,description.ilike.%{search_term}%').eq('is_active', True).range(offset, offset + limit - 1).execute()
             
-            return result.data if result.data else []
+            return [strip_internal_columns(row) for row in result.data or []]
         except Exception as e:
             logger.error(f"Error en search_products: {str(e)}")
-            return []
+            raise Exception(f"Error al buscar productos: {str(e)}")
+
+    def suggest_products(self, prefix: str, limit: int = None) -> Dict[str, List[Dict]]:
+        """
+        Sugerencias de autocompletado (productos y categorías) para un prefijo
+        
+        Se resuelven en memoria desde la copia del catálogo del worker, sin
+        consultar la base de datos salvo para refrescar la copia.
+        
+        Args:
+            prefix: Texto escrito por el usuario
+            limit: Máximo de sugerencias por tipo
+            
+        Returns:
+            Dict con products y categories
+        """
+        try:
+            if not Config.PRODUCT_SUGGEST_ENABLED:
+                return {'products': [], 'categories': []}
+            
+            limit = min(limit or Config.PRODUCT_SUGGEST_DEFAULT_LIMIT, Config.PRODUCT_SUGGEST_MAX_LIMIT)
+            return get_product_catalog(required=True).suggest(prefix, limit)
+        except Exception as e:
+            logger.error(f"Error en suggest_products: {str(e)}")
+            raise Exception(f"Error al obtener sugerencias: {str(e)}")
 
     def get_low_stock_products(self, threshold: int = 10) -> List[Dict]:
         """
@@ -640,7 +897,7 @@ class ProductService:
         """
         try:
             result = self.supabase.table('products').select('*').lt('stock', threshold).eq('is_active', True).execute()
-            return result.data if result.data else []
+            return [strip_internal_columns(row) for row in result.data or []]
         except Exception as e:
             logger.error(f"Error en get_low_stock_products: {str(e)}")
             return []
@@ -663,7 +920,7 @@ class ProductService:
                 # Si no hay productos destacados, retornar productos activos
                 result = self.supabase.table('products').select('*').eq('is_active', True).limit(limit).execute()
             
-            products = result.data if result.data else []
+            products = [strip_internal_columns(row) for row in result.data or []]
             
             # Agregar datos simulados de ventas
             for i, product in enumerate(products):
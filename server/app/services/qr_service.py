@@ -0,0 +1,289 @@
+import io
+import os
+import math
+import zipfile
+import threading
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import qrcode
+from qrcode.constants import ERROR_CORRECT_L, ERROR_CORRECT_M, ERROR_CORRECT_Q, ERROR_CORRECT_H
+from PIL import Image
+
+from app.config import Config
+from app.utils.result_cache import DiskResultCache, get_result_cache
+
+logger = logging.getLogger(__name__)
+
+ERROR_CORRECTION_LEVELS = {
+    'L': ERROR_CORRECT_L,
+    'M': ERROR_CORRECT_M,
+    'Q': ERROR_CORRECT_Q,
+    'H': ERROR_CORRECT_H
+}
+
+BATCH_OUTPUTS = ('zip', 'sprite', 'svg')
+
+
+def _qr_matrix(content: str, error_correction: str, border: int) -> List[List[bool]]:
+    """Calcular la matriz de módulos del QR (True = módulo oscuro), con el borde incluido"""
+    qr = qrcode.QRCode(error_correction=ERROR_CORRECTION_LEVELS[error_correction], border=border)
+    qr.add_data(content)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+def _matrix_to_png(matrix: List[List[bool]], box_size: int) -> bytes:
+    """
+    Rasterizar la matriz de una vez: una imagen de 1 bit de un píxel por
+    módulo escalada con NEAREST, en lugar de dibujar cada módulo
+    """
+    size = len(matrix)
+    image = Image.new('1', (size, size))
+    image.putdata([0 if dark else 1 for row in matrix for dark in row])
+    if box_size > 1:
+        image = image.resize((size * box_size, size * box_size), Image.NEAREST)
+
+    img_io = io.BytesIO()
+    image.save(img_io, 'PNG', optimize=False)
+    return img_io.getvalue()
+
+
+def _matrix_to_svg_path(matrix: List[List[bool]], offset_x: int = 0, offset_y: int = 0) -> str:
+    """Convertir la matriz en un path SVG, un rectángulo por cada tramo horizontal de módulos oscuros"""
+    commands = []
+    for y, row in enumerate(matrix):
+        x = 0
+        width = len(row)
+        while x < width:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < width and row[x]:
+                x += 1
+            commands.append(f"M{start + offset_x} {y + offset_y}h{x - start}v1h-{x - start}z")
+    return ''.join(commands)
+
+
+def _render_png_chunk(contents: List[str], box_size: int, border: int, error_correction: str) -> List[bytes]:
+    """Renderizar varios QR en PNG (se ejecuta en el pool de procesos)"""
+    return [_matrix_to_png(_qr_matrix(content, error_correction, border), box_size) for content in contents]
+
+
+def _matrix_chunk(contents: List[str], border: int, error_correction: str) -> List[List[List[bool]]]:
+    """Calcular varias matrices (se ejecuta en el pool de procesos)"""
+    return [_qr_matrix(content, error_correction, border) for content in contents]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """Pool de procesos para lotes de QR del worker actual (None si QR_POOL_WORKERS es 0)"""
+    global _pool, _pool_pid
+
+    if Config.QR_POOL_WORKERS <= 0:
+        return None
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = ProcessPoolExecutor(
+                max_workers=Config.QR_POOL_WORKERS,
+                mp_context=multiprocessing.get_context(Config.QR_POOL_START_METHOD)
+            )
+            _pool_pid = pid
+        return _pool
+
+
+class QRService:
+    """Generación de códigos QR individuales y por lotes"""
+
+    def __init__(self):
+        self.cache = get_result_cache()
+
+    def parse_options(self, data: Dict) -> Dict:
+        """
+        Leer y validar las opciones de renderizado
+
+        Args:
+            data: Cuerpo de la petición (box_size, border, error_correction)
+
+        Returns:
+            Dict con box_size, border y error_correction
+
+        Raises:
+            ValueError: Si alguna opción no es válida
+        """
+        try:
+            box_size = int(data.get('box_size', Config.QR_DEFAULT_BOX_SIZE))
+            border = int(data.get('border', 4))
+        except (TypeError, ValueError):
+            raise ValueError("box_size y border deben ser números enteros")
+
+        if not 1 <= box_size <= Config.QR_MAX_BOX_SIZE:
+            raise ValueError(f"box_size debe estar entre 1 y {Config.QR_MAX_BOX_SIZE}")
+        if not 0 <= border <= 20:
+            raise ValueError("border debe estar entre 0 y 20")
+
+        error_correction = str(data.get('error_correction', 'M')).upper()
+        if error_correction not in ERROR_CORRECTION_LEVELS:
+            raise ValueError("error_correction debe ser L, M, Q o H")
+
+        return {'box_size': box_size, 'border': border, 'error_correction': error_correction}
+
+    def cache_key(self, content: str, options: Dict, output: str = 'png') -> str:
+        """Clave de la caché de resultados para un QR"""
+        return DiskResultCache.make_key('qr', content.encode('utf-8'), {'format': output, **options})
+
+    def render_png(self, content: str, options: Dict) -> bytes:
+        """
+        Renderizar un QR en PNG (usa la caché de resultados)
+
+        Args:
+            content: Texto o URL a codificar
+            options: Opciones de parse_options
+        """
+        key = self.cache_key(content, options)
+        png = self.cache.get(key)
+        if png is None:
+            png = _render_png_chunk([content], **options)[0]
+            self.cache.set(key, png)
+        return png
+
+    def render_batch(self, items: List[Dict], output: str, options: Dict) -> Tuple[bytes, str, str]:
+        """
+        Renderizar un lote de QR
+
+        Args:
+            items: Lista de {'content': str, 'name': str opcional}
+            output: 'zip' (un PNG por código), 'sprite' (una sola imagen PNG
+                en cuadrícula) o 'svg' (un documento vectorial en cuadrícula,
+                sin rasterizar)
+            options: Opciones de parse_options
+
+        Returns:
+            Tupla (bytes, mimetype, nombre de archivo)
+
+        Raises:
+            ValueError: Si el lote o la salida no son válidos, o si la
+                imagen de output=sprite supera QR_SPRITE_MAX_PIXELS
+        """
+        if output not in BATCH_OUTPUTS:
+            raise ValueError("output debe ser zip, sprite o svg")
+        if not items:
+            raise ValueError("Se requiere al menos un contenido")
+        if len(items) > Config.QR_BATCH_MAX_ITEMS:
+            raise ValueError(f"El lote admite como máximo {Config.QR_BATCH_MAX_ITEMS} códigos")
+
+        contents = [item['content'] for item in items]
+
+        if output == 'svg':
+            matrices = self._run_chunked(_matrix_chunk, contents, border=options['border'],
+                                         error_correction=options['error_correction'])
+            return self._svg_sheet(matrices, options['box_size']), 'image/svg+xml', 'qr-codes.svg'
+
+        pngs = self._render_pngs(contents, options)
+
+        if output == 'sprite':
+            return self._sprite_sheet(pngs), 'image/png', 'qr-codes.png'
+
+        zip_io = io.BytesIO()
+        used_names = set()
+        with zipfile.ZipFile(zip_io, 'w', zipfile.ZIP_STORED) as archive:
+            for index, (item, png) in enumerate(zip(items, pngs), start=1):
+                name = self._file_name(item.get('name') or f"qr-{index:04d}", used_names)
+                archive.writestr(f"{name}.png", png)
+        return zip_io.getvalue(), 'application/zip', 'qr-codes.zip'
+
+    def _render_pngs(self, contents: List[str], options: Dict) -> List[bytes]:
+        """Renderizar los PNG que no están en caché y guardarlos"""
+        keys = [self.cache_key(content, options) for content in contents]
+        pngs: List[Optional[bytes]] = [self.cache.get(key) for key in keys]
+
+        missing = [index for index, png in enumerate(pngs) if png is None]
+        if missing:
+            rendered = self._run_chunked(_render_png_chunk, [contents[index] for index in missing], **options)
+            for index, png in zip(missing, rendered):
+                pngs[index] = png
+                self.cache.set(keys[index], png)
+
+        return pngs
+
+    def _run_chunked(self, func, contents: List[str], **kwargs) -> list:
+        """Repartir el trabajo en bloques entre los procesos del pool (en línea si el lote es chico)"""
+        pool = _get_pool()
+        if pool is None or len(contents) < Config.QR_POOL_MIN_BATCH:
+            return func(contents, **kwargs)
+
+        chunk_size = max(1, math.ceil(len(contents) / (Config.QR_POOL_WORKERS * 4)))
+        futures = [
+            pool.submit(func, contents[start:start + chunk_size], **kwargs)
+            for start in range(0, len(contents), chunk_size)
+        ]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def _sprite_sheet(self, pngs: List[bytes]) -> bytes:
+        """Unir los PNG en una cuadrícula (orden de izquierda a derecha, de arriba a abajo)"""
+        # Image.open solo lee la cabecera: el tamaño se conoce sin decodificar
+        images = [Image.open(io.BytesIO(png)) for png in pngs]
+        cell = max(max(image.size) for image in images)
+        columns = math.ceil(math.sqrt(len(images)))
+        rows = math.ceil(len(images) / columns)
+
+        if columns * rows * cell * cell > Config.QR_SPRITE_MAX_PIXELS:
+            raise ValueError(
+                f"La imagen combinada tendría {columns * cell}x{rows * cell} píxeles y supera el máximo de "
+                f"{Config.QR_SPRITE_MAX_PIXELS} píxeles; usa menos códigos, un box_size menor u output=zip"
+            )
+
+        sheet = Image.new('1', (columns * cell, rows * cell), 1)
+        for index, image in enumerate(images):
+            sheet.paste(image, ((index % columns) * cell, (index // columns) * cell))
+
+        img_io = io.BytesIO()
+        sheet.save(img_io, 'PNG')
+        return img_io.getvalue()
+
+    def _svg_sheet(self, matrices: List[List[List[bool]]], box_size: int) -> bytes:
+        """Documento SVG con todos los códigos en cuadrícula (unidades = módulos)"""
+        cell = max(len(matrix) for matrix in matrices)
+        columns = math.ceil(math.sqrt(len(matrices)))
+        rows = math.ceil(len(matrices) / columns)
+        width, height = columns * cell, rows * cell
+
+        paths = [
+            _matrix_to_svg_path(matrix, (index % columns) * cell, (index // columns) * cell)
+            for index, matrix in enumerate(matrices)
+        ]
+
+        svg = (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width * box_size}" height="{height * box_size}" '
+            f'viewBox="0 0 {width} {height}" shape-rendering="crispEdges">'
+            f'<rect width="{width}" height="{height}" fill="#fff"/>'
+            f'<path fill="#000" d="{"".join(paths)}"/>'
+            '</svg>'
+        )
+        return svg.encode('utf-8')
+
+    def _file_name(self, name: str, used_names: set) -> str:
+        """Nombre de archivo seguro y único dentro del ZIP"""
+        safe = ''.join(char if char.isalnum() or char in '-_.' else '-' for char in str(name)).strip('.') or 'qr'
+        candidate = safe
+        suffix = 2
+        while candidate in used_names:
+            candidate = f"{safe}-{suffix}"
+            suffix += 1
+        used_names.add(candidate)
+        return candidate
@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+from typing import Optional
+import logging
+
+import httpx
+from postgrest.exceptions import APIError
+from supabase import create_client, Client, ClientOptions
+
+from app.config import Config
+from app.utils.metrics import record_supabase_call
+
+logger = logging.getLogger(__name__)
+
+# Registro de clientes por proceso: cada worker de gunicorn crea su propio
+# cliente (y su pool de conexiones keep-alive) la primera vez que lo necesita.
+_lock = threading.Lock()
+_client: Optional[Client] = None
+_http_client: Optional[httpx.Client] = None
+_owner_pid: Optional[int] = None
+
+# Códigos de un RPC que no existe: PostgREST no encuentra la función
+# (PGRST202, HTTP 404) o PostgreSQL no la resuelve (42883)
+MISSING_FUNCTION_CODES = {'PGRST202', '42883', '404'}
+
+# Códigos de una columna que no existe (p. ej. search_vector sin §1 de
+# database/api_functions.sql)
+MISSING_COLUMN_CODES = {'42703', 'PGRST204'}
+
+
+class TimedTransport(httpx.HTTPTransport):
+    """
+    Transporte que mide cada llamada a Supabase
+
+    Todas las consultas de los servicios (.execute() de tablas y RPC) pasan
+    por aquí, así que se miden en un solo lugar sin tocar cada servicio.
+    """
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        status = 0
+        try:
+            response = super().handle_request(request)
+            status = response.status_code
+            return response
+        finally:
+            record_supabase_call(request.method, request.url.path, status, time.perf_counter() - start)
+
+
+def is_missing_function_error(error: Exception) -> bool:
+    """
+    True si el error indica que la función RPC no está instalada
+
+    Los servicios usan su camino alternativo solo en este caso; cualquier
+    otro error (timeout, permisos, datos inválidos) se propaga.
+    """
+    return isinstance(error, APIError) and str(error.code) in MISSING_FUNCTION_CODES
+
+
+def is_missing_column_error(error: Exception) -> bool:
+    """True si el error indica que la consulta usa una columna que no está instalada"""
+    return isinstance(error, APIError) and str(error.code) in MISSING_COLUMN_CODES
+
+
+def _build_http_client() -> httpx.Client:
+    """Crear el cliente HTTP compartido con el pool de conexiones configurado"""
+    limits = httpx.Limits(
+        max_connections=Config.SUPABASE_POOL_SIZE,
+        max_keepalive_connections=Config.SUPABASE_POOL_SIZE,
+        keepalive_expiry=Config.SUPABASE_POOL_IDLE_TIMEOUT
+    )
+    return httpx.Client(transport=TimedTransport(limits=limits), timeout=Config.SUPABASE_HTTP_TIMEOUT)
+
+
+def get_supabase_client() -> Client:
+    """
+    Obtener el cliente de Supabase compartido por el proceso actual
+
+    El cliente se crea de forma perezosa y se reutiliza en todas las
+    peticiones del worker. Si el proceso fue bifurcado (fork) después de
+    crearlo, se descarta la copia heredada y se crea uno nuevo, para no
+    compartir sockets entre procesos.
+
+    Returns:
+        Cliente de Supabase con la clave de servicio
+    """
+    global _client, _http_client, _owner_pid
+
+    pid = os.getpid()
+    if _client is not None and _owner_pid == pid:
+        return _client
+
+    with _lock:
+        if _client is not None and _owner_pid == pid:
+            return _client
+
+        supabase_url = Config.SUPABASE_URL
+        supabase_key = Config.SUPABASE_SERVICE_KEY
+
+        if not supabase_url or not supabase_key:
+            raise ValueError("SUPABASE_URL y SUPABASE_SERVICE_KEY deben estar configurados")
+
+        # Las conexiones heredadas del proceso padre no se cierran aquí:
+        # sus sockets pertenecen al padre y cerrarlos lo afectaría.
+        _http_client = _build_http_client()
+        options = ClientOptions(
+            httpx_client=_http_client,
+            postgrest_client_timeout=Config.SUPABASE_HTTP_TIMEOUT
+        )
+        _client = create_client(supabase_url, supabase_key, options=options)
+        _owner_pid = pid
+
+        logger.info(
+            f"Cliente de Supabase creado para el proceso {pid} "
+            f"(pool={Config.SUPABASE_POOL_SIZE}, idle={Config.SUPABASE_POOL_IDLE_TIMEOUT}s)"
+        )
+        return _client
+
+
+def reset_supabase_client() -> None:
+    """Cerrar el pool del proceso actual y forzar la creación de un cliente nuevo"""
+    global _client, _http_client, _owner_pid
+
+    with _lock:
+        if _http_client is not None and _owner_pid == os.getpid():
+            try:
+                _http_client.close()
+            except Exception as e:
+                logger.warning(f"Error cerrando el pool de Supabase: {str(e)}")
+        _client = None
+        _http_client = None
+        _owner_pid = None
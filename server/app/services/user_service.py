@@ -1,20 +1,42 @@
-import os
-from supabase import create_client, Client
+from supabase import Client
 from typing import Dict, List, Optional, Any
 import logging
+from app.config import Config
+from app.utils.cache import TTLCache
+from app.utils.pagination import apply_keyset, split_page
+from .supabase_client import get_supabase_client, is_missing_function_error
 
 logger = logging.getLogger(__name__)
 
+# Caché de perfiles usada por admin_required para leer el rol sin ir a la BD
+_auth_user_cache = TTLCache(
+    max_entries=Config.ADMIN_ROLE_CACHE_MAX_ENTRIES,
+    ttl=Config.ADMIN_ROLE_CACHE_TTL,
+    name='auth_user'
+)
+
+
+def invalidate_auth_user_cache(user_id: str = None) -> None:
+    """
+    Invalidar el perfil cacheado de un usuario (o de todos si no se indica)
+    
+    Args:
+        user_id: ID del usuario (sub del JWT)
+    """
+    if user_id is None:
+        _auth_user_cache.clear()
+    else:
+        _auth_user_cache.invalidate(str(user_id))
+
+
+def get_auth_user_cache_stats() -> Dict[str, Any]:
+    """Obtener contadores de aciertos y fallos de la caché de roles"""
+    return _auth_user_cache.stats()
+
 class UserService:
     def __init__(self):
         """Inicializar el cliente de Supabase"""
-        supabase_url = os.getenv('SUPABASE_URL')
-        supabase_key = os.getenv('SUPABASE_SERVICE_KEY')  # Usar la clave de servicio para operaciones admin
-        
-        if not supabase_url or not supabase_key:
-            raise ValueError("SUPABASE_URL y SUPABASE_SERVICE_KEY deben estar configurados")
-        
-        self.supabase: Client = create_client(supabase_url, supabase_key)
+        self.supabase: Client = get_supabase_client()
     
     def get_users(self, page: int = 1, per_page: int = 10, filters: Dict = None) -> Dict[str, Any]:
         """
@@ -29,76 +51,36 @@ class UserService:
             Dict con usuarios, total y metadata
         """
         try:
-            print(f"=== DEBUG: Iniciando get_users ===")
-            print(f"Parámetros: page={page}, per_page={per_page}, filters={filters}")
-            
-            # Verificar conexión a Supabase
-            print(f"Supabase URL: {os.getenv('SUPABASE_URL')}")
-            print(f"Supabase Key configurado: {'Sí' if os.getenv('SUPABASE_SERVICE_KEY') else 'No'}")
-            
             # Primero obtener el total sin paginación para el conteo
             count_query = self.supabase.table('users').select('id', count='exact')
-            print(f"Count query creada: {count_query}")
             
             # Aplicar filtros al conteo
             if filters:
-                print(f"Aplicando filtros: {filters}")
-                if filters.get('status') and filters['status'] != 'all':
-                    is_active = filters['status'] == 'Activo'
-                    count_query = count_query.eq('is_active', is_active)
-                    print(f"Filtro status aplicado: is_active={is_active}")
-                
-                if filters.get('role') and filters['role'] != 'all':
-                    count_query = count_query.eq('role', filters['role'])
-                    print(f"Filtro role aplicado: role={filters['role']}")
-                
-                if filters.get('search'):
-                    search_term = filters['search']
-                    count_query = count_query.or_(
-                        f'first_name.ilike.%{search_term}%,last_name.ilike.%{search_term}%,email.ilike.%{search_term}%'
-                    )
-                    print(f"Filtro search aplicado: search_term={search_term}")
+                count_query = self._apply_filters(count_query, filters)
             
             # Ejecutar conteo
-            print("Ejecutando count query...")
             count_result = count_query.execute()
             total_count = count_result.count
-            print(f"Count result: {count_result}")
-            print(f"Total count: {total_count}")
             
             # Ahora obtener los datos con paginación
             query = self.supabase.table('users').select('*')
-            print(f"Data query creada: {query}")
             
             # Aplicar filtros a la consulta de datos
             if filters:
-                if filters.get('status') and filters['status'] != 'all':
-                    is_active = filters['status'] == 'Activo'
-                    query = query.eq('is_active', is_active)
-                
-                if filters.get('role') and filters['role'] != 'all':
-                    query = query.eq('role', filters['role'])
-                
-                if filters.get('search'):
-                    search_term = filters['search']
-                    query = query.or_(
-                        f'first_name.ilike.%{search_term}%,last_name.ilike.%{search_term}%,email.ilike.%{search_term}%'
-                    )
+                query = self._apply_filters(query, filters)
             
             # Aplicar paginación
             from_range = (page - 1) * per_page
             to_range = from_range + per_page - 1
             query = query.range(from_range, to_range)
-            print(f"Paginación aplicada: rango {from_range}-{to_range}")
             
             # Ejecutar consulta de datos
-            print("Ejecutando data query...")
             result = query.execute()
-            print(f"Data result: {result}")
-            print(f"Data count: {len(result.data) if result.data else 0}")
             
-            print(f"Paginación: página {page}, por página {per_page}, rango {from_range}-{to_range}")
-            print(f"Total de usuarios: {total_count}, Usuarios obtenidos: {len(result.data) if result.data else 0}")
+            logger.debug(
+                "get_users: página %s, por página %s, filtros %s, total %s, obtenidos %d",
+                page, per_page, filters, total_count, len(result.data or [])
+            )
             
             return {
                 'users': result.data if result.data else [],
@@ -109,10 +91,60 @@ class UserService:
             }
             
         except Exception as e:
-            print(f"ERROR en get_users: {str(e)}")
-            logger.error(f"Error getting users: {str(e)}")
+            logger.error("Error getting users: %s", e)
+            raise Exception(f"Error al obtener usuarios: {str(e)}")
+    
+    def get_users_after(self, cursor: Optional[str], per_page: int = 10, filters: Dict = None) -> Dict[str, Any]:
+        """
+        Obtener usuarios con paginación por cursor (keyset sobre created_at, id)
+        
+        Args:
+            cursor: Cursor devuelto en la página anterior (None o vacío para la primera)
+            per_page: Elementos por página
+            filters: Diccionario con filtros (status, role, search)
+        
+        Returns:
+            Dict con usuarios, next_cursor y has_more
+        """
+        try:
+            query = self.supabase.table('users').select('*')
+            
+            if filters:
+                query = self._apply_filters(query, filters)
+            
+            result = apply_keyset(query, cursor).limit(per_page + 1).execute()
+            users, next_cursor = split_page(result.data, per_page)
+            
+            return {
+                'users': users,
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            }
+            
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting users after cursor: {str(e)}")
             raise Exception(f"Error al obtener usuarios: {str(e)}")
     
+    def _apply_filters(self, query, filters: Dict):
+        """Aplicar filtros de usuarios a una consulta"""
+        if filters.get('status') and filters['status'] != 'all':
+            is_active = filters['status'] == 'Activo'
+            query = query.eq('is_active', is_active)
+        
+        if filters.get('role') and filters['role'] != 'all':
+            query = query.eq('role', filters['role'])
+        
+        if filters.get('search'):
+            search_term = filters['search']
+            query = query.or_(
+                f'first_name.ilike.%{search_term}%,last_name.ilike.%{search_term}%,email.ilike.%{search_term}%'
+            )
+        
+        return query
+    
     def get_user_by_id(self, user_id: str) -> Optional[Dict]:
         """
         Obtener un usuario por ID
@@ -134,6 +166,29 @@ class UserService:
             logger.error(f"Error getting user by id {user_id}: {str(e)}")
             raise Exception(f"Error al obtener usuario: {str(e)}")
     
+    def get_auth_user(self, user_id: str) -> Optional[Dict]:
+        """
+        Obtener un usuario por ID usando la caché de autenticación
+        
+        Pensado para los decoradores de autenticación, que solo necesitan
+        el rol; las mutaciones de usuarios invalidan la entrada.
+        
+        Args:
+            user_id: ID del usuario (sub del JWT)
+            
+        Returns:
+            Dict con los datos del usuario o None si no existe
+        """
+        cache_key = str(user_id)
+        user = _auth_user_cache.get(cache_key)
+        if user is not None:
+            return user
+        
+        user = self.get_user_by_id(user_id)
+        if user:
+            _auth_user_cache.set(cache_key, user)
+        return user
+    
     def create_user(self, user_data: Dict) -> Dict:
         """
         Crear un nuevo usuario
@@ -183,6 +238,7 @@ class UserService:
             
             # Actualizar en la tabla users
             result = self.supabase.table('users').update(user_data).eq('id', user_id).execute()
+            invalidate_auth_user_cache(user_id)
             
             if not result.data:
                 raise Exception("No se pudo actualizar el usuario")
@@ -219,6 +275,7 @@ class UserService:
         try:
             # Eliminar de la tabla users
             result = self.supabase.table('users').delete().eq('id', user_id).execute()
+            invalidate_auth_user_cache(user_id)
             
             if not result.data:
                 raise Exception("No se pudo eliminar el usuario")
@@ -251,6 +308,7 @@ class UserService:
                 'is_active': False,
                 'updated_at': 'now()'
             }).eq('id', user_id).execute()
+            invalidate_auth_user_cache(user_id)
             
             if not result.data:
                 raise Exception("No se pudo desactivar el usuario")
@@ -276,6 +334,7 @@ class UserService:
                 'is_active': True,
                 'updated_at': 'now()'
             }).eq('id', user_id).execute()
+            invalidate_auth_user_cache(user_id)
             
             if not result.data:
                 raise Exception("No se pudo activar el usuario")
@@ -294,30 +353,19 @@ class UserService:
             Dict con las estadísticas de usuarios
         """
         try:
-            # Obtener total de usuarios
-            total_result = self.supabase.table('users').select('id', count='exact').execute()
-            total_users = total_result.count if total_result.count else 0
-            
-            # Obtener usuarios activos
-            active_result = self.supabase.table('users').select('id', count='exact').eq('is_active', True).execute()
-            active_users = active_result.count if active_result.count else 0
-            
-            # Obtener usuarios por rol
-            role_result = self.supabase.table('users').select('role').execute()
-            role_counts = {}
-            if role_result.data:
-                for user in role_result.data:
-                    role = user.get('role', 'user')
-                    role_counts[role] = role_counts.get(role, 0) + 1
+            try:
+                result = self.supabase.rpc('get_user_stats', {}).execute()
+                stats = result.data
+            except Exception as rpc_error:
+                # Fallback solo si la función RPC no existe en la base de datos
+                if not is_missing_function_error(rpc_error):
+                    raise
+                logger.warning(f"RPC get_user_stats no disponible, calculando en Python: {str(rpc_error)}")
+                stats = self._calculate_user_stats_manually()
             
             return {
                 'success': True,
-                'data': {
-                    'total_users': total_users,
-                    'active_users': active_users,
-                    'inactive_users': total_users - active_users,
-                    'role_counts': role_counts
-                }
+                'data': stats
             }
         except Exception as e:
             logger.error(f"Error en get_user_stats: {str(e)}")
@@ -325,6 +373,31 @@ class UserService:
                 'success': False,
                 'error': str(e)
             }
+    
+    def _calculate_user_stats_manually(self) -> Dict:
+        """Calcular las estadísticas descargando los usuarios (si la RPC no existe)"""
+        # Obtener total de usuarios
+        total_result = self.supabase.table('users').select('id', count='exact').execute()
+        total_users = total_result.count if total_result.count else 0
+        
+        # Obtener usuarios activos
+        active_result = self.supabase.table('users').select('id', count='exact').eq('is_active', True).execute()
+        active_users = active_result.count if active_result.count else 0
+        
+        # Obtener usuarios por rol
+        role_result = self.supabase.table('users').select('role').execute()
+        role_counts = {}
+        if role_result.data:
+            for user in role_result.data:
+                role = user.get('role', 'user')
+                role_counts[role] = role_counts.get(role, 0) + 1
+        
+        return {
+            'total_users': total_users,
+            'active_users': active_users,
+            'inactive_users': total_users - active_users,
+            'role_counts': role_counts
+        }
 
     def get_recent_users(self, limit: int = 5) -> List[Dict]:
         """
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from app.utils.metrics import record_cache
+
+
+class TTLCache:
+    """
+    Caché en memoria con expiración por tiempo (TTL) y desalojo LRU
+
+    Es segura para hilos y vive dentro de cada worker; no se comparte
+    entre procesos.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0, name: Optional[str] = None):
+        """
+        Args:
+            max_entries: Número máximo de entradas antes de desalojar la menos usada
+            ttl: Segundos de vida por defecto de cada entrada (0 desactiva la caché)
+            name: Nombre en las métricas de /metrics (sin nombre no se exporta)
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Obtener un valor si existe y no ha expirado"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                hit = False
+            elif entry[1] <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                hit = False
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                hit = True
+
+        if self.name:
+            record_cache(self.name, hit)
+        return entry[0] if hit else default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Guardar un valor
+
+        Args:
+            key: Clave de la entrada
+            value: Valor a guardar
+            ttl: Segundos de vida de esta entrada (por defecto el TTL de la caché)
+        """
+        if not self.enabled:
+            return
+
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Eliminar una entrada"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Eliminar todas las entradas"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Obtener contadores de uso de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
@@ -0,0 +1,55 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+from app.config import Config
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """
+    Obtener el pool de hilos para llamadas de E/S (Supabase, APIs externas)
+
+    Se crea uno por proceso, de forma perezosa, para que cada worker de
+    gunicorn/uvicorn tenga el suyo después del fork.
+    """
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    if _executor is not None and _executor_pid == pid:
+        return _executor
+
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid:
+            _executor = ThreadPoolExecutor(
+                max_workers=Config.IO_POOL_SIZE,
+                thread_name_prefix='bapesu-io'
+            )
+            _executor_pid = pid
+        return _executor
+
+
+def run_concurrently(*calls: Callable[[], Any]) -> List[Any]:
+    """
+    Ejecutar llamadas independientes en paralelo y esperar todas
+
+    Args:
+        calls: Funciones sin argumentos (usar lambda o functools.partial)
+
+    Returns:
+        Resultados en el mismo orden que las llamadas
+
+    Raises:
+        La primera excepción lanzada por alguna de las llamadas
+    """
+    if len(calls) <= 1:
+        return [call() for call in calls]
+
+    executor = get_io_executor()
+    futures = [executor.submit(call) for call in calls]
+    return [future.result() for future in futures]
+
@@ -0,0 +1,55 @@
+import fcntl
+import os
+from typing import Optional
+
+
+class FileSlots:
+    """
+    Plazas limitadas compartidas entre procesos del mismo host
+
+    Cada plaza es un archivo en directory bloqueado con flock: todos los
+    workers de gunicorn/uvicorn que usan el mismo directorio ven el mismo
+    límite. El sistema operativo libera el bloqueo si el proceso muere, así
+    que una plaza nunca queda tomada por un worker caído.
+    """
+
+    def __init__(self, directory: str, name: str, capacity: int):
+        os.makedirs(directory, exist_ok=True)
+        self.capacity = max(capacity, 1)
+        self._paths = [os.path.join(directory, f"{name}-{index}.lock") for index in range(self.capacity)]
+
+    def try_acquire(self) -> Optional[int]:
+        """
+        Tomar una plaza libre sin esperar
+
+        Returns:
+            Descriptor que representa la plaza (pasarlo a release), o None
+            si todas están ocupadas
+        """
+        # Empezar en una plaza distinta por proceso para no competir siempre por la primera
+        start = os.getpid() % self.capacity
+        for offset in range(self.capacity):
+            fd = os.open(self._paths[(start + offset) % self.capacity], os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    def release(self, fd: int) -> None:
+        """Liberar una plaza tomada con try_acquire"""
+        os.close(fd)
+
+    def in_use(self) -> int:
+        """Cantidad aproximada de plazas ocupadas en todo el host"""
+        used = 0
+        for path in self._paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                used += 1
+            finally:
+                os.close(fd)
+        return used
@@ -0,0 +1,127 @@
+import contextvars
+import json
+import logging
+import random
+import sys
+import time
+import uuid
+from typing import Optional
+
+from app.config import Config
+
+# ID de la petición en curso; lo define init_request_logging y lo agrega
+# RequestIdFilter a cada registro
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('request_id', default=None)
+
+# Atributos propios de LogRecord: todo lo demás viene de extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+
+def get_request_id() -> Optional[str]:
+    """ID de la petición que se está atendiendo (None fuera de una petición)"""
+    return _request_id.get()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Una línea JSON por registro: ts, level, logger, msg, request_id y los
+    campos pasados con extra={...}
+
+    El mensaje se arma recién aquí (record.getMessage()), así que con
+    logger.debug('... %s', datos) no se formatea nada si el nivel está
+    desactivado.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry['request_id'] = request_id
+
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Agregar el ID de la petición en curso a cada registro"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Dejar pasar solo una fracción (rate) de los registros DEBUG; los demás niveles pasan siempre"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+
+_configured = False
+
+
+def configure_logging() -> None:
+    """
+    Configurar el logger raíz una vez por proceso
+
+    LOG_LEVEL define el nivel (INFO por defecto: los logger.debug de las
+    rutas calientes no se formatean ni se escriben), LOG_FORMAT elige
+    'json' o 'text' y LOG_DEBUG_SAMPLE_RATE la fracción de registros DEBUG
+    que se escriben.
+    """
+    global _configured
+    if _configured:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    if Config.LOG_FORMAT == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'))
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(DebugSamplingFilter(Config.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(Config.LOG_LEVEL)
+    _configured = True
+
+
+def init_request_logging(app) -> None:
+    """Asignar un ID a cada petición (X-Request-ID del cliente o uno nuevo) y devolverlo en la respuesta"""
+    from flask import request
+
+    @app.before_request
+    def _assign_request_id():
+        incoming = request.headers.get('X-Request-ID', '')
+        # Solo se acepta un ID corto e imprimible para no ensuciar los logs
+        if not incoming or len(incoming) > 64 or not incoming.isprintable():
+            incoming = uuid.uuid4().hex
+        _request_id.set(incoming)
+
+    @app.after_request
+    def _return_request_id(response):
+        request_id = _request_id.get()
+        if request_id:
+            response.headers['X-Request-ID'] = request_id
+        return response
+
+    @app.teardown_request
+    def _clear_request_id(_error=None):
+        _request_id.set(None)
@@ -0,0 +1,143 @@
+import os
+import time
+import logging
+from typing import Optional, Tuple
+
+# Config primero: carga el .env, y prometheus_client lee PROMETHEUS_MULTIPROC_DIR al importarse
+from app.config import Config
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess
+)
+
+logger = logging.getLogger(__name__)
+
+# Con PROMETHEUS_MULTIPROC_DIR cada worker de gunicorn/uvicorn escribe sus
+# métricas en ese directorio y /metrics las suma al responder (ver
+# server/gunicorn.conf.py). Debe definirse antes de arrancar los workers.
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'bapesu_http_request_duration_seconds', 'Duración de las peticiones HTTP',
+    ['method', 'route', 'status'], buckets=LATENCY_BUCKETS
+)
+HTTP_REQUEST_BYTES = Histogram(
+    'bapesu_http_request_size_bytes', 'Tamaño del cuerpo de las peticiones HTTP',
+    ['method', 'route'], buckets=SIZE_BUCKETS
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    'bapesu_http_response_size_bytes', 'Tamaño del cuerpo de las respuestas HTTP',
+    ['method', 'route', 'status'], buckets=SIZE_BUCKETS
+)
+SUPABASE_REQUEST_SECONDS = Histogram(
+    'bapesu_supabase_request_duration_seconds', 'Duración de las llamadas a Supabase (hasta recibir la respuesta)',
+    ['operation', 'target', 'status'], buckets=LATENCY_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    'bapesu_cache_requests_total', 'Consultas a las cachés de la API',
+    ['cache', 'result']
+)
+LLM_REQUEST_SECONDS = Histogram(
+    'bapesu_llm_request_duration_seconds', 'Duración de las llamadas al servicio de IA',
+    ['mode'], buckets=LATENCY_BUCKETS
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    'bapesu_llm_time_to_first_token_seconds', 'Tiempo hasta el primer token en streaming',
+    buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    'bapesu_llm_tokens_total', 'Tokens consumidos en el servicio de IA',
+    ['kind']
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Contar un acierto o fallo de una caché"""
+    if Config.METRICS_ENABLED:
+        CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def record_supabase_call(method: str, path: str, status: int, seconds: float) -> None:
+    """
+    Registrar una llamada HTTP a Supabase
+
+    La ruta se reduce a la tabla o la función: /rest/v1/products → select
+    products, /rest/v1/rpc/list_products → rpc list_products.
+    """
+    if not Config.METRICS_ENABLED:
+        return
+
+    parts = [part for part in path.split('/') if part]
+    if len(parts) >= 3 and parts[0] == 'rest':
+        if parts[2] == 'rpc' and len(parts) >= 4:
+            operation, target = 'rpc', parts[3]
+        else:
+            operation = {'GET': 'select', 'HEAD': 'count', 'POST': 'insert',
+                         'PATCH': 'update', 'DELETE': 'delete'}.get(method, method.lower())
+            target = parts[2]
+    else:
+        operation, target = method.lower(), parts[0] if parts else ''
+
+    SUPABASE_REQUEST_SECONDS.labels(operation, target, str(status)).observe(seconds)
+
+
+def record_llm_call(mode: str, seconds: float, usage: Optional[dict] = None,
+                    first_token_seconds: Optional[float] = None) -> None:
+    """Registrar una llamada al servicio de IA ('chat' o 'stream')"""
+    if not Config.METRICS_ENABLED:
+        return
+
+    LLM_REQUEST_SECONDS.labels(mode).observe(seconds)
+    if first_token_seconds is not None:
+        LLM_FIRST_TOKEN_SECONDS.observe(first_token_seconds)
+    if usage:
+        LLM_TOKENS.labels('prompt').inc(usage.get('prompt_tokens') or 0)
+        LLM_TOKENS.labels('completion').inc(usage.get('completion_tokens') or 0)
+
+
+def init_app_metrics(app) -> None:
+    """Medir cada petición de la app: duración, estado y tamaño de cuerpos por ruta"""
+    if not Config.METRICS_ENABLED:
+        return
+
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _observe_request(response):
+        start = getattr(g, '_metrics_start', None)
+        if start is None:
+            return response
+
+        # Plantilla de la ruta (/products/<product_id>) para no crear una serie por ID
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        method = request.method
+        status = str(response.status_code)
+
+        HTTP_REQUEST_SECONDS.labels(method, route, status).observe(time.perf_counter() - start)
+        if request.content_length:
+            HTTP_REQUEST_BYTES.labels(method, route).observe(request.content_length)
+        # Las respuestas en streaming (SSE, archivos) no tienen tamaño conocido
+        if not response.is_streamed and response.content_length is not None:
+            HTTP_RESPONSE_BYTES.labels(method, route, status).observe(response.content_length)
+        return response
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Métricas en formato de texto de Prometheus
+
+    En modo multiproceso se suman las de todos los workers; si no, son las
+    del proceso que atiende la petición.
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def encode_cursor(row: Dict) -> Optional[str]:
+    """
+    Construir un cursor opaco a partir de la última fila de una página
+
+    Args:
+        row: Fila con las columnas created_at e id
+
+    Returns:
+        Cursor en base64 url-safe o None si la fila no tiene las columnas
+    """
+    if not row or row.get('created_at') is None or row.get('id') is None:
+        return None
+
+    raw = json.dumps([row['created_at'], row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, Any]:
+    """
+    Leer un cursor generado por encode_cursor
+
+    Returns:
+        Tupla (created_at, id)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise ValueError("Cursor de paginación inválido")
+
+    if not isinstance(created_at, str) or not isinstance(row_id, (str, int)):
+        raise ValueError("Cursor de paginación inválido")
+
+    return created_at, row_id
+
+
+def apply_keyset(query, cursor: Optional[str]):
+    """
+    Ordenar por (created_at, id) descendente y, si hay cursor, continuar
+    después de la última fila vista
+
+    Args:
+        query: Consulta de PostgREST
+        cursor: Cursor de la página anterior (None o vacío para la primera)
+
+    Returns:
+        Consulta con orden y filtro de keyset aplicados
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.or_(
+            f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")'
+        )
+
+    return query.order('created_at', desc=True).order('id', desc=True)
+
+
+def split_page(rows: List[Dict], limit: int) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Separar la página pedida de la fila extra usada para saber si hay más
+
+    La consulta debe pedir limit + 1 filas.
+
+    Returns:
+        Tupla (filas de la página, cursor siguiente o None si no hay más)
+    """
+    rows = rows or []
+    if len(rows) <= limit:
+        return rows, None
+
+    page = rows[:limit]
+    return page, encode_cursor(page[-1])
@@ -0,0 +1,95 @@
+import bisect
+import heapq
+import re
+import unicodedata
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Tuple
+
+
+def normalize_text(text: str) -> str:
+    """Pasar a minúsculas, quitar acentos y colapsar separadores"""
+    text = unicodedata.normalize('NFKD', str(text or '').lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(re.findall(r'\w+', text))
+
+
+class PrefixIndex:
+    """
+    Índice en memoria de prefijos con los N elementos más populares
+
+    Los prefijos cortos (hasta head_length caracteres) se resuelven en un
+    trie con el top ya calculado en cada nodo; los más largos buscan por
+    bisección en la lista ordenada de claves, donde el rango que coincide
+    ya es pequeño. Se construye completo con build() y es de solo lectura:
+    para actualizarlo se construye uno nuevo y se reemplaza.
+    """
+
+    def __init__(self, head_length: int = 2, head_size: int = 20):
+        """
+        Args:
+            head_length: Largo máximo de los prefijos con top precalculado
+            head_size: Elementos guardados en cada nodo del trie
+        """
+        self.head_length = head_length
+        self.head_size = head_size
+        self._keys: List[str] = []
+        self._items_by_key: List[List[Hashable]] = []
+        self._head: Dict[str, Any] = {}
+        self._score: Callable[[Hashable], Any] = lambda item: 0
+
+    def build(self, entries: Iterable[Tuple[str, Hashable]], score: Callable[[Hashable], Any]) -> 'PrefixIndex':
+        """
+        Construir el índice
+
+        Args:
+            entries: Pares (texto, elemento); un elemento puede tener varios textos
+            score: Popularidad de un elemento (mayor = primero)
+        """
+        items_by_key: Dict[str, set] = {}
+        for text, item in entries:
+            key = normalize_text(text)
+            if key:
+                items_by_key.setdefault(key, set()).add(item)
+
+        self._score = score
+        self._keys = sorted(items_by_key)
+        self._items_by_key = [list(items_by_key[key]) for key in self._keys]
+
+        # Trie de prefijos cortos: cada nodo guarda su top precalculado
+        head_items: Dict[str, set] = {}
+        for key, items in zip(self._keys, self._items_by_key):
+            for length in range(1, min(len(key), self.head_length) + 1):
+                head_items.setdefault(key[:length], set()).update(items)
+
+        root: Dict[str, Any] = {}
+        for prefix, items in head_items.items():
+            node = root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[''] = heapq.nlargest(self.head_size, items, key=score)
+        self._head = root
+
+        return self
+
+    def search(self, prefix: str, limit: int = 10) -> List[Hashable]:
+        """Elementos con algún texto que empieza por prefix, ordenados por popularidad"""
+        prefix = normalize_text(prefix)
+        if not prefix or limit <= 0:
+            return []
+
+        if len(prefix) <= self.head_length and limit <= self.head_size:
+            node = self._head
+            for char in prefix:
+                node = node.get(char)
+                if node is None:
+                    return []
+            return node.get('', [])[:limit]
+
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + '\uffff', lo=start)
+        matches = set()
+        for items in self._items_by_key[start:end]:
+            matches.update(items)
+        return heapq.nlargest(limit, matches, key=self._score)
+
+    def __len__(self) -> int:
+        return len(self._keys)
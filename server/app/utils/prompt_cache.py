@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from app.config import Config
+from app.utils.cache import TTLCache
+from app.utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Normalizar un prompt para la clave: solo se unifican los espacios
+
+    Las mayúsculas se respetan porque cambian la respuesta (nombres propios,
+    marcas, SKU).
+    """
+    return ' '.join(str(text).split())
+
+
+class PromptCache:
+    """
+    Caché de respuestas del servicio de IA indexada por el prompt normalizado
+
+    Tiene dos niveles: uno en memoria por worker (TTLCache) y, si se indica
+    sqlite_path, uno en SQLite compartido por los workers del contenedor que
+    sobrevive a los reinicios. Un acierto en SQLite se copia a memoria.
+    """
+
+    # Cada cuántas escrituras borrar del SQLite lo vencido y lo que sobra
+    PRUNE_EVERY = 100
+
+    def __init__(self, ttl: float, max_entries: int, sqlite_path: str = '', sqlite_max_entries: int = 0):
+        self.ttl = ttl
+        self.memory = TTLCache(max_entries=max_entries, ttl=ttl, name='llm_prompt')
+        self.sqlite_path = sqlite_path if ttl > 0 else ''
+        self.sqlite_max_entries = sqlite_max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.sqlite_hits = 0
+        self.sqlite_misses = 0
+
+        if self.sqlite_path:
+            try:
+                directory = os.path.dirname(self.sqlite_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with self._connect() as conn:
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute(
+                        'CREATE TABLE IF NOT EXISTS prompt_cache ('
+                        'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                        'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+                    )
+                    conn.execute('CREATE INDEX IF NOT EXISTS prompt_cache_accessed_at ON prompt_cache (accessed_at)')
+            except sqlite3.Error as e:
+                logger.warning(f"No se pudo abrir la caché de IA en SQLite, se usa solo memoria: {str(e)}")
+                self.sqlite_path = ''
+
+    @property
+    def enabled(self) -> bool:
+        return self.memory.enabled
+
+    @staticmethod
+    def make_key(namespace: str, messages: List[Dict[str, str]], params: Dict[str, Any] = None) -> str:
+        """
+        Calcular la clave de una respuesta
+
+        Args:
+            namespace: Herramienta ('description', 'video-ideas', ...)
+            messages: Mensajes del chat
+            params: Parámetros que cambian la respuesta (modelo, temperatura, ...)
+        """
+        normalized = [[message['role'], normalize_prompt(message['content'])] for message in messages]
+        digest = hashlib.sha256()
+        digest.update(namespace.encode('utf-8'))
+        digest.update(json.dumps([normalized, params or {}], sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        return digest.hexdigest()
+
+    @contextmanager
+    def _connect(self):
+        """Conexión por operación (sqlite3 no comparte conexiones entre hilos ni procesos)"""
+        conn = sqlite3.connect(self.sqlite_path, timeout=1.0)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[str]:
+        """Obtener una respuesta (None si no está o venció)"""
+        if not self.enabled:
+            return None
+
+        value = self.memory.get(key)
+        if value is not None or not self.sqlite_path:
+            return value
+
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute('SELECT value, expires_at FROM prompt_cache WHERE key = ?', (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    conn.execute('UPDATE prompt_cache SET accessed_at = ? WHERE key = ?', (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Error al leer la caché de IA en SQLite: {str(e)}")
+            return None
+
+        hit = row is not None and row[1] > now
+        record_cache('llm_prompt_sqlite', hit)
+        with self._lock:
+            if not hit:
+                self.sqlite_misses += 1
+                return None
+            self.sqlite_hits += 1
+
+        self.memory.set(key, row[0], ttl=row[1] - now)
+        return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        """Guardar una respuesta en los dos niveles"""
+        if not self.enabled or not value:
+            return
+
+        self.memory.set(key, value)
+        if not self.sqlite_path:
+            return
+
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO prompt_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                    (key, value, now + self.ttl, now)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Error al guardar en la caché de IA en SQLite: {str(e)}")
+            return
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.PRUNE_EVERY == 0
+        if due:
+            self._prune()
+
+    def _prune(self) -> None:
+        """Borrar las entradas vencidas y las menos usadas por encima de sqlite_max_entries"""
+        try:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM prompt_cache WHERE expires_at <= ?', (time.time(),))
+                if self.sqlite_max_entries > 0:
+                    conn.execute(
+                        'DELETE FROM prompt_cache WHERE key IN ('
+                        'SELECT key FROM prompt_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                        (self.sqlite_max_entries,)
+                    )
+        except sqlite3.Error as e:
+            logger.warning(f"Error al limpiar la caché de IA en SQLite: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de los dos niveles (worker actual)"""
+        stats = {'memory': self.memory.stats(), 'sqlite': None}
+        if self.sqlite_path:
+            with self._lock:
+                stats['sqlite'] = {
+                    'path': self.sqlite_path,
+                    'max_entries': self.sqlite_max_entries,
+                    'hits': self.sqlite_hits,
+                    'misses': self.sqlite_misses
+                }
+        return stats
+
+
+_prompt_cache: Optional[PromptCache] = None
+_prompt_cache_lock = threading.Lock()
+
+
+def get_prompt_cache() -> PromptCache:
+    """Obtener la caché de respuestas del servicio de IA"""
+    global _prompt_cache
+
+    if _prompt_cache is None:
+        with _prompt_cache_lock:
+            if _prompt_cache is None:
+                ttl = Config.LLM_CACHE_TTL if Config.LLM_CACHE_ENABLED else 0
+                _prompt_cache = PromptCache(
+                    ttl=ttl,
+                    max_entries=Config.LLM_CACHE_MAX_ENTRIES,
+                    sqlite_path=Config.LLM_CACHE_SQLITE_PATH,
+                    sqlite_max_entries=Config.LLM_CACHE_SQLITE_MAX_ENTRIES
+                )
+    return _prompt_cache
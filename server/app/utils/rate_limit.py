@@ -0,0 +1,89 @@
+import fcntl
+import json
+import os
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Limitador de ritmo (token bucket) seguro para hilos
+
+    Permite hasta rate_per_minute llamadas por minuto con ráfagas de hasta
+    burst llamadas; acquire() bloquea hasta que haya lugar.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self) -> None:
+        """Esperar hasta poder hacer una llamada"""
+        if not self.enabled:
+            return
+
+        while True:
+            wait = self._take()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _take(self) -> float:
+        """Tomar un token; devuelve 0 si se tomó o los segundos a esperar"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    Limitador de ritmo compartido entre los procesos del mismo host
+
+    El estado del token bucket vive en state_path y se actualiza con flock,
+    así que rate_per_minute es el límite de todos los workers juntos y no
+    de cada uno.
+    """
+
+    def __init__(self, state_path: str, rate_per_minute: float, burst: int = 1):
+        super().__init__(rate_per_minute, burst)
+        self.state_path = state_path
+        os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+
+    def _take(self) -> float:
+        fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), 'r+') as state_file:
+                try:
+                    state = json.load(state_file)
+                    tokens, updated_at = float(state['tokens']), float(state['updated_at'])
+                except (ValueError, KeyError, TypeError):
+                    tokens, updated_at = float(self.burst), time.time()
+
+                # Reloj de pared: time.monotonic() no es comparable entre procesos
+                now = time.time()
+                tokens = min(self.burst, tokens + max(now - updated_at, 0) * self.rate)
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+
+                state_file.seek(0)
+                state_file.truncate()
+                json.dump({'tokens': tokens, 'updated_at': now}, state_file)
+            return wait
+        finally:
+            os.close(fd)
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import logging
+from typing import Any, Dict, Optional
+
+from app.config import Config
+from app.utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+
+class DiskResultCache:
+    """
+    Caché en disco de resultados indexada por el hash del contenido
+
+    La clave es el SHA-256 de la entrada más los parámetros que afectan el
+    resultado, así que una misma imagen o un mismo QR se procesa una sola
+    vez. El directorio se comparte entre los workers del contenedor y se
+    mantiene por debajo de max_bytes borrando los archivos usados hace más
+    tiempo (cada acierto actualiza la fecha del archivo).
+    """
+
+    # Cada cuánto (segundos) revisar el tamaño total del directorio
+    EVICTION_INTERVAL = 30.0
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._last_eviction = 0.0
+        self._written_since_eviction = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(namespace: str, payload: bytes, params: Dict[str, Any] = None) -> str:
+        """
+        Calcular la clave de un resultado
+
+        Args:
+            namespace: Herramienta que produce el resultado ('remove-background', 'qr', ...)
+            payload: Bytes de entrada
+            params: Parámetros que cambian el resultado
+        """
+        digest = hashlib.sha256()
+        digest.update(namespace.encode('utf-8'))
+        digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(payload)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Leer un resultado (None si no está)"""
+        if not self.enabled:
+            return None
+
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            record_cache('result', False)
+            return None
+
+        record_cache('result', True)
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(data)
+        return data
+
+    def contains(self, key: str) -> bool:
+        """True si el resultado está en disco (sin leerlo)"""
+        return self.enabled and os.path.exists(self._path(key))
+
+    def set(self, key: str, data: bytes) -> None:
+        """Guardar un resultado"""
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Escritura atómica: otro worker puede estar leyendo la misma clave
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar en la caché de resultados: {str(e)}")
+            return
+
+        with self._lock:
+            self.writes += 1
+            self._written_since_eviction += len(data)
+            due = (time.monotonic() - self._last_eviction >= self.EVICTION_INTERVAL
+                   or self._written_since_eviction >= self.max_bytes // 10)
+        if due:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Borrar los archivos usados hace más tiempo hasta quedar bajo max_bytes"""
+        with self._lock:
+            self._last_eviction = time.monotonic()
+            self._written_since_eviction = 0
+
+        files = []
+        total = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        files.sort()
+        removed = 0
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        with self._lock:
+            self.evictions += removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores del proceso actual"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'max_bytes': self.max_bytes
+            }
+
+
+_result_cache: Optional[DiskResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> DiskResultCache:
+    """Obtener la caché de resultados de las herramientas de imagen"""
+    global _result_cache
+
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                directory = Config.RESULT_CACHE_DIR or os.path.join(tempfile.gettempdir(), 'bapesu-result-cache')
+                max_bytes = Config.RESULT_CACHE_MAX_BYTES if Config.RESULT_CACHE_ENABLED else 0
+                _result_cache = DiskResultCache(directory, max_bytes)
+    return _result_cache
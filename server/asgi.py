@@ -0,0 +1,18 @@
+from a2wsgi import WSGIMiddleware
+
+from app.config import Config
+from app import create_app
+
+# Punto de entrada ASGI: cada worker de uvicorn atiende muchas conexiones
+# en su bucle de eventos y ejecuta la app Flask en un pool de hilos, así una
+# llamada lenta a Supabase, DeepSeek o remove.bg ocupa un hilo y no el worker.
+#   gunicorn --workers=4 --worker-class uvicorn.workers.UvicornWorker asgi:app
+# (es el comando del Dockerfile) o, sin gunicorn:
+#   uvicorn asgi:app --workers 4 --host 0.0.0.0 --port 5000
+flask_app = create_app()
+app = WSGIMiddleware(flask_app, workers=Config.ASGI_WSGI_THREADS)
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=Config.HOST, port=Config.PORT)
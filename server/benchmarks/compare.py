@@ -0,0 +1,167 @@
+"""
+Comparar dos reportes de benchmarks/run.py
+
+Muestra la variación de latencias, throughput, errores y llamadas a
+Supabase por escenario y por endpoint, y marca como regresión lo que
+empeora más que el umbral. Con --fail termina con código 1 si hay
+regresiones (para CI).
+
+Uso:
+    python -m benchmarks.compare benchmarks/reports/base.json benchmarks/reports/nuevo.json
+    python -m benchmarks.compare base.json nuevo.json --threshold 15 --fail
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Ajustes que deben coincidir para que la comparación tenga sentido
+COMPARABLE_SETTINGS = ('size', 'seed', 'concurrency', 'think_ms', 'server', 'workers', 'threads')
+
+# Métricas de latencia que se comparan (ms, mayor es peor)
+LATENCY_METRICS = ('p50', 'p95', 'p99')
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as report_file:
+        return json.load(report_file)
+
+
+def change(base: float, new: float) -> Optional[float]:
+    """Variación porcentual (None si la base es 0)"""
+    if not base:
+        return None
+    return (new - base) / base * 100
+
+
+def format_change(base: float, new: float) -> str:
+    percent = change(base, new)
+    return f"{base:>9.2f} → {new:>9.2f} ({'   n/a' if percent is None else f'{percent:+6.1f}%'})"
+
+
+class Comparison:
+    def __init__(self, threshold: float, min_delta_ms: float):
+        self.threshold = threshold
+        self.min_delta_ms = min_delta_ms
+        self.regressions: List[str] = []
+        self.improvements: List[str] = []
+
+    def latency(self, label: str, base: float, new: float) -> str:
+        """Una latencia empeora si supera el umbral y además min_delta_ms"""
+        percent = change(base, new)
+        mark = ''
+        if percent is not None and abs(new - base) >= self.min_delta_ms:
+            if percent > self.threshold:
+                mark = '  REGRESIÓN'
+                self.regressions.append(f"{label}: {base:.2f} → {new:.2f} ms ({percent:+.1f}%)")
+            elif percent < -self.threshold:
+                mark = '  mejora'
+                self.improvements.append(f"{label}: {base:.2f} → {new:.2f} ms ({percent:+.1f}%)")
+        return format_change(base, new) + mark
+
+    def throughput(self, label: str, base: float, new: float) -> str:
+        percent = change(base, new)
+        mark = ''
+        if percent is not None:
+            if percent < -self.threshold:
+                mark = '  REGRESIÓN'
+                self.regressions.append(f"{label}: {base:.1f} → {new:.1f} req/s ({percent:+.1f}%)")
+            elif percent > self.threshold:
+                mark = '  mejora'
+                self.improvements.append(f"{label}: {base:.1f} → {new:.1f} req/s ({percent:+.1f}%)")
+        return format_change(base, new) + mark
+
+    def count(self, label: str, base: float, new: float, tolerance: float = 0.0) -> str:
+        """Errores y llamadas a Supabase: cualquier aumento mayor a tolerance es regresión"""
+        mark = ''
+        if new > base + tolerance:
+            mark = '  REGRESIÓN'
+            self.regressions.append(f"{label}: {base:g} → {new:g}")
+        elif new < base - tolerance:
+            mark = '  mejora'
+            self.improvements.append(f"{label}: {base:g} → {new:g}")
+        return format_change(base, new) + mark
+
+
+def settings_differences(base: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    base_settings = base.get('meta', {}).get('settings', {})
+    new_settings = new.get('meta', {}).get('settings', {})
+    return [f"{key}: {base_settings.get(key)} → {new_settings.get(key)}"
+            for key in COMPARABLE_SETTINGS if base_settings.get(key) != new_settings.get(key)]
+
+
+def compare_scenario(comparison: Comparison, name: str, base: Dict[str, Any], new: Dict[str, Any]) -> None:
+    print(f"\n== {name}")
+    for metric in LATENCY_METRICS:
+        print(f"  {metric + ' (ms)':<36} {comparison.latency(f'{name} {metric}', base['latency_ms'][metric], new['latency_ms'][metric])}")
+    print(f"  {'throughput (req/s)':<36} {comparison.throughput(f'{name} throughput', base['throughput_rps'], new['throughput_rps'])}")
+    print(f"  {'tasa de errores':<36} {comparison.count(f'{name} tasa de errores', base['error_rate'], new['error_rate'], 0.001)}")
+    print(f"  {'llamadas a Supabase por petición':<36} "
+          f"{comparison.count(f'{name} llamadas a Supabase por petición', base['supabase']['per_request'], new['supabase']['per_request'], 0.05)}")
+
+    base_probe, new_probe = base.get('probe', {}), new.get('probe', {})
+    for endpoint in sorted(set(base['endpoints']) & set(new['endpoints'])):
+        label = f"{name} {endpoint}"
+        print(f"  {endpoint}")
+        print(f"    {'p95 (ms)':<34} "
+              f"{comparison.latency(f'{label} p95', base['endpoints'][endpoint]['latency_ms']['p95'], new['endpoints'][endpoint]['latency_ms']['p95'])}")
+        if endpoint in base_probe and endpoint in new_probe:
+            print(f"    {'llamadas a Supabase':<34} "
+                  f"{comparison.count(f'{label} llamadas a Supabase', base_probe[endpoint]['supabase_requests'], new_probe[endpoint]['supabase_requests'])}")
+
+    for endpoint in sorted(set(new['endpoints']) - set(base['endpoints'])):
+        print(f"  {endpoint} (solo en el nuevo reporte)")
+    for endpoint in sorted(set(base['endpoints']) - set(new['endpoints'])):
+        print(f"  {endpoint} (solo en el reporte base)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Comparar dos reportes de benchmarks/run.py')
+    parser.add_argument('base', help='Reporte de referencia (JSON)')
+    parser.add_argument('new', help='Reporte a evaluar (JSON)')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Variación porcentual a partir de la cual se marca una regresión')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='Diferencia mínima en ms para marcar una latencia (evita ruido en endpoints rápidos)')
+    parser.add_argument('--fail', action='store_true', help='Terminar con código 1 si hay regresiones')
+    args = parser.parse_args()
+
+    base, new = load_report(args.base), load_report(args.new)
+    for label, report, path in (('base', base, args.base), ('nuevo', new, args.new)):
+        git = report.get('meta', {}).get('git', {})
+        dirty = ' (con cambios sin commit)' if git.get('dirty') else ''
+        print(f"{label:>6}: {Path(path).name}  commit {(git.get('commit') or '?')[:10]}{dirty}")
+
+    differences = settings_differences(base, new)
+    if differences:
+        print("\nAdvertencia: los reportes usan ajustes distintos; la comparación puede no ser válida:")
+        for difference in differences:
+            print(f"  {difference}")
+
+    comparison = Comparison(args.threshold, args.min_delta_ms)
+    for name in base['scenarios']:
+        if name in new['scenarios']:
+            compare_scenario(comparison, name, base['scenarios'][name], new['scenarios'][name])
+        else:
+            print(f"\n== {name} (no está en el nuevo reporte)")
+
+    print(f"\nUmbral: {args.threshold:g}% (latencias con diferencia de al menos {args.min_delta_ms:g} ms)")
+    if comparison.improvements:
+        print(f"\nMejoras ({len(comparison.improvements)}):")
+        for line in comparison.improvements:
+            print(f"  {line}")
+    if comparison.regressions:
+        print(f"\nRegresiones ({len(comparison.regressions)}):")
+        for line in comparison.regressions:
+            print(f"  {line}")
+    else:
+        print("\nSin regresiones")
+
+    return not (args.fail and comparison.regressions)
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,437 @@
+"""
+Datos sintéticos reproducibles para los benchmarks
+
+Genera las tablas de la tienda (products, orders, order_items,
+product_ratings, product_rating_stats, users, categories y las de
+analíticas) a partir de una semilla, con el mismo tamaño para productos,
+órdenes y calificaciones. Los IDs enteros y created_at crecen juntos, como
+en la base real, y las filas nuevas que inserta el benchmark siguen ese
+orden.
+
+Tamaños: 10k, 100k y 1m (o cualquier número). Con 1m la base en memoria
+ocupa unos 4 GB.
+"""
+
+import random
+import unicodedata
+import re
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+# Catálogo: categoría → prefijo del SKU y sustantivos de sus productos
+CATEGORIES = [
+    ('Calzado', 'CAL', ['Zapato', 'Tenis', 'Sandalia', 'Bota', 'Pantufla']),
+    ('Ropa', 'ROP', ['Camiseta', 'Pantalón', 'Chaqueta', 'Vestido', 'Buzo']),
+    ('Accesorios', 'ACC', ['Gorra', 'Bolso', 'Cinturón', 'Billetera', 'Reloj']),
+    ('Hogar', 'HOG', ['Lámpara', 'Cojín', 'Cortina', 'Espejo', 'Toalla']),
+    ('Cocina', 'COC', ['Sartén', 'Olla', 'Taza', 'Licuadora', 'Cuchillo']),
+    ('Tecnología', 'TEC', ['Audífonos', 'Cargador', 'Parlante', 'Mouse', 'Teclado']),
+    ('Deportes', 'DEP', ['Balón', 'Raqueta', 'Mancuerna', 'Colchoneta', 'Termo']),
+    ('Belleza', 'BEL', ['Crema', 'Perfume', 'Labial', 'Champú', 'Cepillo']),
+    ('Juguetes', 'JUG', ['Peluche', 'Rompecabezas', 'Carro', 'Muñeca', 'Bloques']),
+    ('Papelería', 'PAP', ['Cuaderno', 'Agenda', 'Lapicero', 'Morral', 'Marcador']),
+    ('Mascotas', 'MAS', ['Collar', 'Cama', 'Comedero', 'Arnés', 'Rascador']),
+    ('Jardín', 'JAR', ['Matera', 'Manguera', 'Tijera', 'Abono', 'Regadera'])
+]
+ADJECTIVES = ['clásico', 'deportivo', 'premium', 'básico', 'ecológico', 'urbano',
+              'compacto', 'elegante', 'resistente', 'ligero', 'infantil', 'profesional']
+COLORS = ['rojo', 'azul', 'negro', 'blanco', 'verde', 'gris', 'amarillo', 'rosado', 'morado', 'café']
+USES = ['uso diario', 'regalar', 'viajes', 'la oficina', 'el hogar', 'actividades al aire libre']
+COMMENTS = ['Excelente calidad', 'Llegó a tiempo', 'Buen precio', 'Cumple lo prometido',
+            'Regular, esperaba más', 'No me gustó el material', 'Lo volvería a comprar', None]
+ORDER_STATUSES = ['pending', 'confirmed', 'processing', 'shipped', 'delivered', 'cancelled']
+ORDER_STATUS_WEIGHTS = [10, 8, 7, 15, 55, 5]
+CITIES = [('Bogotá', 'Cundinamarca'), ('Medellín', 'Antioquia'), ('Cali', 'Valle del Cauca'),
+          ('Barranquilla', 'Atlántico'), ('Bucaramanga', 'Santander'), ('Pereira', 'Risaralda')]
+FIRST_NAMES = ['Ana', 'Carlos', 'Lucía', 'Andrés', 'María', 'Juan', 'Valentina', 'Santiago', 'Camila', 'Mateo']
+LAST_NAMES = ['Gómez', 'Rodríguez', 'Martínez', 'López', 'García', 'Pérez', 'Díaz', 'Torres', 'Ramírez', 'Vargas']
+
+ADMIN_USERS = 5
+
+# Los datos cubren HISTORY_DAYS días que terminan en DATA_END
+DATA_END = datetime(2025, 6, 30, tzinfo=timezone.utc)
+HISTORY_DAYS = 540
+
+# Esquema que usa el PostgREST local (benchmarks/postgrest.py):
+#   primary_key: columna de la llave primaria
+#   auto_id:     la base asigna IDs enteros crecientes
+#   sequential:  el orden de inserción coincide con (created_at, id)
+#   indexes:     columnas con índice hash para filtros eq/in
+#   defaults:    valores de las columnas no enviadas en un insert
+#   touch:       columnas que un UPDATE actualiza solas (triggers)
+SCHEMA: Dict[str, Dict[str, Any]] = {
+    'products': {
+        'primary_key': 'id', 'auto_id': True, 'sequential': True,
+        'indexes': ('category', 'sku'),
+        'defaults': {'is_active': True, 'is_featured': False, 'status': 'Activo', 'stock': 0,
+                     'tags': [], 'specifications': {}},
+        'touch': ('updated_at',)
+    },
+    'categories': {
+        'primary_key': 'id', 'auto_id': True, 'sequential': True,
+        'indexes': ('slug', 'name'),
+        'defaults': {'is_active': True, 'is_featured': False, 'sort_order': 0},
+        'touch': ('updated_at',)
+    },
+    'users': {
+        'primary_key': 'id', 'auto_id': False, 'sequential': False,
+        'indexes': ('email',),
+        'defaults': {'role': 'user', 'is_active': True},
+        'touch': ('updated_at',)
+    },
+    'orders': {
+        'primary_key': 'id', 'auto_id': True, 'sequential': True,
+        'indexes': ('user_id', 'status'),
+        'defaults': {'status': 'pending', 'shipping_country': 'Colombia', 'whatsapp_sent': True, 'deleted_at': None},
+        'touch': ('updated_at',)
+    },
+    'order_items': {
+        'primary_key': 'id', 'auto_id': True, 'sequential': True,
+        'indexes': ('order_id', 'product_id'),
+        'defaults': {},
+        'touch': ()
+    },
+    'product_ratings': {
+        'primary_key': 'id', 'auto_id': True, 'sequential': True,
+        'indexes': ('product_id', 'user_id', 'order_id'),
+        'defaults': {'is_approved': False},
+        'touch': ('updated_at',)
+    },
+    'product_rating_stats': {
+        'primary_key': 'product_id', 'auto_id': False, 'sequential': False,
+        'indexes': (),
+        'defaults': {'ratings_count': 0, 'ratings_sum': 0, 'count_1': 0, 'count_2': 0,
+                     'count_3': 0, 'count_4': 0, 'count_5': 0},
+        'touch': ('updated_at',)
+    },
+    'dashboard_metrics': {
+        'primary_key': 'id', 'auto_id': True, 'sequential': False,
+        'indexes': ('date',),
+        'defaults': {},
+        'touch': ('updated_at',)
+    },
+    'system_alerts': {
+        'primary_key': 'id', 'auto_id': True, 'sequential': True,
+        'indexes': (),
+        'defaults': {'is_resolved': False, 'severity': 'info'},
+        'touch': ()
+    },
+    'system_activity': {
+        'primary_key': 'id', 'auto_id': True, 'sequential': True,
+        'indexes': (),
+        'defaults': {},
+        'touch': ()
+    }
+}
+
+# Relaciones para los recursos embebidos (select=*,users(first_name)):
+# (tabla, recurso) → (columna local, columna del recurso, cardinalidad)
+RELATIONSHIPS = {
+    ('product_ratings', 'users'): ('user_id', 'id', 'one'),
+    ('product_ratings', 'products'): ('product_id', 'id', 'one'),
+    ('product_ratings', 'orders'): ('order_id', 'id', 'one'),
+    ('orders', 'users'): ('user_id', 'id', 'one'),
+    ('orders', 'order_items'): ('id', 'order_id', 'many'),
+    ('order_items', 'orders'): ('order_id', 'id', 'one'),
+    ('order_items', 'products'): ('product_id', 'id', 'one'),
+    ('products', 'product_ratings'): ('id', 'product_id', 'many'),
+    ('products', 'product_rating_stats'): ('id', 'product_id', 'one'),
+    ('product_rating_stats', 'products'): ('product_id', 'id', 'one')
+}
+
+
+def parse_size(value: str) -> int:
+    """Convertir '10k', '100k', '1m' o un número en cantidad de filas"""
+    text = str(value).strip().lower()
+    if text in SIZES:
+        return SIZES[text]
+    try:
+        size = int(text.replace('_', ''))
+    except ValueError:
+        raise ValueError(f"Tamaño inválido: {value} (use 10k, 100k, 1m o un número)")
+    if size < 100:
+        raise ValueError("El tamaño mínimo es 100 filas")
+    return size
+
+
+def format_timestamp(moment: datetime) -> str:
+    """Marca de tiempo como la devuelve PostgREST (siempre con microsegundos, para compararlas como texto)"""
+    return moment.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
+
+
+def now_timestamp() -> str:
+    return format_timestamp(datetime.now(timezone.utc))
+
+
+def normalize_words(text: str) -> List[str]:
+    """Palabras en minúsculas y sin acentos (como unaccent + to_tsvector, sin raíces)"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    plain = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return re.findall(r'[a-z0-9]+', plain)
+
+
+def search_terms() -> List[str]:
+    """Términos de búsqueda que usan los escenarios: palabras, prefijos y combinaciones"""
+    nouns = [noun for _, _, category_nouns in CATEGORIES for noun in category_nouns]
+    terms = [noun.lower() for noun in nouns]
+    terms += [noun.lower()[:4] for noun in nouns]
+    terms += [f"{noun.lower()} {color}" for noun in nouns[::3] for color in COLORS[:4]]
+    terms += [f"{adjective} {color[:3]}" for adjective in ADJECTIVES[:4] for color in COLORS[:3]]
+    return terms
+
+
+def _timeline(count: int, rng: random.Random) -> List[str]:
+    """count marcas de tiempo crecientes repartidas en HISTORY_DAYS días"""
+    start = DATA_END - timedelta(days=HISTORY_DAYS)
+    step = HISTORY_DAYS * 86400 / max(count, 1)
+    return [format_timestamp(start + timedelta(seconds=index * step + rng.random() * step * 0.5))
+            for index in range(count)]
+
+
+def build_dataset(size: int, seed: int = 42) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Generar todas las tablas
+
+    Args:
+        size: Cantidad de productos, órdenes y calificaciones
+        seed: Semilla; la misma semilla produce los mismos datos
+
+    Returns:
+        Dict tabla → filas (ordenadas por llave primaria)
+    """
+    rng = random.Random(seed)
+
+    categories = _build_categories(rng)
+    users = _build_users(max(200, size // 20), rng)
+    products = _build_products(size, rng)
+    orders, order_items = _build_orders(size, users, products, rng)
+    ratings = _build_ratings(size, users, products, orders, rng)
+
+    return {
+        'categories': categories,
+        'users': users,
+        'products': products,
+        'orders': orders,
+        'order_items': order_items,
+        'product_ratings': ratings,
+        'product_rating_stats': _build_rating_stats(ratings),
+        'dashboard_metrics': _build_dashboard_metrics(size, len(users), rng),
+        'system_alerts': _build_alerts(rng),
+        'system_activity': _build_activity(users, rng)
+    }
+
+
+def _build_categories(rng: random.Random) -> List[Dict[str, Any]]:
+    timestamps = _timeline(len(CATEGORIES), rng)
+    rows = []
+    for index, (name, _, nouns) in enumerate(CATEGORIES):
+        slug = '-'.join(normalize_words(name))
+        rows.append({
+            'id': index + 1,
+            'name': name,
+            'slug': slug,
+            'description': f"{', '.join(nouns[:3])} y más",
+            'image': f"https://cdn.bench.local/categories/{slug}.jpg",
+            'is_active': True,
+            'is_featured': index < 6,
+            'sort_order': index,
+            'created_at': timestamps[index],
+            'updated_at': timestamps[index]
+        })
+    return rows
+
+
+def _build_users(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    timestamps = _timeline(count, rng)
+    rows = []
+    for index in range(count):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+        rows.append({
+            'id': user_id,
+            'email': f"usuario{index}@bench.local",
+            'role': 'admin' if index < ADMIN_USERS else 'user',
+            'first_name': rng.choice(FIRST_NAMES),
+            'last_name': rng.choice(LAST_NAMES),
+            'is_active': rng.random() > 0.05,
+            'created_at': timestamps[index],
+            'updated_at': timestamps[index]
+        })
+    return rows
+
+
+def _build_products(count: int, rng: random.Random) -> List[Dict[str, Any]]:
+    timestamps = _timeline(count, rng)
+    images = [f"https://cdn.bench.local/products/{index}.jpg" for index in range(64)]
+    rows = []
+    for index in range(count):
+        category, prefix, nouns = rng.choice(CATEGORIES)
+        noun, adjective, color = rng.choice(nouns), rng.choice(ADJECTIVES), rng.choice(COLORS)
+        stock = 0 if rng.random() < 0.08 else rng.randint(1, 200)
+        price = rng.randint(10, 900) * 1000
+        rows.append({
+            'id': index + 1,
+            'name': f"{noun} {adjective} {color}",
+            'description': f"{noun} {adjective} de color {color}, ideal para {rng.choice(USES)}.",
+            'sku': f"{prefix}-{index + 1:07d}",
+            'category': category,
+            'price': price,
+            'original_price': price + rng.choice((0, 0, 5000, 10000)),
+            'stock': stock,
+            'status': 'Sin Stock' if stock == 0 else 'Activo',
+            'is_active': rng.random() > 0.05,
+            'is_featured': rng.random() < 0.03,
+            'image': rng.choice(images),
+            'tags': [adjective, color],
+            'specifications': {'color': color, 'material': rng.choice(('algodón', 'cuero', 'plástico', 'metal'))},
+            'created_at': timestamps[index],
+            'updated_at': timestamps[index]
+        })
+    return rows
+
+
+def _build_orders(count: int, users: List[Dict], products: List[Dict],
+                  rng: random.Random) -> tuple:
+    timestamps = _timeline(count, rng)
+    customers = users[ADMIN_USERS:]
+    orders, items = [], []
+    for index in range(count):
+        customer = rng.choice(customers)
+        city, state = rng.choice(CITIES)
+        order_id = index + 1
+        subtotal = 0
+        for _ in range(rng.choice((1, 1, 2, 3))):
+            product = products[rng.randrange(len(products))]
+            quantity = rng.randint(1, 3)
+            subtotal += product['price'] * quantity
+            items.append({
+                'id': len(items) + 1,
+                'order_id': order_id,
+                'product_id': product['id'],
+                'product_name': product['name'],
+                'product_price': product['price'],
+                'quantity': quantity,
+                'total_price': product['price'] * quantity,
+                'created_at': timestamps[index]
+            })
+        shipping = rng.choice((0, 8000, 12000))
+        orders.append({
+            'id': order_id,
+            'user_id': customer['id'],
+            'customer_name': f"{customer['first_name']} {customer['last_name']}",
+            'customer_email': customer['email'],
+            'customer_phone': f"3{rng.randint(100000000, 199999999)}",
+            'shipping_address': f"Calle {rng.randint(1, 150)} # {rng.randint(1, 99)}-{rng.randint(1, 99)}",
+            'shipping_city': city,
+            'shipping_state': state,
+            'shipping_zip_code': f"{rng.randint(100000, 999999)}",
+            'shipping_country': 'Colombia',
+            'subtotal': subtotal,
+            'shipping_cost': shipping,
+            'total_amount': subtotal + shipping,
+            'payment_method': rng.choice(('nequi', 'transferencia', 'contraentrega')),
+            'shipping_method': rng.choice(('estandar', 'express')),
+            'status': rng.choices(ORDER_STATUSES, ORDER_STATUS_WEIGHTS)[0],
+            'comments': None,
+            'whatsapp_sent': True,
+            'tracking_number': None,
+            'tracking_url': None,
+            'deleted_at': None,
+            'created_at': timestamps[index],
+            'updated_at': timestamps[index]
+        })
+    return orders, items
+
+
+def _build_ratings(count: int, users: List[Dict], products: List[Dict], orders: List[Dict],
+                   rng: random.Random) -> List[Dict[str, Any]]:
+    timestamps = _timeline(count, rng)
+    rows = []
+    for index in range(count):
+        # Pocas referencias concentran la mayoría de las calificaciones
+        product = products[int(len(products) * rng.random() ** 3)]
+        order = orders[rng.randrange(len(orders))]
+        rows.append({
+            'id': index + 1,
+            'product_id': product['id'],
+            'user_id': order['user_id'],
+            'order_id': order['id'],
+            'rating': rng.choices((1, 2, 3, 4, 5), (4, 5, 12, 30, 49))[0],
+            'comment': rng.choice(COMMENTS),
+            'is_approved': rng.random() < 0.85,
+            'created_at': timestamps[index],
+            'updated_at': timestamps[index]
+        })
+    return rows
+
+
+def _build_rating_stats(ratings: List[Dict]) -> List[Dict[str, Any]]:
+    """Agregados de las calificaciones aprobadas (como rebuild_product_rating_stats)"""
+    stats: Dict[int, Dict[str, Any]] = {}
+    for rating in ratings:
+        if not rating['is_approved']:
+            continue
+        row = stats.get(rating['product_id'])
+        if row is None:
+            row = stats[rating['product_id']] = {
+                'product_id': rating['product_id'], 'ratings_count': 0, 'ratings_sum': 0,
+                'count_1': 0, 'count_2': 0, 'count_3': 0, 'count_4': 0, 'count_5': 0
+            }
+        row['ratings_count'] += 1
+        row['ratings_sum'] += rating['rating']
+        row[f"count_{rating['rating']}"] += 1
+        row['updated_at'] = rating['created_at']
+    return [stats[product_id] for product_id in sorted(stats)]
+
+
+def _build_dashboard_metrics(size: int, users: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Métricas diarias de los últimos 60 días (relativas a hoy: el dashboard consulta los últimos 30)"""
+    today = date.today()
+    rows = []
+    for offset in range(60, -1, -1):
+        day = today - timedelta(days=offset)
+        rows.append({
+            'id': len(rows) + 1,
+            'date': day.isoformat(),
+            'total_orders': size - offset * 10,
+            'total_products': size,
+            'total_users': users,
+            'monthly_revenue': rng.randint(50, 400) * 1_000_000,
+            'orders_change': f"+{rng.randint(0, 15)}%",
+            'products_change': f"+{rng.randint(0, 5)}%",
+            'users_change': f"+{rng.randint(0, 10)}%",
+            'revenue_change': f"+{rng.randint(0, 20)}%",
+            'low_stock_products': rng.randint(0, size // 50),
+            'pending_orders': rng.randint(0, size // 20),
+            'created_at': format_timestamp(datetime.combine(day, datetime.min.time(), timezone.utc)),
+            'updated_at': format_timestamp(datetime.combine(day, datetime.min.time(), timezone.utc))
+        })
+    return rows
+
+
+def _build_alerts(rng: random.Random) -> List[Dict[str, Any]]:
+    timestamps = _timeline(20, rng)
+    return [{
+        'id': index + 1,
+        'alert_type': rng.choice(('stock', 'orders', 'system')),
+        'severity': rng.choice(('info', 'warning', 'error')),
+        'title': f"Alerta {index + 1}",
+        'message': rng.choice(('Stock bajo en productos destacados', 'Órdenes pendientes sin confirmar',
+                               'Tiempo de respuesta elevado')),
+        'is_resolved': index < 12,
+        'created_at': timestamps[index]
+    } for index in range(20)]
+
+
+def _build_activity(users: List[Dict], rng: random.Random) -> List[Dict[str, Any]]:
+    timestamps = _timeline(500, rng)
+    return [{
+        'id': index + 1,
+        'activity_type': rng.choice(('order_created', 'product_updated', 'user_registered')),
+        'description': 'Actividad generada para el benchmark',
+        'user_id': rng.choice(users)['id'],
+        'metadata': {},
+        'created_at': timestamps[index]
+    } for index in range(500)]
@@ -0,0 +1,817 @@
+"""
+Motor de consultas en memoria del PostgREST local
+
+Interpreta el subconjunto de PostgREST que usa app/services (select con
+recursos embebidos, filtros eq/neq/gt/gte/lt/lte/like/ilike/in/is/fts,
+or/and anidados, order, limit/offset, conteos y escrituras) sobre las
+tablas de benchmarks/dataset.py.
+
+Para que la base simulada no sea el cuello de botella con 1M de filas:
+- los filtros eq/in usan índices hash, fts un índice invertido y los
+  ilike 'prefijo*' un índice ordenado;
+- las consultas ordenadas por (created_at, id) recorren la tabla en orden
+  de inserción y se detienen al completar la página;
+- los resultados completos (conteos exactos, páginas con offset) se
+  guardan por versión de tabla, así las páginas siguientes no repiten el
+  recorrido.
+El costo que se simula (ver LatencyModel en postgrest.py) se calcula con
+las filas examinadas, no con el tiempo que tarda Python.
+"""
+
+import bisect
+import operator
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .dataset import RELATIONSHIPS, SCHEMA, normalize_words, now_timestamp
+
+# Columnas que forman search_vector (ver §1 de database/api_functions.sql)
+SEARCH_VECTOR_COLUMNS = ('name', 'sku', 'category', 'description')
+
+# Offset máximo que se resuelve recorriendo la tabla; más allá se arma el
+# resultado completo y se guarda para las páginas siguientes
+STREAM_MAX_OFFSET = 1000
+
+# Filas que se leen para estimar un conteo 'planned'
+ESTIMATE_SAMPLE_ROWS = 2000
+
+# Umbral de 'estimated': por debajo se cuenta exacto
+ESTIMATE_EXACT_THRESHOLD = 1000
+
+RESULT_CACHE_ENTRIES = 32
+
+_INVALID = object()
+
+_COMPARATORS = {
+    'eq': operator.eq, 'neq': operator.ne,
+    'gt': operator.gt, 'gte': operator.ge,
+    'lt': operator.lt, 'lte': operator.le
+}
+_TEXT_SEARCH = ('fts', 'plfts', 'phfts', 'wfts')
+OPERATORS = set(_COMPARATORS) | {'like', 'ilike', 'in', 'is'} | set(_TEXT_SEARCH)
+
+
+class QueryError(Exception):
+    """Error con el formato de respuesta de PostgREST"""
+
+    def __init__(self, status: int, code: str, message: str, details: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.details = details
+
+    def body(self) -> Dict[str, Any]:
+        return {'code': self.code, 'details': self.details, 'hint': None, 'message': self.message}
+
+
+# ----------------------------------------------------------------------
+# Análisis de la consulta
+# ----------------------------------------------------------------------
+
+def split_top_level(text: str) -> List[str]:
+    """Separar por comas que no estén dentro de paréntesis ni comillas"""
+    parts, depth, quoted, escaped, current = [], 0, False, False, []
+    for char in text:
+        if escaped:
+            current.append(char)
+            escaped = False
+            continue
+        if char == '\\' and quoted:
+            current.append(char)
+            escaped = True
+            continue
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            parts.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if current or parts:
+        parts.append(''.join(current).strip())
+    return [part for part in parts if part]
+
+
+def unquote(value: str) -> str:
+    """Quitar las comillas dobles de un valor ("a \\"b\\"" → a "b")"""
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+
+def _coerce(raw: str, kind: type) -> Any:
+    """Convertir el texto de un filtro al tipo de la columna"""
+    try:
+        if kind is bool:
+            lowered = raw.lower()
+            if lowered in ('true', 't', '1'):
+                return True
+            if lowered in ('false', 'f', '0'):
+                return False
+            return _INVALID
+        if kind is int:
+            try:
+                return int(raw)
+            except ValueError:
+                return float(raw)
+        if kind is float:
+            return float(raw)
+        if kind is str:
+            return raw
+    except ValueError:
+        return _INVALID
+    return _INVALID
+
+
+class Condition:
+    """Filtro sobre una columna: columna=[not.]operador.valor"""
+
+    def __init__(self, column: str, operator_name: str, value: str, negate: bool = False):
+        self.column = column
+        self.operator = operator_name.partition('(')[0]
+        if self.operator not in OPERATORS:
+            raise QueryError(400, 'PGRST100', f'"{operator_name}" no es un operador soportado por el PostgREST local')
+        self.value = value
+        self.negate = negate
+        self.key = f"{column}={'not.' if negate else ''}{operator_name}.{value}"
+
+    def predicate(self, table: 'Table') -> Callable[[Dict], bool]:
+        column, negate = self.column, self.negate
+
+        if self.operator == 'is':
+            target = self.value.lower()
+            if target == 'null':
+                base = lambda row: row.get(column) is None
+            elif target in ('true', 'false'):
+                expected = target == 'true'
+                base = lambda row: row.get(column) is expected
+            else:
+                base = lambda row: row.get(column) is None
+            return (lambda row: not base(row)) if negate else base
+
+        if self.operator in _TEXT_SEARCH:
+            matched = table.text_search(column, self.operator, self.value)
+            key = table.primary_key
+            if negate:
+                return lambda row: row[key] not in matched
+            return lambda row: row[key] in matched
+
+        compare = self._comparison()
+
+        def test(row):
+            # Comparar con NULL nunca es verdadero, ni siquiera negado
+            value = row.get(column)
+            return value is not None and compare(value) != negate
+        return test
+
+    def _comparison(self) -> Callable[[Any], bool]:
+        if self.operator in ('like', 'ilike'):
+            pattern = like_regex(self.value, self.operator == 'ilike')
+            return lambda value: pattern.fullmatch(value if isinstance(value, str) else str(value)) is not None
+
+        if self.operator == 'in':
+            raw_values = [unquote(item) for item in split_top_level(self.value.strip()[1:-1])]
+            by_type: Dict[type, set] = {}
+
+            def contains(value):
+                kind = type(value)
+                values = by_type.get(kind)
+                if values is None:
+                    values = by_type[kind] = {item for item in (_coerce(raw, kind) for raw in raw_values)
+                                              if item is not _INVALID}
+                return value in values
+            return contains
+
+        comparator = _COMPARATORS[self.operator]
+        raw = self.value
+        by_type: Dict[type, Any] = {}
+
+        def compare(value):
+            kind = type(value)
+            target = by_type.get(kind)
+            if target is None:
+                target = by_type[kind] = _coerce(raw, kind)
+            return target is not _INVALID and comparator(value, target)
+        return compare
+
+    def candidates(self, table: 'Table') -> Optional[Iterable]:
+        """Llaves primarias que pueden cumplir el filtro según un índice (None si no hay índice)"""
+        if self.negate:
+            return None
+        if self.operator == 'eq':
+            return table.lookup(self.column, [self.value])
+        if self.operator == 'in':
+            return table.lookup(self.column, [unquote(item) for item in split_top_level(self.value.strip()[1:-1])])
+        if self.operator in _TEXT_SEARCH:
+            return table.text_search(self.column, self.operator, self.value)
+        if self.operator in ('like', 'ilike'):
+            prefix = literal_prefix(self.value)
+            if prefix:
+                return table.prefix_lookup(self.column, prefix)
+        return None
+
+
+class Logic:
+    """Combinación or(...) / and(...) de filtros"""
+
+    def __init__(self, operator_name: str, children: List[Any], negate: bool = False):
+        self.operator = operator_name
+        self.children = children
+        self.negate = negate
+        self.key = f"{'not.' if negate else ''}{operator_name}({','.join(child.key for child in children)})"
+
+    def predicate(self, table: 'Table') -> Callable[[Dict], bool]:
+        tests = [child.predicate(table) for child in self.children]
+        if self.operator == 'or':
+            base = lambda row: any(test(row) for test in tests)
+        else:
+            base = lambda row: all(test(row) for test in tests)
+        return (lambda row: not base(row)) if self.negate else base
+
+    def candidates(self, table: 'Table') -> Optional[Iterable]:
+        if self.negate:
+            return None
+        found = [child.candidates(table) for child in self.children]
+        if self.operator == 'or':
+            if any(item is None for item in found):
+                return None
+            union = set()
+            for item in found:
+                union.update(item)
+            return union
+        return _smallest(found)
+
+
+def _sort_key(value: Any, invert: bool) -> tuple:
+    return ((value is None) != invert, 0 if value is None else value)
+
+
+def _smallest(candidate_sets: Sequence[Optional[Iterable]]) -> Optional[Iterable]:
+    usable = [item for item in candidate_sets if item is not None]
+    return min(usable, key=len) if usable else None
+
+
+def like_regex(pattern: str, ignore_case: bool):
+    """Patrón like de PostgREST (% o * como comodín, _ un carácter) → expresión regular"""
+    parts = []
+    for char in pattern:
+        if char in '%*':
+            parts.append('.*')
+        elif char == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    return re.compile(''.join(parts), re.IGNORECASE | re.DOTALL if ignore_case else re.DOTALL)
+
+
+def literal_prefix(pattern: str) -> Optional[str]:
+    """Prefijo literal de un patrón 'abc%' (None si tiene comodines al inicio o en el medio)"""
+    if not pattern or pattern[-1] not in '%*':
+        return None
+    prefix = pattern.rstrip('%*')
+    if not prefix or any(char in '%*_' for char in prefix):
+        return None
+    return prefix.lower()
+
+
+def parse_filter(column: str, expression: str, nested: bool = False) -> Condition:
+    """
+    Leer un filtro de columna: 'eq.5', 'not.is.null', 'fts(es_unaccent).zapato:*'
+
+    Dentro de or(...)/and(...) (nested) los valores pueden ir entre comillas.
+    """
+    negate = False
+    if expression.startswith('not.'):
+        negate, expression = True, expression[4:]
+    operator_name, separator, value = expression.partition('.')
+    if not separator:
+        raise QueryError(400, 'PGRST100', f'Filtro inválido para "{column}": {expression}')
+    if nested and not operator_name == 'in':
+        value = unquote(value)
+    return Condition(column, operator_name, value, negate)
+
+
+def parse_logic(operator_name: str, expression: str, negate: bool = False) -> Logic:
+    """Leer or=(a.eq.1,and(b.gt.2,c.is.null))"""
+    expression = expression.strip()
+    if not (expression.startswith('(') and expression.endswith(')')):
+        raise QueryError(400, 'PGRST100', f'Expresión lógica inválida: {expression}')
+
+    children = []
+    for part in split_top_level(expression[1:-1]):
+        child_negate = False
+        if part.startswith('not.'):
+            child_negate, part = True, part[4:]
+        if part.startswith('or(') or part.startswith('and('):
+            name, _, rest = part.partition('(')
+            children.append(parse_logic(name, '(' + rest, child_negate))
+            continue
+        column, separator, condition = part.partition('.')
+        if not separator:
+            raise QueryError(400, 'PGRST100', f'Filtro inválido: {part}')
+        if child_negate:
+            condition = 'not.' + condition
+        children.append(parse_filter(column, condition, nested=True))
+    return Logic(operator_name, children, negate)
+
+
+class SelectItem:
+    """Elemento del parámetro select: '*', columna, alias:columna o recurso(columnas)"""
+
+    def __init__(self, kind: str, name: str = '*', alias: Optional[str] = None,
+                 inner: bool = False, children: Optional[List['SelectItem']] = None):
+        self.kind = kind
+        self.name = name
+        self.alias = alias
+        self.inner = inner
+        self.children = children or []
+
+
+def parse_select(text: Optional[str]) -> List[SelectItem]:
+    if not text:
+        return [SelectItem('star')]
+
+    items = []
+    for part in split_top_level(text.replace('\n', ' ')):
+        alias = None
+        if ':' in part.split('(', 1)[0] and '::' not in part.split('(', 1)[0]:
+            alias, part = [piece.strip() for piece in part.split(':', 1)]
+        if '(' in part:
+            name, _, rest = part.partition('(')
+            name, _, hint = name.strip().partition('!')
+            items.append(SelectItem('embed', name, alias, inner=hint == 'inner',
+                                    children=parse_select(rest.rsplit(')', 1)[0])))
+        elif part == '*':
+            items.append(SelectItem('star'))
+        else:
+            items.append(SelectItem('column', part.split('::', 1)[0].strip(), alias))
+    return items
+
+
+def parse_order(values: Iterable[str]) -> Tuple[Tuple[str, bool, Optional[bool]], ...]:
+    """order=created_at.desc,id.desc.nullslast → ((columna, desc, nulls_first), ...)"""
+    order = []
+    for value in values:
+        for part in split_top_level(value):
+            pieces = part.split('.')
+            column, desc, nulls_first = pieces[0], False, None
+            for modifier in pieces[1:]:
+                if modifier == 'desc':
+                    desc = True
+                elif modifier == 'asc':
+                    desc = False
+                elif modifier == 'nullsfirst':
+                    nulls_first = True
+                elif modifier == 'nullslast':
+                    nulls_first = False
+            order.append((column, desc, nulls_first))
+    return tuple(order)
+
+
+# ----------------------------------------------------------------------
+# Tablas
+# ----------------------------------------------------------------------
+
+class Table:
+    """Filas de una tabla (dict llave → fila, en orden de inserción) con sus índices"""
+
+    def __init__(self, name: str, rows: List[Dict[str, Any]]):
+        spec = SCHEMA.get(name, {})
+        self.name = name
+        self.primary_key = spec.get('primary_key', 'id')
+        self.auto_id = spec.get('auto_id', True)
+        self.sequential = spec.get('sequential', False)
+        self.defaults = spec.get('defaults', {})
+        self.touch = spec.get('touch', ())
+        self.columns: List[str] = list(rows[0]) if rows else list(self.defaults)
+        self.rows: Dict[Any, Dict[str, Any]] = {row[self.primary_key]: row for row in rows}
+        self.version = 0
+
+        self.column_types: Dict[str, type] = {}
+        for row in rows[:1000]:
+            for column, value in row.items():
+                if value is not None and column not in self.column_types:
+                    self.column_types[column] = type(value)
+
+        self.indexes: Dict[str, Dict[Any, Dict[Any, None]]] = {column: {} for column in spec.get('indexes', ())}
+        for key, row in self.rows.items():
+            self._index_add(key, row)
+
+        self._next_id = max((key for key in self.rows if isinstance(key, int)), default=0) + 1
+        self._text_indexes: Dict[str, Tuple[int, Dict[str, List], List[str]]] = {}
+        self._prefix_indexes: Dict[str, Tuple[int, List[Tuple[str, Any]]]] = {}
+
+    # -- índices ---------------------------------------------------------
+
+    def _index_add(self, key, row) -> None:
+        for column, index in self.indexes.items():
+            index.setdefault(row.get(column), {})[key] = None
+
+    def _index_remove(self, key, row) -> None:
+        for column, index in self.indexes.items():
+            bucket = index.get(row.get(column))
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del index[row.get(column)]
+
+    def lookup(self, column: str, raw_values: List[str]) -> Optional[set]:
+        """Llaves de las filas con column en raw_values (None si la columna no tiene índice)"""
+        kind = self.column_types.get(column, str)
+        values = [value for value in (_coerce(raw, kind) for raw in raw_values) if value is not _INVALID]
+        if column == self.primary_key:
+            return {value for value in values if value in self.rows}
+        index = self.indexes.get(column)
+        if index is None:
+            return None
+        found = set()
+        for value in values:
+            found.update(index.get(value, ()))
+        return found
+
+    def text_search(self, column: str, operator_name: str, query: str) -> set:
+        """
+        Llaves de las filas que cumplen un filtro de texto completo
+
+        fts acepta 'zapat:* & roj:*' (prefijos con :*); plfts, phfts y wfts
+        buscan las palabras completas. No se aplican raíces del español.
+        """
+        vocabulary, postings = self._text_index(column)
+        terms = []
+        if operator_name == 'fts':
+            for part in unquote(query).split('&'):
+                part = part.strip()
+                prefix = part.endswith(':*')
+                for word in normalize_words(part[:-2] if prefix else part):
+                    terms.append((word, prefix))
+        else:
+            terms = [(word, False) for word in normalize_words(unquote(query))]
+        if not terms:
+            return set()
+
+        matched = None
+        for word, prefix in terms:
+            if prefix:
+                start = bisect.bisect_left(vocabulary, word)
+                end = bisect.bisect_left(vocabulary, word + '\uffff')
+                keys = set()
+                for entry in vocabulary[start:end]:
+                    keys.update(postings[entry])
+            else:
+                keys = set(postings.get(word, ()))
+            matched = keys if matched is None else matched & keys
+            if not matched:
+                return set()
+        return matched
+
+    def _text_index(self, column: str) -> Tuple[List[str], Dict[str, List]]:
+        cached = self._text_indexes.get(column)
+        if cached is not None and cached[0] == self.version:
+            return cached[2], cached[1]
+
+        sources = SEARCH_VECTOR_COLUMNS if column == 'search_vector' else (column,)
+        postings: Dict[str, List] = {}
+        for key, row in self.rows.items():
+            words = set()
+            for source in sources:
+                value = row.get(source)
+                if value:
+                    words.update(normalize_words(str(value)))
+            for word in words:
+                postings.setdefault(word, []).append(key)
+        vocabulary = sorted(postings)
+        self._text_indexes[column] = (self.version, postings, vocabulary)
+        return vocabulary, postings
+
+    def prefix_lookup(self, column: str, prefix: str) -> set:
+        """Llaves de las filas cuyo valor (en minúsculas) empieza con prefix"""
+        cached = self._prefix_indexes.get(column)
+        if cached is None or cached[0] != self.version:
+            entries = sorted((str(row[column]).lower(), key) for key, row in self.rows.items()
+                             if row.get(column) is not None)
+            cached = self._prefix_indexes[column] = (self.version, entries)
+        entries = cached[1]
+        start = bisect.bisect_left(entries, (prefix,))
+        end = bisect.bisect_left(entries, (prefix + '\uffff',))
+        return {key for _, key in entries[start:end]}
+
+    # -- escrituras ------------------------------------------------------
+
+    def insert(self, data: Dict[str, Any], upsert: bool = False) -> Dict[str, Any]:
+        row = {column: None for column in self.columns}
+        row.update(self.defaults)
+        row.update(data)
+        now = now_timestamp()
+        for column in ('created_at', 'updated_at'):
+            if column in self.columns and row.get(column) is None:
+                row[column] = now
+
+        key = row.get(self.primary_key)
+        if key is None:
+            if self.auto_id:
+                key = self._next_id
+            elif self.primary_key == 'id':
+                key = str(uuid.uuid4())
+            else:
+                raise QueryError(400, '23502', f'null value in column "{self.primary_key}" violates not-null constraint')
+            row[self.primary_key] = key
+        if isinstance(key, int) and key >= self._next_id:
+            self._next_id = key + 1
+
+        existing = self.rows.get(key)
+        if existing is not None:
+            if not upsert:
+                raise QueryError(409, '23505', f'duplicate key value violates unique constraint "{self.name}_pkey"')
+            return self.update(key, data)
+
+        self.rows[key] = row
+        self._index_add(key, row)
+        self.version += 1
+        return row
+
+    def update(self, key, changes: Dict[str, Any]) -> Dict[str, Any]:
+        """Reemplazar la fila (nunca se modifica en el lugar: puede estar serializándose)"""
+        old = self.rows[key]
+        row = {**old, **changes}
+        now = now_timestamp()
+        for column in self.touch:
+            if column not in changes:
+                row[column] = now
+        self._index_remove(key, old)
+        self.rows[key] = row
+        self._index_add(key, row)
+        self.version += 1
+        return row
+
+    def delete(self, key) -> Dict[str, Any]:
+        row = self.rows.pop(key)
+        self._index_remove(key, row)
+        self.version += 1
+        return row
+
+    def storage_direction(self, order: Sequence[Tuple[str, bool, Optional[bool]]]) -> Optional[bool]:
+        """
+        Si el orden pedido coincide con el de inserción, devolver si es
+        descendente; None si hay que ordenar
+        """
+        if not order:
+            return False
+        if not self.sequential:
+            return None
+        directions = {desc for column, desc, _ in order if column in ('created_at', self.primary_key)}
+        if len(directions) != 1 or len(order) != sum(1 for column, _, _ in order
+                                                     if column in ('created_at', self.primary_key)):
+            return None
+        return directions.pop()
+
+
+class Result:
+    def __init__(self, rows: List[Dict[str, Any]], total: Optional[int] = None):
+        self.rows = rows
+        self.total = total
+
+
+# ----------------------------------------------------------------------
+# Base de datos
+# ----------------------------------------------------------------------
+
+class Database:
+    """
+    Tablas y ejecución de consultas
+
+    No es segura para hilos por sí sola: el servidor ejecuta cada petición
+    con self.lock tomado.
+    """
+
+    def __init__(self, tables: Dict[str, List[Dict[str, Any]]]):
+        self.lock = threading.RLock()
+        self.tables: Dict[str, Table] = {name: Table(name, rows) for name, rows in tables.items()}
+        self._cache: 'OrderedDict[tuple, Tuple[Any, int]]' = OrderedDict()
+        self.examined = 0
+
+    def begin(self) -> None:
+        """Reiniciar el contador de filas examinadas de la petición"""
+        self.examined = 0
+
+    def charge(self, rows: int) -> None:
+        self.examined += rows
+
+    def table(self, name: str) -> Table:
+        table = self.tables.get(name)
+        if table is None:
+            raise QueryError(404, 'PGRST205', f"Could not find the table 'public.{name}' in the schema cache")
+        return table
+
+    # -- lecturas --------------------------------------------------------
+
+    def select(self, table_name: str, nodes: Sequence[Any] = (), order: Sequence[tuple] = (),
+               offset: int = 0, limit: Optional[int] = None, count: Optional[str] = None) -> Result:
+        """
+        Filas que cumplen todos los filtros, ordenadas y paginadas
+
+        count: None, 'exact', 'planned' o 'estimated' (como Prefer: count=...)
+        """
+        table = self.table(table_name)
+        order = tuple(order)
+        cache_key = (table.name, table.version, tuple(node.key for node in nodes), order)
+        entry = self._cache_get(cache_key)
+        direction = table.storage_direction(order)
+        total = None
+
+        if (entry is None and count != 'exact' and limit is not None
+                and offset < STREAM_MAX_OFFSET and direction is not None):
+            rows = self._stream(table, nodes, direction, offset, limit)
+        else:
+            if entry is None:
+                entry = self._materialize(table, nodes, order, direction)
+                self._cache_put(cache_key, entry)
+            else:
+                # El resultado guardado no le ahorra trabajo a la base simulada
+                self.charge(entry[1])
+            keys = entry[0]
+            end = offset + limit if limit is not None else None
+            rows = [table.rows[key] for key in keys[offset:end]]
+            if count:
+                total = len(keys)
+
+        if count in ('planned', 'estimated') and entry is None:
+            total = self._estimate(table, nodes)
+            if count == 'estimated' and total <= ESTIMATE_EXACT_THRESHOLD:
+                total = len(self._materialize(table, nodes, (), False)[0])
+        return Result(rows, total)
+
+    def memo(self, table_name: str, key: Any, compute: Callable[[], Any]) -> Any:
+        """
+        Guardar un cálculo sobre una tabla hasta que la tabla cambie
+
+        compute debe cobrar con charge() las filas que examina; los
+        aciertos vuelven a cobrarlas.
+        """
+        table = self.table(table_name)
+        cache_key = (table.name, table.version, ('memo', key))
+        entry = self._cache_get(cache_key)
+        if entry is not None:
+            self.charge(entry[1])
+            return entry[0]
+
+        before = self.examined
+        value = compute()
+        self._cache_put(cache_key, (value, self.examined - before))
+        return value
+
+    def _stream(self, table: Table, nodes: Sequence[Any], descending: bool, offset: int, limit: int) -> List[Dict]:
+        """Recorrer en orden de inserción hasta completar la página"""
+        predicate = self._predicate(table, nodes)
+        candidates = self._candidates(table, nodes)
+        if candidates is not None:
+            source = sorted(candidates, reverse=descending)
+        else:
+            source = reversed(table.rows) if descending else iter(table.rows)
+
+        rows, skipped, examined = [], 0, 0
+        for key in source:
+            row = table.rows.get(key)
+            if row is None:
+                continue
+            examined += 1
+            if predicate(row):
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                rows.append(row)
+                if len(rows) >= limit:
+                    break
+        self.charge(examined)
+        return rows
+
+    def _materialize(self, table: Table, nodes: Sequence[Any], order: Sequence[tuple],
+                     direction: Optional[bool]) -> Tuple[List[Any], int]:
+        """Todas las llaves que cumplen los filtros, en el orden pedido"""
+        predicate = self._predicate(table, nodes)
+        candidates = self._candidates(table, nodes)
+        if candidates is not None:
+            source = sorted(candidates) if direction is not None else list(candidates)
+        else:
+            source = list(table.rows)
+
+        rows = [table.rows[key] for key in source if key in table.rows]
+        examined = len(rows)
+        rows = [row for row in rows if predicate(row)]
+
+        if direction is not None:
+            if direction:
+                rows.reverse()
+        else:
+            # Orden estable de la última columna a la primera; por defecto NULL
+            # va al final en asc y al principio en desc, como en PostgreSQL
+            for column, desc, nulls_first in reversed(order):
+                invert = nulls_first is (not desc)
+                rows.sort(key=lambda row, column=column, invert=invert: _sort_key(row.get(column), invert),
+                          reverse=desc)
+
+        self.charge(examined)
+        return [row[table.primary_key] for row in rows], examined
+
+    def _estimate(self, table: Table, nodes: Sequence[Any]) -> int:
+        """Estimación barata del total, como la del planificador"""
+        if not nodes:
+            return len(table.rows)
+        candidates = self._candidates(table, nodes)
+        if candidates is not None:
+            return len(candidates)
+
+        predicate = self._predicate(table, nodes)
+        sample = matched = 0
+        for row in table.rows.values():
+            sample += 1
+            matched += predicate(row)
+            if sample >= ESTIMATE_SAMPLE_ROWS:
+                break
+        return round(len(table.rows) * matched / sample) if sample else 0
+
+    @staticmethod
+    def _predicate(table: Table, nodes: Sequence[Any]) -> Callable[[Dict], bool]:
+        tests = [node.predicate(table) for node in nodes]
+        if not tests:
+            return lambda row: True
+        if len(tests) == 1:
+            return tests[0]
+        return lambda row: all(test(row) for test in tests)
+
+    @staticmethod
+    def _candidates(table: Table, nodes: Sequence[Any]) -> Optional[Iterable]:
+        return _smallest([node.candidates(table) for node in nodes])
+
+    def _cache_get(self, key: tuple):
+        entry = self._cache.get(key)
+        if entry is not None:
+            self._cache.move_to_end(key)
+        return entry
+
+    def _cache_put(self, key: tuple, entry) -> None:
+        self._cache[key] = entry
+        while len(self._cache) > RESULT_CACHE_ENTRIES:
+            self._cache.popitem(last=False)
+
+    # -- recursos embebidos ---------------------------------------------
+
+    def project(self, table_name: str, rows: List[Dict[str, Any]], items: List[SelectItem]) -> List[Dict[str, Any]]:
+        """Aplicar el select (columnas, alias y recursos embebidos) a las filas"""
+        if len(items) == 1 and items[0].kind == 'star':
+            return rows
+
+        projected = []
+        for row in rows:
+            output = {}
+            keep = True
+            for item in items:
+                if item.kind == 'star':
+                    output.update(row)
+                elif item.kind == 'column':
+                    output[item.alias or item.name] = row.get(item.name)
+                else:
+                    value = self._embed(table_name, row, item)
+                    if item.inner and not value:
+                        keep = False
+                        break
+                    output[item.alias or item.name] = value
+            if keep:
+                projected.append(output)
+        return projected
+
+    def _embed(self, table_name: str, row: Dict[str, Any], item: SelectItem):
+        relationship = RELATIONSHIPS.get((table_name, item.name))
+        if relationship is None:
+            raise QueryError(400, 'PGRST200', f"Could not find a relationship between '{table_name}' "
+                                              f"and '{item.name}' in the schema cache")
+        local, remote, cardinality = relationship
+        target = self.table(item.name)
+        value = row.get(local)
+
+        if remote == target.primary_key:
+            related = [target.rows[value]] if value in target.rows else []
+        elif remote in target.indexes:
+            related = [target.rows[key] for key in target.indexes[remote].get(value, ())]
+        else:
+            related = [candidate for candidate in target.rows.values() if candidate.get(remote) == value]
+        self.charge(len(related))
+
+        related = self.project(item.name, related, item.children)
+        if cardinality == 'one':
+            return related[0] if related else None
+        return related
+
+    # -- escrituras ------------------------------------------------------
+
+    def matching_keys(self, table_name: str, nodes: Sequence[Any]) -> List[Any]:
+        """Llaves de las filas afectadas por un UPDATE o DELETE"""
+        table = self.table(table_name)
+        return self._materialize(table, nodes, (), None)[0]
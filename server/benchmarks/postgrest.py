@@ -0,0 +1,453 @@
+"""
+PostgREST local para los benchmarks
+
+Sirve /rest/v1/<tabla> y /rest/v1/rpc/<función> con el mismo protocolo
+que usa supabase-py (filtros en la query string, Prefer, Content-Range,
+errores {code, message, details, hint}) sobre un conjunto de datos
+generado en memoria (benchmarks/dataset.py). Así la app corre sin cambios
+apuntando SUPABASE_URL a este servidor.
+
+La latencia de la base se simula: cada petición espera
+latency_ms ± jitter_ms más row_cost_us por fila examinada, fuera del
+candado, para que las peticiones concurrentes se solapen como en una
+conexión real.
+
+Rutas de control (no existen en Supabase):
+    GET  /_bench/health  → estado
+    GET  /_bench/info    → tamaños y IDs para los escenarios
+    GET  /_bench/stats   → peticiones, filas y tiempos por operación
+    POST /_bench/reset   → reiniciar contadores ({"data": true} regenera los datos)
+
+Uso:
+    python -m benchmarks.postgrest --size 100k --port 54321
+    python -m benchmarks.postgrest --size 1m --latency-ms 2 --row-cost-us 0.5
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+from . import rpc
+from .dataset import SIZES, build_dataset, parse_size, search_terms
+from .engine import Database, QueryError, parse_filter, parse_logic, parse_order, parse_select
+
+logger = logging.getLogger(__name__)
+
+REST_PREFIX = '/rest/v1/'
+
+# Parámetros de la query string que no son filtros
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+
+# db-max-rows de Supabase: ninguna lectura devuelve más filas
+DEFAULT_MAX_ROWS = 1000
+
+# Usuarios que /_bench/info entrega a los escenarios
+INFO_USER_IDS = 500
+
+SINGLE_OBJECT = 'application/vnd.pgrst.object+json'
+
+
+class LatencyModel:
+    """Espera que simula la red y el trabajo de PostgreSQL"""
+
+    def __init__(self, latency_ms: float = 1.0, jitter_ms: float = 0.5, row_cost_us: float = 0.2):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.row_cost_us = row_cost_us
+        self._random = random.Random()
+
+    def delay(self, examined: int) -> float:
+        """Segundos de espera para una petición que examinó examined filas"""
+        jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        milliseconds = max(self.latency_ms + jitter, 0.0) + examined * self.row_cost_us / 1000
+        return milliseconds / 1000
+
+    def settings(self) -> Dict[str, float]:
+        return {'latency_ms': self.latency_ms, 'jitter_ms': self.jitter_ms, 'row_cost_us': self.row_cost_us}
+
+
+class Stats:
+    """Contadores por operación ('GET products', 'POST rpc/list_products', ...)"""
+
+    FIELDS = ('requests', 'errors', 'rows', 'examined', 'engine_ms', 'delay_ms')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations: Dict[str, Dict[str, float]] = {}
+
+    def record(self, operation: str, error: bool, rows: int, examined: int,
+               engine_seconds: float, delay_seconds: float) -> None:
+        with self._lock:
+            counters = self._operations.setdefault(operation, dict.fromkeys(self.FIELDS, 0))
+            counters['requests'] += 1
+            counters['errors'] += error
+            counters['rows'] += rows
+            counters['examined'] += examined
+            counters['engine_ms'] += engine_seconds * 1000
+            counters['delay_ms'] += delay_seconds * 1000
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            operations = {name: {field: round(value, 3) if isinstance(value, float) else value
+                                 for field, value in counters.items()}
+                          for name, counters in sorted(self._operations.items())}
+        totals = dict.fromkeys(self.FIELDS, 0)
+        for counters in operations.values():
+            for field in self.FIELDS:
+                totals[field] += counters[field]
+        totals['engine_ms'] = round(totals['engine_ms'], 3)
+        totals['delay_ms'] = round(totals['delay_ms'], 3)
+        return {'totals': totals, 'operations': operations}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._operations.clear()
+
+
+class Response:
+    def __init__(self, status: int, body: Any = None, headers: Optional[Dict[str, str]] = None,
+                 rows: int = 0, empty: bool = False):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.rows = rows
+        self.empty = empty
+
+
+class FakePostgrest:
+    """Estado del servidor: datos, modelo de latencia y contadores"""
+
+    def __init__(self, size: int, seed: int = 42, latency: Optional[LatencyModel] = None,
+                 max_rows: int = DEFAULT_MAX_ROWS):
+        self.size = size
+        self.seed = seed
+        self.latency = latency or LatencyModel()
+        self.max_rows = max_rows
+        self.stats = Stats()
+        self.db = self._load()
+
+    def _load(self) -> Database:
+        started = time.perf_counter()
+        db = Database(build_dataset(self.size, self.seed))
+        # Armar los índices de búsqueda ahora y no en la primera petición
+        products = db.table('products')
+        products.text_search('search_vector', 'fts', 'a:*')
+        products.prefix_lookup('sku', 'a')
+        logger.info("Datos generados: %d productos en %.1fs", self.size, time.perf_counter() - started)
+        return db
+
+    def reset(self, reload_data: bool = False) -> None:
+        if reload_data:
+            with self.db.lock:
+                self.db = self._load()
+        self.stats.reset()
+
+    def info(self) -> Dict[str, Any]:
+        with self.db.lock:
+            users = self.db.table('users').rows.values()
+            return {
+                'size': self.size,
+                'seed': self.seed,
+                'max_rows': self.max_rows,
+                'latency': self.latency.settings(),
+                'tables': {name: len(table.rows) for name, table in self.db.tables.items()},
+                'max_product_id': max(self.db.table('products').rows, default=0),
+                'categories': [row['name'] for row in self.db.table('categories').rows.values()],
+                'admin_ids': [user['id'] for user in users if user.get('role') == 'admin'],
+                'user_ids': [user['id'] for user in users if user.get('role') != 'admin'][:INFO_USER_IDS],
+                'search_terms': search_terms()
+            }
+
+    # -- peticiones ------------------------------------------------------
+
+    def handle(self, method: str, path: str, query: List[Tuple[str, str]],
+               headers: Dict[str, str], body: Any) -> Tuple[str, Response]:
+        """Ejecutar una petición de /rest/v1; devuelve (operación, respuesta)"""
+        target = unquote(path[len(REST_PREFIX):]).strip('/')
+        operation = f'{method} {target}'
+        prefer = _parse_prefer(headers.get('prefer', ''))
+
+        with self.db.lock:
+            self.db.begin()
+            started = time.perf_counter()
+            try:
+                if target.startswith('rpc/'):
+                    response = self._rpc(method, target[4:], query, body)
+                elif method in ('GET', 'HEAD'):
+                    response = self._read(target, query, headers, prefer)
+                elif method == 'POST':
+                    response = self._insert(target, query, body, prefer)
+                elif method == 'PATCH':
+                    response = self._update(target, query, body, prefer)
+                elif method == 'DELETE':
+                    response = self._delete(target, query, prefer)
+                else:
+                    raise QueryError(405, 'PGRST117', f'Unsupported HTTP method: {method}')
+            except QueryError as error:
+                response = Response(error.status, error.body())
+            engine_seconds = time.perf_counter() - started
+            examined = self.db.examined
+
+        delay = self.latency.delay(examined)
+        if delay > 0:
+            time.sleep(delay)
+        self.stats.record(operation, response.status >= 400, response.rows, examined, engine_seconds, delay)
+        if method == 'HEAD':
+            response.empty = True
+        return operation, response
+
+    def _filters(self, query: List[Tuple[str, str]]) -> List[Any]:
+        nodes = []
+        for name, value in query:
+            if name in RESERVED_PARAMS:
+                continue
+            if name in ('or', 'and', 'not.or', 'not.and'):
+                negate = name.startswith('not.')
+                nodes.append(parse_logic(name.rpartition('.')[2], value, negate))
+            elif '.' in name:
+                raise QueryError(400, 'PGRST100', f'Filtros sobre recursos embebidos no soportados: {name}')
+            else:
+                nodes.append(parse_filter(name, value))
+        return nodes
+
+    def _read(self, table_name: str, query: List[Tuple[str, str]], headers: Dict[str, str],
+              prefer: Dict[str, str]) -> Response:
+        params = dict(query)
+        items = parse_select(params.get('select'))
+        order = parse_order([value for name, value in query if name == 'order'])
+        offset, limit = _page(params, headers.get('range'))
+        limit = self.max_rows if limit is None else min(limit, self.max_rows)
+        count = prefer.get('count')
+
+        result = self.db.select(table_name, self._filters(query), order, offset, limit, count)
+        rows = self.db.project(table_name, result.rows, items)
+
+        if SINGLE_OBJECT in headers.get('accept', ''):
+            if len(rows) != 1:
+                raise QueryError(406, 'PGRST116', 'JSON object requested, multiple (or no) rows returned',
+                                 f'The result contains {len(rows)} rows')
+            return Response(200, rows[0], rows=1)
+
+        total = '*' if result.total is None else str(result.total)
+        content_range = f'{offset}-{offset + len(rows) - 1}/{total}' if rows else f'*/{total}'
+        status = 206 if result.total is not None and len(rows) < result.total - offset and rows else 200
+        return Response(status, rows, {'Content-Range': content_range}, rows=len(rows))
+
+    def _insert(self, table_name: str, query: List[Tuple[str, str]], body: Any,
+                prefer: Dict[str, str]) -> Response:
+        table = self.db.table(table_name)
+        if not isinstance(body, (dict, list)):
+            raise QueryError(400, 'PGRST102', 'Empty or invalid json')
+        payload = body if isinstance(body, list) else [body]
+        upsert = prefer.get('resolution') == 'merge-duplicates'
+
+        inserted = []
+        try:
+            for data in payload:
+                inserted.append(table.insert(data, upsert=upsert))
+        except QueryError:
+            # Una inserción en lote es una sola sentencia: todo o nada
+            for row in inserted:
+                if row[table.primary_key] in table.rows:
+                    table.delete(row[table.primary_key])
+            raise
+        self.db.charge(len(inserted))
+        return self._written(201, table_name, inserted, query, prefer)
+
+    def _update(self, table_name: str, query: List[Tuple[str, str]], body: Any,
+                prefer: Dict[str, str]) -> Response:
+        table = self.db.table(table_name)
+        if not isinstance(body, dict):
+            raise QueryError(400, 'PGRST102', 'Empty or invalid json')
+        keys = self._matching(table_name, query, 'UPDATE')
+        rows = [table.update(key, body) for key in keys]
+        return self._written(200, table_name, rows, query, prefer)
+
+    def _delete(self, table_name: str, query: List[Tuple[str, str]], prefer: Dict[str, str]) -> Response:
+        table = self.db.table(table_name)
+        keys = self._matching(table_name, query, 'DELETE')
+        rows = [table.delete(key) for key in keys]
+        return self._written(200, table_name, rows, query, prefer)
+
+    def _matching(self, table_name: str, query: List[Tuple[str, str]], statement: str) -> List[Any]:
+        nodes = self._filters(query)
+        if not nodes:
+            # pg-safeupdate, activo en Supabase
+            raise QueryError(400, '21000', f'{statement} requires a WHERE clause')
+        return self.db.matching_keys(table_name, nodes)
+
+    def _written(self, status: int, table_name: str, rows: List[Dict[str, Any]],
+                 query: List[Tuple[str, str]], prefer: Dict[str, str]) -> Response:
+        if prefer.get('return') != 'representation':
+            return Response(204 if status == 200 else status, empty=True, rows=len(rows))
+        items = parse_select(dict(query).get('select'))
+        return Response(status, self.db.project(table_name, rows, items), rows=len(rows))
+
+    def _rpc(self, method: str, name: str, query: List[Tuple[str, str]], body: Any) -> Response:
+        if method == 'POST':
+            params = body if isinstance(body, dict) else {}
+        elif method in ('GET', 'HEAD'):
+            params = {key: value for key, value in query if key not in RESERVED_PARAMS}
+        else:
+            raise QueryError(405, 'PGRST101', 'Only GET and POST verbs are allowed for functions')
+
+        result = rpc.call(self.db, name, params)
+        if result is None:
+            # Las funciones VOID responden 204 sin cuerpo
+            return Response(204, empty=True)
+        rows = len(result) if isinstance(result, list) else 1
+        return Response(200, result, rows=rows)
+
+
+def _parse_prefer(header: str) -> Dict[str, str]:
+    """'return=representation,count=exact' → {'return': ..., 'count': ...}"""
+    preferences = {}
+    for part in header.split(','):
+        name, _, value = part.strip().partition('=')
+        if name:
+            preferences[name] = value
+    return preferences
+
+
+def _page(params: Dict[str, str], range_header: Optional[str]) -> Tuple[int, Optional[int]]:
+    """offset y limit desde la query string o la cabecera Range ('0-9')"""
+    try:
+        offset = int(params.get('offset', 0))
+        limit = int(params['limit']) if 'limit' in params else None
+        if range_header and 'offset' not in params:
+            start, _, end = range_header.partition('-')
+            offset = int(start)
+            if end:
+                range_limit = int(end) - offset + 1
+                limit = range_limit if limit is None else min(limit, range_limit)
+    except ValueError:
+        raise QueryError(416, 'PGRST103', 'Requested range not satisfiable')
+    if offset < 0 or (limit is not None and limit < 0):
+        raise QueryError(416, 'PGRST103', 'Requested range not satisfiable')
+    return offset, limit
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'postgrest-local'
+    # Cabeceras y cuerpo van en escrituras separadas: sin esto Nagle + ACK
+    # retardado suman ~40 ms a cada respuesta en conexiones keep-alive
+    disable_nagle_algorithm = True
+    fake: FakePostgrest = None
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_HEAD(self):
+        self._dispatch('HEAD')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _dispatch(self, method: str) -> None:
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+
+        try:
+            body = json.loads(raw) if raw else None
+        except ValueError:
+            self._send(Response(400, {'code': 'PGRST102', 'message': 'Empty or invalid json',
+                                      'details': None, 'hint': None}))
+            return
+
+        if url.path.startswith('/_bench/'):
+            self._send(self._control(method, url.path, body))
+        elif url.path.startswith(REST_PREFIX):
+            headers = {name.lower(): value for name, value in self.headers.items()}
+            query = parse_qsl(url.query, keep_blank_values=True)
+            _, response = self.fake.handle(method, url.path, query, headers, body)
+            self._send(response)
+        else:
+            self._send(Response(404, {'code': 'PGRST000', 'message': f'Ruta no soportada: {url.path}',
+                                      'details': None, 'hint': None}))
+
+    def _control(self, method: str, path: str, body: Any) -> Response:
+        if path == '/_bench/health':
+            return Response(200, {'status': 'ok'})
+        if path == '/_bench/info':
+            return Response(200, self.fake.info())
+        if path == '/_bench/stats':
+            return Response(200, self.fake.stats.snapshot())
+        if path == '/_bench/reset' and method == 'POST':
+            self.fake.reset(reload_data=bool((body or {}).get('data')))
+            return Response(200, {'status': 'ok'})
+        return Response(404, {'message': f'Ruta no soportada: {path}'})
+
+    def _send(self, response: Response) -> None:
+        payload = b'' if response.empty else json.dumps(response.body, default=str).encode('utf-8')
+        self.send_response(response.status)
+        for name, value in response.headers.items():
+            self.send_header(name, value)
+        if payload:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if payload and self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def create_server(fake: FakePostgrest, host: str = '127.0.0.1', port: int = 54321) -> ThreadingHTTPServer:
+    handler = type('BoundHandler', (Handler,), {'fake': fake})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PostgREST local con datos generados para los benchmarks')
+    parser.add_argument('--size', default='10k', help=f"Filas de productos/órdenes/calificaciones ({', '.join(SIZES)} o un número)")
+    parser.add_argument('--seed', type=int, default=42, help='Semilla de los datos')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--latency-ms', type=float, default=1.0, help='Latencia base por petición')
+    parser.add_argument('--jitter-ms', type=float, default=0.5, help='Variación aleatoria de la latencia (±)')
+    parser.add_argument('--row-cost-us', type=float, default=0.2, help='Costo simulado por fila examinada')
+    parser.add_argument('--max-rows', type=int, default=DEFAULT_MAX_ROWS, help='Máximo de filas por lectura (db-max-rows)')
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s %(levelname)s %(message)s')
+
+    try:
+        size = parse_size(args.size)
+    except ValueError as e:
+        parser.error(str(e))
+
+    fake = FakePostgrest(
+        size, args.seed,
+        LatencyModel(args.latency_ms, args.jitter_ms, args.row_cost_us),
+        max_rows=args.max_rows
+    )
+    server = create_server(fake, args.host, args.port)
+    logger.info("PostgREST local escuchando en http://%s:%d", args.host, server.server_address[1])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,411 @@
+"""
+Funciones RPC del PostgREST local
+
+Réplicas en Python de las funciones de database/api_functions.sql que usan
+los servicios, con el mismo JSON de respuesta. Una función que no está aquí
+responde 404 (PGRST202), como una base donde no se corrió el script, y los
+servicios usan su camino alternativo.
+"""
+
+import json
+import re
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional
+
+from .dataset import normalize_words, now_timestamp
+from .engine import Condition, Database, Logic, QueryError
+
+FUNCTIONS: Dict[str, Callable[[Database, Dict[str, Any]], Any]] = {}
+
+
+def rpc(name: str):
+    """Registrar una función RPC"""
+    def register(function):
+        FUNCTIONS[name] = function
+        return function
+    return register
+
+
+def call(db: Database, name: str, params: Dict[str, Any]) -> Any:
+    function = FUNCTIONS.get(name)
+    if function is None:
+        raise QueryError(404, 'PGRST202', f"Could not find the function public.{name} in the schema cache")
+    return function(db, params or {})
+
+
+def _search_condition(search: str) -> Any:
+    """Filtro de búsqueda de products_filtered: search_vector @@ prefijos OR sku ILIKE 'término%'"""
+    words = re.findall(r'\w+', search.lower())
+    sku_prefix = Condition('sku', 'ilike', f'{search}*')
+    if not words:
+        return sku_prefix
+    tsquery = ' & '.join(f'{word}:*' for word in words)
+    return Logic('or', [Condition('search_vector', 'fts', tsquery), sku_prefix])
+
+
+def _product_filters(params: Dict[str, Any]) -> List[Any]:
+    """Filtros de products_filtered (§2): NULL = filtro no aplicado"""
+    nodes = [Condition('is_active', 'eq', 'true')]
+    if params.get('p_category') is not None:
+        nodes.append(Condition('category', 'eq', str(params['p_category'])))
+    if params.get('p_status') is not None:
+        nodes.append(Condition('status', 'eq', str(params['p_status'])))
+    if params.get('p_search'):
+        nodes.append(_search_condition(params['p_search']))
+    if params.get('p_min_price') is not None:
+        nodes.append(Condition('price', 'gte', str(params['p_min_price'])))
+    if params.get('p_max_price') is not None:
+        nodes.append(Condition('price', 'lte', str(params['p_max_price'])))
+    if params.get('p_featured') is not None:
+        nodes.append(Condition('is_featured', 'eq', 'true' if params['p_featured'] else 'false'))
+    if params.get('p_in_stock') is True:
+        nodes.append(Condition('stock', 'gt', '0'))
+    return nodes
+
+
+def _with_rating(db: Database, product: Dict[str, Any]) -> Dict[str, Any]:
+    stats = db.table('product_rating_stats').rows.get(product['id'])
+    count = int(stats['ratings_count'] or 0) if stats else 0
+    return {
+        **product,
+        'rating': round(stats['ratings_sum'] / count, 1) if count else 0,
+        'reviews': count
+    }
+
+
+@rpc('list_products')
+def list_products(db: Database, params: Dict[str, Any]) -> Dict[str, Any]:
+    nodes = _product_filters(params)
+    limit = int(params.get('p_limit') or 10)
+    offset = int(params.get('p_offset') or 0)
+    count_mode = params.get('p_count_mode') or 'exact'
+    order = (('created_at', True, None), ('id', True, None))
+
+    if count_mode in ('planned', 'estimated'):
+        result = db.select('products', nodes, order, offset, limit, count='planned')
+        total, estimated = result.total, True
+        if count_mode == 'estimated' and total <= int(params.get('p_estimate_threshold') or 1000):
+            result = db.select('products', nodes, order, offset, limit, count='exact')
+            total, estimated = result.total, False
+    else:
+        result = db.select('products', nodes, order, offset, limit, count='exact')
+        total, estimated = result.total, False
+
+    db.charge(len(result.rows))
+    return {
+        'data': [_with_rating(db, product) for product in result.rows],
+        'total': total,
+        'total_is_estimate': estimated
+    }
+
+
+@rpc('search_products')
+def search_products(db: Database, params: Dict[str, Any]) -> Dict[str, Any]:
+    search = str(params.get('p_search') or '')
+    limit = int(params.get('p_limit') or 10)
+    offset = int(params.get('p_offset') or 0)
+    words = normalize_words(search)
+
+    def ranked():
+        # Aproximación de ts_rank_cd: nombre y SKU pesan más que categoría y descripción
+        rows = db.select('products', [Condition('is_active', 'eq', 'true'), _search_condition(search)]).rows
+        scored = []
+        for row in rows:
+            rank = 1.0 if str(row.get('sku') or '').lower() == search.lower() else 0.0
+            name_words = normalize_words(f"{row.get('name') or ''} {row.get('sku') or ''}")
+            category_words = normalize_words(row.get('category') or '')
+            for word in words:
+                if any(candidate.startswith(word) for candidate in name_words):
+                    rank += 0.1
+                elif any(candidate.startswith(word) for candidate in category_words):
+                    rank += 0.04
+                else:
+                    rank += 0.02
+            scored.append((rank, row))
+        scored.sort(key=lambda item: (item[0], item[1]['created_at'], item[1]['id']), reverse=True)
+        return scored
+
+    scored = db.memo('products', ('search_products', search.lower()), ranked)
+    page = scored[offset:offset + limit]
+    return {
+        'data': [{**row, 'search_rank': round(rank, 4)} for rank, row in page],
+        'total': len(scored)
+    }
+
+
+@rpc('get_products_rating_stats')
+def get_products_rating_stats(db: Database, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    stats = db.table('product_rating_stats').rows
+    rows = []
+    for product_id in params.get('product_ids') or []:
+        row = stats.get(product_id)
+        if row and row['ratings_count']:
+            rows.append({
+                'product_id': product_id,
+                'average_rating': round(row['ratings_sum'] / row['ratings_count'], 2),
+                'total_ratings': row['ratings_count']
+            })
+    db.charge(len(rows))
+    return rows
+
+
+@rpc('get_product_rating_stats')
+def get_product_rating_stats(db: Database, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    product_id = params.get('product_id_param')
+    ratings = db.select(
+        'product_ratings',
+        [Condition('product_id', 'eq', str(product_id)), Condition('is_approved', 'eq', 'true')],
+        order=(('created_at', True, None),)
+    ).rows
+    if not ratings:
+        return []
+
+    distribution = {str(star): 0 for star in range(1, 6)}
+    for rating in ratings:
+        distribution[str(rating['rating'])] += 1
+    return [{
+        'average_rating': round(sum(rating['rating'] for rating in ratings) / len(ratings), 2),
+        'total_ratings': len(ratings),
+        'rating_distribution': distribution,
+        'recent_ratings': [
+            {key: rating.get(key) for key in ('id', 'rating', 'comment', 'created_at')}
+            for rating in ratings[:5]
+        ]
+    }]
+
+
+@rpc('apply_product_rating_delta')
+def apply_product_rating_delta(db: Database, params: Dict[str, Any]) -> None:
+    table = db.table('product_rating_stats')
+    product_id = params.get('p_product_id')
+    removed, added = params.get('p_removed'), params.get('p_added')
+
+    current = table.rows.get(product_id) or {
+        'product_id': product_id, 'ratings_count': 0, 'ratings_sum': 0,
+        'count_1': 0, 'count_2': 0, 'count_3': 0, 'count_4': 0, 'count_5': 0
+    }
+    changes = {
+        'ratings_count': current['ratings_count'] + (added is not None) - (removed is not None),
+        'ratings_sum': current['ratings_sum'] + (added or 0) - (removed or 0)
+    }
+    for star in range(1, 6):
+        changes[f'count_{star}'] = current[f'count_{star}'] + (added == star) - (removed == star)
+    changes = {key: max(value, 0) for key, value in changes.items()}
+
+    table.insert({'product_id': product_id, **changes}, upsert=True)
+    db.charge(1)
+    return None
+
+
+@rpc('rebuild_product_rating_stats')
+def rebuild_product_rating_stats(db: Database, params: Dict[str, Any]) -> int:
+    product_id: Optional[int] = params.get('p_product_id')
+    ratings = db.table('product_ratings').rows.values()
+    db.charge(len(ratings))
+
+    aggregates: Dict[int, Dict[str, int]] = {}
+    for rating in ratings:
+        if not rating.get('is_approved') or (product_id is not None and rating['product_id'] != product_id):
+            continue
+        row = aggregates.setdefault(rating['product_id'], {
+            'ratings_count': 0, 'ratings_sum': 0, 'count_1': 0, 'count_2': 0,
+            'count_3': 0, 'count_4': 0, 'count_5': 0
+        })
+        row['ratings_count'] += 1
+        row['ratings_sum'] += rating['rating']
+        row[f"count_{rating['rating']}"] += 1
+
+    table = db.table('product_rating_stats')
+    for key in [key for key in table.rows if product_id is None or key == product_id]:
+        table.delete(key)
+    for key, row in aggregates.items():
+        table.insert({'product_id': key, **row})
+    return len(aggregates)
+
+
+def _scan(db: Database, table_name: str) -> List[Dict[str, Any]]:
+    rows = list(db.table(table_name).rows.values())
+    db.charge(len(rows))
+    return rows
+
+
+@rpc('get_order_stats')
+def get_order_stats(db: Database, params: Dict[str, Any]) -> Dict[str, Any]:
+    def compute():
+        status_counts: Dict[str, int] = {}
+        sales = 0
+        for order in _scan(db, 'orders'):
+            status = order.get('status')
+            status_counts[status] = status_counts.get(status, 0) + 1
+            if status == 'delivered':
+                sales += order.get('total_amount') or 0
+        return {
+            'total_orders': sum(status_counts.values()),
+            'status_counts': {status: count for status, count in status_counts.items() if status is not None},
+            'total_sales': sales
+        }
+    return db.memo('orders', 'get_order_stats', compute)
+
+
+@rpc('get_user_stats')
+def get_user_stats(db: Database, params: Dict[str, Any]) -> Dict[str, Any]:
+    def compute():
+        role_counts: Dict[str, int] = {}
+        active = 0
+        users = _scan(db, 'users')
+        for user in users:
+            role = user.get('role') or 'user'
+            role_counts[role] = role_counts.get(role, 0) + 1
+            active += bool(user.get('is_active'))
+        return {
+            'total_users': len(users),
+            'active_users': active,
+            'inactive_users': len(users) - active,
+            'role_counts': role_counts
+        }
+    return db.memo('users', 'get_user_stats', compute)
+
+
+@rpc('get_product_stats')
+def get_product_stats(db: Database, params: Dict[str, Any]) -> Dict[str, Any]:
+    def compute():
+        products = [product for product in _scan(db, 'products') if product.get('is_active')]
+        total = len(products)
+        return {
+            'total_products': total,
+            'active_products': sum(1 for product in products if product.get('status') == 'Activo'),
+            'out_of_stock': sum(1 for product in products if product.get('status') == 'Sin Stock'),
+            'featured_products': sum(1 for product in products if product.get('is_featured')),
+            'average_price': round(sum(product.get('price') or 0 for product in products) / total, 2) if total else 0,
+            'total_stock': sum(product.get('stock') or 0 for product in products),
+            'low_stock_products': sum(1 for product in products if 0 < (product.get('stock') or 0) <= 5)
+        }
+    return db.memo('products', 'get_product_stats', compute)
+
+
+@rpc('get_category_product_counts')
+def get_category_product_counts(db: Database, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def compute():
+        counts: Dict[str, int] = {}
+        for product in _scan(db, 'products'):
+            if product.get('is_active'):
+                counts[product.get('category')] = counts.get(product.get('category'), 0) + 1
+        return [{'category': category, 'products': count} for category, count in counts.items()]
+    return db.memo('products', 'get_category_product_counts', compute)
+
+
+@rpc('can_user_rate_product')
+def can_user_rate_product(db: Database, params: Dict[str, Any]) -> bool:
+    """Orden entregada del usuario que incluye el producto y que aún no calificó"""
+    orders = db.table('orders').rows
+    order_id = params.get('order_id_param')
+    try:
+        order = orders.get(int(order_id))
+    except (TypeError, ValueError):
+        order = None
+    product_id = params.get('product_id_param')
+    db.charge(1)
+    if not order or order.get('user_id') != params.get('user_id_param') or order.get('status') != 'delivered':
+        return False
+
+    items = db.select('order_items', [Condition('order_id', 'eq', str(order['id']))]).rows
+    if not any(item.get('product_id') == product_id for item in items):
+        return False
+    existing = db.select('product_ratings', [
+        Condition('order_id', 'eq', str(order['id'])),
+        Condition('product_id', 'eq', str(product_id)),
+        Condition('user_id', 'eq', str(order['user_id']))
+    ], limit=1).rows
+    return not existing
+
+
+@rpc('update_product_descriptions')
+def update_product_descriptions(db: Database, params: Dict[str, Any]) -> List[int]:
+    table = db.table('products')
+    updated = []
+    for item in params.get('p_items') or []:
+        product_id = item.get('id')
+        if product_id in table.rows:
+            table.update(product_id, {'description': item.get('description')})
+            updated.append(product_id)
+    db.charge(len(updated))
+    return updated
+
+
+@rpc('calculate_daily_dashboard_metrics')
+def calculate_daily_dashboard_metrics(db: Database, params: Dict[str, Any]) -> None:
+    """Fila de dashboard_metrics del día con los totales actuales"""
+    day = params.get('p_date') or date.today().isoformat()
+    table = db.table('dashboard_metrics')
+    orders = get_order_stats(db, {})
+    products = get_product_stats(db, {})
+    users = get_user_stats(db, {})
+    row = {
+        'date': day,
+        'total_orders': orders['total_orders'],
+        'total_products': products['total_products'],
+        'total_users': users['total_users'],
+        'monthly_revenue': orders['total_sales'],
+        'low_stock_products': products['low_stock_products'],
+        'pending_orders': orders['status_counts'].get('pending', 0)
+    }
+    existing = [key for key, metrics in table.rows.items() if metrics.get('date') == day]
+    if existing:
+        table.update(existing[0], row)
+    else:
+        table.insert(row)
+    return None
+
+
+def _metadata(raw: Any) -> Dict[str, Any]:
+    """p_metadata llega como texto JSON (json.dumps en AnalyticsService)"""
+    if isinstance(raw, str):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return {}
+    return raw or {}
+
+
+@rpc('log_system_activity')
+def log_system_activity(db: Database, params: Dict[str, Any]) -> int:
+    row = db.table('system_activity').insert({
+        'activity_type': params.get('p_activity_type'),
+        'description': params.get('p_entity_name'),
+        'user_id': params.get('p_user_id'),
+        'metadata': {
+            **_metadata(params.get('p_metadata')),
+            'entity_id': params.get('p_entity_id'),
+            'user_name': params.get('p_user_name')
+        }
+    })
+    db.charge(1)
+    return row['id']
+
+
+@rpc('create_system_alert')
+def create_system_alert(db: Database, params: Dict[str, Any]) -> int:
+    row = db.table('system_alerts').insert({
+        'alert_type': params.get('p_alert_type'),
+        'severity': params.get('p_severity') or 'info',
+        'title': params.get('p_alert_type'),
+        'message': params.get('p_message'),
+        'metadata': _metadata(params.get('p_metadata'))
+    })
+    db.charge(1)
+    return row['id']
+
+
+@rpc('resolve_system_alert')
+def resolve_system_alert(db: Database, params: Dict[str, Any]) -> bool:
+    table = db.table('system_alerts')
+    alert_id = params.get('p_alert_id')
+    db.charge(1)
+    if alert_id not in table.rows:
+        return False
+    table.update(alert_id, {
+        'is_resolved': True,
+        'resolved_by': params.get('p_resolved_by'),
+        'resolved_at': now_timestamp()
+    })
+    return True
@@ -0,0 +1,579 @@
+"""
+Benchmark de carga de la API contra el PostgREST local
+
+Levanta benchmarks/postgrest.py con datos generados, arranca la app
+(gunicorn, uvicorn o el servidor de Flask) apuntando SUPABASE_URL a él y
+ejecuta los escenarios de benchmarks/scenarios.py con usuarios
+concurrentes en lazo cerrado. Por escenario y por endpoint reporta
+p50/p95/p99, throughput, errores y las llamadas a Supabase por petición
+(para detectar N+1), en un JSON que se compara con benchmarks/compare.py.
+
+Uso:
+    python -m benchmarks.run                                  # 10k filas, todos los escenarios
+    python -m benchmarks.run --size 1m --concurrency 32 --duration 60
+    python -m benchmarks.run --scenarios search,checkout --server uvicorn --workers 2
+    python -m benchmarks.run --env CATALOG_SNAPSHOT_ENABLED=True --label catalogo
+    python -m benchmarks.run --app-url http://127.0.0.1:5000 --postgrest-url http://127.0.0.1:54321
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import http.client
+import json
+import logging
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .dataset import SIZES, parse_size
+from .postgrest import DEFAULT_MAX_ROWS
+from .scenarios import SCENARIOS, Context, Reply, Request
+
+logger = logging.getLogger(__name__)
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+REPORTS_DIR = Path(__file__).resolve().parent / 'reports'
+
+DEFAULT_SCENARIOS = ('catalog_browse', 'search', 'checkout', 'admin_dashboard')
+DEFAULT_JWT_SECRET = 'bench-jwt-secret-no-usar-en-produccion'
+
+# Entorno de la app: sin modelos de rembg ni llamadas reales a DeepSeek
+APP_ENV = {
+    'DEEPSEEK_API_KEY': 'bench',
+    'REMBG_POOL_WORKERS': '0',
+    'REMBG_PRELOAD': 'False',
+    'REMBG_WARMUP': 'False',
+    'QR_POOL_WORKERS': '0',
+    'LOG_LEVEL': 'WARNING',
+    'FLASK_DEBUG': 'False'
+}
+
+POSTGREST_START_TIMEOUT = 900  # generar 1M de filas tarda varios minutos
+APP_START_TIMEOUT = 120
+REQUEST_TIMEOUT = 60
+
+
+# ----------------------------------------------------------------------
+# Procesos
+# ----------------------------------------------------------------------
+
+def mint_jwt(claims: Dict[str, Any], secret: str) -> str:
+    """JWT HS256 como los de Supabase Auth (sin depender de PyJWT)"""
+    def encode(data: bytes) -> str:
+        return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+    header = encode(json.dumps({'alg': 'HS256', 'typ': 'JWT'}, separators=(',', ':')).encode())
+    payload = encode(json.dumps(claims, separators=(',', ':')).encode())
+    signature = hmac.new(secret.encode(), f'{header}.{payload}'.encode(), hashlib.sha256).digest()
+    return f'{header}.{payload}.{encode(signature)}'
+
+
+def user_claims(user_id: str, lifetime: int = 86400) -> Dict[str, Any]:
+    now = int(time.time())
+    return {'sub': user_id, 'aud': 'authenticated', 'role': 'authenticated',
+            'email': f'{user_id}@bench.local', 'iat': now, 'exp': now + lifetime}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(url: str, process: Optional[subprocess.Popen], timeout: float) -> None:
+    """Esperar a que url responda 200 (o fallar si el proceso terminó)"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"El proceso terminó con código {process.returncode} antes de estar listo ({url})")
+        try:
+            status, _ = http_get_json(url, timeout=2)
+            if status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} no respondió en {timeout:.0f}s")
+
+
+def http_get_json(url: str, method: str = 'GET', body: Any = None, timeout: float = 10) -> Tuple[int, Any]:
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=timeout)
+    try:
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {'Content-Type': 'application/json'} if payload else {}
+        connection.request(method, parts.path + (f'?{parts.query}' if parts.query else ''), payload, headers)
+        response = connection.getresponse()
+        raw = response.read()
+        return response.status, json.loads(raw) if raw else None
+    finally:
+        connection.close()
+
+
+class Processes:
+    """PostgREST local y app en subprocesos, con su salida en archivos de log"""
+
+    def __init__(self, log_dir: Path):
+        self.log_dir = log_dir
+        self.children: List[Tuple[str, subprocess.Popen, Path]] = []
+
+    def start(self, name: str, command: List[str], env: Dict[str, str]) -> subprocess.Popen:
+        log_path = self.log_dir / f'{name}.log'
+        log_file = open(log_path, 'wb')
+        process = subprocess.Popen(command, cwd=SERVER_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+        log_file.close()
+        self.children.append((name, process, log_path))
+        logger.info("%s: %s (log en %s)", name, ' '.join(command), log_path)
+        return process
+
+    def tail(self, name: str, lines: int = 30) -> str:
+        for child_name, _, log_path in self.children:
+            if child_name == name and log_path.exists():
+                return '\n'.join(log_path.read_text(errors='replace').splitlines()[-lines:])
+        return ''
+
+    def stop(self) -> None:
+        for _, process, _ in reversed(self.children):
+            if process.poll() is None:
+                process.terminate()
+        for _, process, _ in reversed(self.children):
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def app_command(server: str, port: int, workers: int, threads: int) -> List[str]:
+    if server == 'gunicorn':
+        # gunicorn.conf.py se carga desde SERVER_DIR (métricas multiproceso)
+        return [sys.executable, '-m', 'gunicorn', f'--workers={workers}', f'--threads={threads}',
+                f'--bind=127.0.0.1:{port}', '--timeout=120', 'run:app']
+    if server == 'uvicorn':
+        return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--workers', str(workers),
+                '--host', '127.0.0.1', '--port', str(port), '--no-access-log']
+    return [sys.executable, 'run.py']
+
+
+def app_environment(args, postgrest_url: str) -> Dict[str, str]:
+    service_key = mint_jwt({'role': 'service_role', 'iss': 'supabase', 'iat': int(time.time()),
+                            'exp': int(time.time()) + 10 * 365 * 86400}, args.jwt_secret)
+    env = dict(os.environ)
+    env.update(APP_ENV)
+    env.update({
+        'SUPABASE_URL': postgrest_url,
+        'SUPABASE_KEY': service_key,
+        'SUPABASE_SERVICE_KEY': service_key,
+        'SUPABASE_JWT_SECRET': args.jwt_secret,
+        'PYTHONUNBUFFERED': '1'
+    })
+    for item in args.env:
+        key, _, value = item.partition('=')
+        env[key] = value
+    return env
+
+
+# ----------------------------------------------------------------------
+# Medición
+# ----------------------------------------------------------------------
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Percentil por rango más cercano sobre una lista ordenada"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    values = sorted(latencies)
+    if not values:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'mean': 0.0, 'max': 0.0}
+    return {
+        'p50': round(percentile(values, 0.50), 3),
+        'p95': round(percentile(values, 0.95), 3),
+        'p99': round(percentile(values, 0.99), 3),
+        'mean': round(sum(values) / len(values), 3),
+        'max': round(values[-1], 3)
+    }
+
+
+class Recorder:
+    """Latencias y estados por endpoint, solo durante la ventana de medición"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.recording = False
+        self.endpoints: Dict[str, Dict[str, Any]] = {}
+        self.samples: Dict[str, Request] = {}
+        self.sessions = 0
+
+    def set_recording(self, recording: bool) -> None:
+        with self._lock:
+            self.recording = recording
+
+    def record(self, request: Request, status: int, milliseconds: float) -> None:
+        with self._lock:
+            self.samples.setdefault(request.endpoint, request)
+            if not self.recording:
+                return
+            entry = self.endpoints.setdefault(request.endpoint, {'latencies': [], 'statuses': {}})
+            entry['latencies'].append(milliseconds)
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+
+    def session_done(self) -> None:
+        with self._lock:
+            if self.recording:
+                self.sessions += 1
+
+
+class AppClient:
+    """Conexión keep-alive de un usuario virtual con la app"""
+
+    def __init__(self, app_url: str):
+        parts = urlsplit(app_url)
+        self.host, self.port = parts.hostname, parts.port
+        self.connection: Optional[http.client.HTTPConnection] = None
+
+    def send(self, request: Request) -> Reply:
+        headers = {'Accept': 'application/json'}
+        payload = None
+        if request.body is not None:
+            payload = json.dumps(request.body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        if request.token:
+            headers['Authorization'] = f'Bearer {request.token}'
+
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=REQUEST_TIMEOUT)
+            try:
+                self.connection.request(request.method, request.path, payload, headers)
+                response = self.connection.getresponse()
+                raw = response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.close()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # El servidor cerró una conexión inactiva: reintentar una vez con otra
+                self.close()
+                if attempt:
+                    raise
+        try:
+            data = json.loads(raw) if raw else None
+        except ValueError:
+            data = None
+        return Reply(response.status, data)
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def run_user(app_url: str, scenario, context: Context, recorder: Recorder,
+             stop: threading.Event, think_seconds: float) -> None:
+    """Usuario virtual: repite sesiones del escenario hasta stop"""
+    client = AppClient(app_url)
+    try:
+        while not stop.is_set():
+            session = scenario(context)
+            reply = None
+            try:
+                while not stop.is_set():
+                    request = session.send(reply)
+                    started = time.perf_counter()
+                    try:
+                        reply = client.send(request)
+                    except (OSError, http.client.HTTPException):
+                        client.close()
+                        reply = Reply(0)
+                    recorder.record(request, reply.status, (time.perf_counter() - started) * 1000)
+                    if think_seconds:
+                        stop.wait(think_seconds)
+            except StopIteration:
+                recorder.session_done()
+    finally:
+        client.close()
+
+
+def run_scenario(name: str, args, app_url: str, postgrest_url: str, info: Dict[str, Any],
+                 token_for) -> Dict[str, Any]:
+    scenario = SCENARIOS[name]
+    recorder = Recorder()
+    stop = threading.Event()
+    users = []
+    for index in range(args.concurrency):
+        context = Context(info, random.Random(f'{args.seed}-{name}-{index}'), token_for)
+        thread = threading.Thread(target=run_user, name=f'{name}-{index}', daemon=True,
+                                  args=(app_url, scenario, context, recorder, stop, args.think_ms / 1000))
+        users.append(thread)
+        thread.start()
+
+    time.sleep(args.warmup)
+    http_get_json(f'{postgrest_url}/_bench/reset', 'POST', {})
+    recorder.set_recording(True)
+    started = time.perf_counter()
+    time.sleep(args.duration)
+    recorder.set_recording(False)
+    elapsed = time.perf_counter() - started
+    _, database = http_get_json(f'{postgrest_url}/_bench/stats')
+    stop.set()
+    for thread in users:
+        thread.join(timeout=REQUEST_TIMEOUT)
+
+    result = _scenario_report(recorder, elapsed, database, args)
+    if args.probe:
+        result['probe'] = probe_endpoints(recorder.samples, app_url, postgrest_url)
+    return result
+
+
+def _scenario_report(recorder: Recorder, elapsed: float, database: Dict[str, Any], args) -> Dict[str, Any]:
+    all_latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    endpoints = {}
+    for endpoint, entry in sorted(recorder.endpoints.items()):
+        errors = sum(count for status, count in entry['statuses'].items() if status == 0 or status >= 500)
+        endpoints[endpoint] = {
+            'requests': len(entry['latencies']),
+            'errors': errors,
+            'throughput_rps': round(len(entry['latencies']) / elapsed, 2),
+            'latency_ms': summarize(entry['latencies']),
+            'statuses': {str(status): count for status, count in sorted(entry['statuses'].items())}
+        }
+        all_latencies += entry['latencies']
+        for status, count in entry['statuses'].items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+
+    requests = len(all_latencies)
+    errors = sum(endpoint['errors'] for endpoint in endpoints.values())
+    totals = database['totals']
+    return {
+        'duration_s': round(elapsed, 3),
+        'concurrency': args.concurrency,
+        'sessions': recorder.sessions,
+        'requests': requests,
+        'throughput_rps': round(requests / elapsed, 2) if elapsed else 0.0,
+        'errors': errors,
+        'error_rate': round(errors / requests, 4) if requests else 0.0,
+        'latency_ms': summarize(all_latencies),
+        'statuses': dict(sorted(statuses.items())),
+        'supabase': {
+            'requests': totals['requests'],
+            'per_request': round(totals['requests'] / requests, 3) if requests else 0.0,
+            'rows_examined_per_request': round(totals['examined'] / requests, 1) if requests else 0.0,
+            'errors': totals['errors'],
+            'operations': {name: counters['requests'] for name, counters in database['operations'].items()}
+        },
+        'endpoints': endpoints
+    }
+
+
+def probe_endpoints(samples: Dict[str, Request], app_url: str, postgrest_url: str) -> Dict[str, Any]:
+    """
+    Llamadas a Supabase de cada endpoint, sin concurrencia
+
+    Repite una petición de ejemplo por endpoint de a una y mide la
+    diferencia en /_bench/stats; un número que crece con el tamaño de la
+    página delata un N+1.
+    """
+    client = AppClient(app_url)
+    probes = {}
+    try:
+        for endpoint, request in sorted(samples.items()):
+            _, before = http_get_json(f'{postgrest_url}/_bench/stats')
+            reply = client.send(request)
+            _, after = http_get_json(f'{postgrest_url}/_bench/stats')
+            operations = {}
+            for name, counters in after['operations'].items():
+                delta = counters['requests'] - before['operations'].get(name, {}).get('requests', 0)
+                if delta:
+                    operations[name] = delta
+            probes[endpoint] = {
+                'status': reply.status,
+                'supabase_requests': after['totals']['requests'] - before['totals']['requests'],
+                'rows_examined': after['totals']['examined'] - before['totals']['examined'],
+                'operations': operations
+            }
+    finally:
+        client.close()
+    return probes
+
+
+# ----------------------------------------------------------------------
+# Reporte
+# ----------------------------------------------------------------------
+
+def git_state() -> Dict[str, Any]:
+    def git(*command: str) -> Optional[str]:
+        try:
+            return subprocess.run(['git', *command], cwd=SERVER_DIR, capture_output=True, text=True,
+                                  timeout=30, check=True).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    status = git('status', '--porcelain', '--untracked-files=no')
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'branch': git('rev-parse', '--abbrev-ref', 'HEAD'),
+        'dirty': bool(status) if status is not None else None
+    }
+
+
+def print_summary(report: Dict[str, Any]) -> None:
+    header = f"{'escenario / endpoint':<44} {'req':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5} {'sb/req':>7}"
+    print(header)
+    print('-' * len(header))
+    for name, scenario in report['scenarios'].items():
+        latency = scenario['latency_ms']
+        print(f"{name:<44} {scenario['requests']:>7} {scenario['throughput_rps']:>8.1f} {latency['p50']:>8.1f} "
+              f"{latency['p95']:>8.1f} {latency['p99']:>8.1f} {scenario['errors']:>5} "
+              f"{scenario['supabase']['per_request']:>7.2f}")
+        probes = scenario.get('probe', {})
+        for endpoint, stats in scenario['endpoints'].items():
+            latency = stats['latency_ms']
+            calls = probes.get(endpoint, {}).get('supabase_requests', '')
+            print(f"  {endpoint:<42} {stats['requests']:>7} {stats['throughput_rps']:>8.1f} {latency['p50']:>8.1f} "
+                  f"{latency['p95']:>8.1f} {latency['p99']:>8.1f} {stats['errors']:>5} {calls:>7}")
+    print("\nLatencias en ms; sb/req = llamadas a Supabase por petición (por endpoint: medidas sin concurrencia)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga de la API contra el PostgREST local')
+    parser.add_argument('--scenarios', default=','.join(DEFAULT_SCENARIOS),
+                        help=f"Escenarios separados por coma ({', '.join(SCENARIOS)})")
+    parser.add_argument('--size', default='10k', help=f"Tamaño de los datos ({', '.join(SIZES)} o un número)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--concurrency', type=int, default=16, help='Usuarios virtuales por escenario')
+    parser.add_argument('--duration', type=float, default=30, help='Segundos medidos por escenario')
+    parser.add_argument('--warmup', type=float, default=5, help='Segundos de calentamiento (no medidos)')
+    parser.add_argument('--think-ms', type=float, default=0, help='Pausa entre peticiones de un usuario')
+    parser.add_argument('--server', choices=('gunicorn', 'uvicorn', 'flask'), default='gunicorn')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8, help='Hilos por worker (solo gunicorn)')
+    parser.add_argument('--latency-ms', type=float, default=1.0, help='Latencia base simulada de Supabase')
+    parser.add_argument('--jitter-ms', type=float, default=0.5)
+    parser.add_argument('--row-cost-us', type=float, default=0.2, help='Costo simulado por fila examinada')
+    parser.add_argument('--max-rows', type=int, default=DEFAULT_MAX_ROWS)
+    parser.add_argument('--env', action='append', default=[], metavar='CLAVE=VALOR',
+                        help='Variable de entorno extra para la app (repetible)')
+    parser.add_argument('--jwt-secret', default=DEFAULT_JWT_SECRET, help='SUPABASE_JWT_SECRET de la app')
+    parser.add_argument('--app-url', help='Usar una app ya levantada en lugar de arrancarla')
+    parser.add_argument('--postgrest-url', help='Usar un PostgREST local ya levantado')
+    parser.add_argument('--no-probe', dest='probe', action='store_false',
+                        help='No medir las llamadas a Supabase por endpoint')
+    parser.add_argument('--label', default='', help='Etiqueta del reporte')
+    parser.add_argument('--output', help='Archivo JSON del reporte (por defecto benchmarks/reports/)')
+    parser.add_argument('--log-level', default='INFO')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format='%(asctime)s - %(levelname)s - %(message)s')
+
+    scenario_names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenario_names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Escenarios desconocidos: {', '.join(unknown)}")
+    try:
+        size = parse_size(args.size)
+    except ValueError as e:
+        parser.error(str(e))
+    if any('=' not in item for item in args.env):
+        parser.error('--env espera CLAVE=VALOR')
+    if args.app_url and not args.postgrest_url:
+        parser.error('--app-url requiere --postgrest-url (la app debe apuntar a ese PostgREST)')
+
+    processes = Processes(Path(tempfile.mkdtemp(prefix='bapesu-bench-')))
+    try:
+        postgrest_url = args.postgrest_url
+        if not postgrest_url:
+            port = free_port()
+            postgrest_url = f'http://127.0.0.1:{port}'
+            process = processes.start('postgrest', [
+                sys.executable, '-m', 'benchmarks.postgrest', '--size', str(size), '--seed', str(args.seed),
+                '--port', str(port), '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+                '--row-cost-us', str(args.row_cost_us), '--max-rows', str(args.max_rows)
+            ], dict(os.environ))
+            logger.info("Generando datos (%d filas)...", size)
+            wait_until_ready(f'{postgrest_url}/_bench/health', process, POSTGREST_START_TIMEOUT)
+        postgrest_url = postgrest_url.rstrip('/')
+
+        app_url = args.app_url
+        if not app_url:
+            port = free_port()
+            app_url = f'http://127.0.0.1:{port}'
+            env = app_environment(args, postgrest_url)
+            env['PORT'], env['FLASK_HOST'] = str(port), '127.0.0.1'
+            process = processes.start('app', app_command(args.server, port, args.workers, args.threads), env)
+            wait_until_ready(f'{app_url}/api/v1/', process, APP_START_TIMEOUT)
+        app_url = app_url.rstrip('/')
+
+        _, info = http_get_json(f'{postgrest_url}/_bench/info')
+        tokens: Dict[str, str] = {}
+
+        def token_for(user_id: str) -> str:
+            token = tokens.get(user_id)
+            if token is None:
+                token = tokens[user_id] = mint_jwt(user_claims(user_id), args.jwt_secret)
+            return token
+
+        report = {
+            'meta': {
+                'label': args.label,
+                'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'git': git_state(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'settings': {
+                    'size': info['size'], 'seed': info['seed'], 'concurrency': args.concurrency,
+                    'duration_s': args.duration, 'warmup_s': args.warmup, 'think_ms': args.think_ms,
+                    'server': None if args.app_url else args.server,
+                    'workers': args.workers, 'threads': args.threads, 'env': args.env
+                },
+                'postgrest': {key: info[key] for key in ('size', 'seed', 'max_rows', 'latency', 'tables')}
+            },
+            'scenarios': {}
+        }
+
+        for name in scenario_names:
+            logger.info("Escenario %s: %d usuarios, %.0fs (+%.0fs de calentamiento)",
+                        name, args.concurrency, args.duration, args.warmup)
+            report['scenarios'][name] = run_scenario(name, args, app_url, postgrest_url, info, token_for)
+    except RuntimeError as e:
+        logger.error("%s", e)
+        for name in ('postgrest', 'app'):
+            tail = processes.tail(name)
+            if tail:
+                logger.error("Últimas líneas del log de %s:\n%s", name, tail)
+        return False
+    finally:
+        processes.stop()
+
+    output = Path(args.output) if args.output else REPORTS_DIR / '{}-{}{}.json'.format(
+        datetime.now().strftime('%Y%m%d-%H%M%S'),
+        (report['meta']['git']['commit'] or 'sin-git')[:10],
+        f"-{args.label}" if args.label else ''
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+
+    print_summary(report)
+    print(f"\nReporte: {output}")
+    return True
+
+
+if __name__ == '__main__':
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,225 @@
+"""
+Escenarios de carga
+
+Cada escenario es un generador que representa la sesión de un usuario:
+produce Request y recibe la Reply correspondiente (para encadenar pasos,
+como abrir un producto del listado o consultar la orden recién creada).
+El runner (benchmarks/run.py) repite sesiones mientras dura la medición.
+
+Las rutas se agrupan por endpoint ('GET /products/<id>') para el reporte.
+"""
+
+import random
+from typing import Any, Callable, Dict, Generator, List, Optional
+from urllib.parse import urlencode
+
+API_PREFIX = '/api/v1'
+
+
+class Request:
+    def __init__(self, method: str, path: str, endpoint: str, body: Any = None, token: Optional[str] = None):
+        self.method = method
+        self.path = API_PREFIX + path
+        self.endpoint = endpoint
+        self.body = body
+        self.token = token
+
+
+class Reply:
+    def __init__(self, status: int, data: Any = None):
+        self.status = status
+        self.data = data
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def payload(self, *keys: str) -> Any:
+        """Navegar el JSON de la respuesta ({'data': {'data': [...]}}); None si falta algo"""
+        value = self.data
+        for key in keys:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+
+class Context:
+    """Datos del PostgREST local (/_bench/info) y tokens para una sesión"""
+
+    def __init__(self, info: Dict[str, Any], rng: random.Random, token_for: Callable[[str], str]):
+        self.info = info
+        self.rng = rng
+        self.token_for = token_for
+
+    def product_id(self) -> int:
+        # Sesgo hacia los productos recientes, como el tráfico real
+        maximum = self.info['max_product_id']
+        return max(1, maximum - int(self.rng.expovariate(1 / max(maximum * 0.1, 1))))
+
+    def category(self) -> str:
+        return self.rng.choice(self.info['categories'])
+
+    def search_term(self) -> str:
+        return self.rng.choice(self.info['search_terms'])
+
+    def user_token(self) -> str:
+        return self.token_for(self.rng.choice(self.info['user_ids']))
+
+    def admin_token(self) -> str:
+        return self.token_for(self.rng.choice(self.info['admin_ids']))
+
+
+Session = Generator[Request, Reply, None]
+
+
+def _query(path: str, **params: Any) -> str:
+    params = {key: value for key, value in params.items() if value is not None}
+    return f'{path}?{urlencode(params)}' if params else path
+
+
+def _ids(items: Any, limit: int) -> List[int]:
+    if not isinstance(items, list):
+        return []
+    return [item['id'] for item in items[:limit] if isinstance(item, dict) and 'id' in item]
+
+
+def catalog_browse(context: Context) -> Session:
+    """Visitante: categorías, listado (con filtro, páginas y cursor) y fichas de producto"""
+    rng = context.rng
+    yield Request('GET', '/categories', 'GET /categories')
+
+    category = context.category() if rng.random() < 0.6 else None
+    listing = yield Request('GET', _query('/products', page=1, per_page=12, category=category), 'GET /products')
+    product_ids = _ids(listing.payload('data', 'data'), 12)
+
+    if rng.random() < 0.5:
+        # Páginas siguientes por número, con alguna página profunda
+        page = rng.choice((2, 3, rng.randint(4, 50)))
+        listing = yield Request('GET', _query('/products', page=page, per_page=12, category=category),
+                                'GET /products?page=N')
+        product_ids += _ids(listing.payload('data', 'data'), 12)
+    else:
+        cursor = ''
+        for _ in range(rng.randint(1, 3)):
+            listing = yield Request('GET', _query('/products', per_page=12, category=category, cursor=cursor),
+                                    'GET /products?cursor')
+            product_ids += _ids(listing.payload('data', 'data'), 12)
+            cursor = listing.payload('data', 'next_cursor')
+            if not cursor:
+                break
+
+    for _ in range(rng.randint(1, 3)):
+        product_id = rng.choice(product_ids) if product_ids else context.product_id()
+        yield Request('GET', f'/products/{product_id}', 'GET /products/<id>')
+        yield Request('GET', f'/products/{product_id}/rating-stats', 'GET /products/<id>/rating-stats')
+        if rng.random() < 0.5:
+            yield Request('GET', _query(f'/products/{product_id}/ratings', page=1, per_page=5),
+                          'GET /products/<id>/ratings')
+
+
+def search(context: Context) -> Session:
+    """Buscador: autocompletado mientras se escribe, resultados y ficha del primero"""
+    rng = context.rng
+    term = context.search_term()
+
+    for length in sorted({min(len(term), size) for size in (2, 4, len(term))}):
+        yield Request('GET', _query('/products/suggest', q=term[:length]), 'GET /products/suggest')
+
+    results = yield Request('GET', _query('/products/search', q=term, limit=12), 'GET /products/search')
+    product_ids = _ids(results.payload('data'), 3)
+
+    if rng.random() < 0.5:
+        listing = yield Request('GET', _query('/products', search=term, page=1, per_page=12),
+                                'GET /products?search')
+        product_ids += _ids(listing.payload('data', 'data'), 3)
+
+    if product_ids:
+        yield Request('GET', f'/products/{rng.choice(product_ids)}', 'GET /products/<id>')
+
+
+def checkout(context: Context) -> Session:
+    """Comprador autenticado: fichas, creación de la orden y consulta de sus órdenes"""
+    rng = context.rng
+    token = context.user_token()
+
+    items = []
+    for _ in range(rng.randint(1, 3)):
+        product = yield Request('GET', f'/products/{context.product_id()}', 'GET /products/<id>')
+        data = product.payload('data')
+        if product.ok and isinstance(data, dict) and data.get('price'):
+            items.append({'product_id': data['id'], 'name': data['name'], 'price': data['price'],
+                          'quantity': rng.randint(1, 3)})
+    if not items:
+        return
+
+    subtotal = sum(item['price'] * item['quantity'] for item in items)
+    order = {
+        'customer_name': 'Cliente Benchmark',
+        'customer_email': 'cliente@bench.local',
+        'customer_phone': '3000000000',
+        'shipping_address': 'Calle 1 # 2-3',
+        'shipping_city': 'Bogotá',
+        'shipping_state': 'Cundinamarca',
+        'shipping_zip_code': '110111',
+        'subtotal': subtotal,
+        'shipping_cost': 12000,
+        'total_amount': subtotal + 12000,
+        'payment_method': 'transferencia',
+        'shipping_method': 'estandar',
+        'items': items
+    }
+    created = yield Request('POST', '/orders', 'POST /orders', body=order, token=token)
+
+    order_id = created.payload('data', 'id')
+    if order_id is not None:
+        yield Request('GET', f'/orders/{order_id}', 'GET /orders/<id>', token=token)
+    yield Request('GET', _query('/user/orders', limit=10), 'GET /user/orders', token=token)
+
+
+def admin_dashboard(context: Context) -> Session:
+    """Administrador: panel, órdenes, estadísticas y calificaciones pendientes"""
+    rng = context.rng
+    token = context.admin_token()
+
+    yield Request('GET', '/admin/dashboard/stats', 'GET /admin/dashboard/stats', token=token)
+    yield Request('GET', '/admin/dashboard/alerts', 'GET /admin/dashboard/alerts', token=token)
+
+    status = rng.choice((None, None, 'pending', 'shipped'))
+    yield Request('GET', _query('/admin/orders', limit=20, offset=0, status=status), 'GET /admin/orders',
+                  token=token)
+    if rng.random() < 0.3:
+        yield Request('GET', _query('/admin/orders', limit=20, offset=rng.randint(1, 20) * 20, status=status),
+                      'GET /admin/orders?offset=N', token=token)
+
+    yield Request('GET', '/admin/orders/stats', 'GET /admin/orders/stats', token=token)
+    yield Request('GET', '/users/stats', 'GET /users/stats', token=token)
+    yield Request('GET', '/products/stats', 'GET /products/stats', token=token)
+    yield Request('GET', '/categories/stats', 'GET /categories/stats', token=token)
+    yield Request('GET', _query('/admin/product-ratings/pending', page=1, per_page=10),
+                  'GET /admin/product-ratings/pending', token=token)
+
+
+SCENARIOS: Dict[str, Callable[[Context], Session]] = {
+    'catalog_browse': catalog_browse,
+    'search': search,
+    'checkout': checkout,
+    'admin_dashboard': admin_dashboard
+}
+
+# Proporción de sesiones del escenario 'mixed' (tráfico de una tienda típica)
+MIXED_WEIGHTS = {
+    'catalog_browse': 60,
+    'search': 25,
+    'checkout': 10,
+    'admin_dashboard': 5
+}
+
+
+def mixed(context: Context) -> Session:
+    """Sesiones de los demás escenarios según MIXED_WEIGHTS"""
+    name = context.rng.choices(list(MIXED_WEIGHTS), weights=list(MIXED_WEIGHTS.values()))[0]
+    return (yield from SCENARIOS[name](context))
+
+
+SCENARIOS['mixed'] = mixed
@@ -0,0 +1,20 @@
+import os
+import shutil
+
+# gunicorn carga este archivo automáticamente desde el directorio de trabajo.
+# Las métricas de Prometheus de cada worker se escriben en un directorio
+# compartido para que /metrics devuelva la suma de todos los workers.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/bapesu-prometheus')
+
+
+def on_starting(server):
+    """Vaciar las métricas de una ejecución anterior antes de arrancar los workers"""
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Descartar las métricas de tipo gauge del worker que terminó"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
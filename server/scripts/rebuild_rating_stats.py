@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Script para recalcular los agregados de calificaciones de productos
+(tabla product_rating_stats) a partir de product_ratings.
+
+Uso:
+    python rebuild_rating_stats.py                 # todos los productos
+    python rebuild_rating_stats.py --product 1234  # un solo producto
+"""
+
+import os
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+# Agregar el directorio del proyecto al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from app.services.product_rating_service import ProductRatingService
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+def main():
+    """Función principal del script"""
+    parser = argparse.ArgumentParser(description='Recalcular agregados de calificaciones de productos')
+    parser.add_argument('--product', type=int, default=None, help='ID del producto a recalcular (por defecto todos)')
+    args = parser.parse_args()
+
+    # Verificar variables de entorno
+    required_env_vars = ['SUPABASE_URL', 'SUPABASE_SERVICE_KEY']
+    missing_vars = [var for var in required_env_vars if not os.getenv(var)]
+
+    if missing_vars:
+        logger.error(f"Variables de entorno faltantes: {missing_vars}")
+        return False
+
+    target = f"producto {args.product}" if args.product is not None else "todos los productos"
+    logger.info(f"Recalculando agregados de calificaciones para {target}...")
+
+    result = ProductRatingService().rebuild_rating_stats(args.product)
+
+    if result['success']:
+        logger.info(f"Agregados recalculados: {result['data']['products_rebuilt']} productos")
+        return True
+
+    logger.error(f"Error al recalcular agregados: {result['error']}")
+    return False
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
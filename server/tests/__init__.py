@@ -0,0 +1 @@
+# Este archivo permite que Python reconozca este directorio como un paquete
@@ -0,0 +1,251 @@
+"""
+Reintentos, tiempo total y circuito de LLMClient contra un servidor local
+
+Uso (desde server/):
+    python -m unittest tests.test_llm_client
+"""
+
+import json
+import os
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Config valida estas variables al importarse
+os.environ.setdefault('DEEPSEEK_API_KEY', 'test')
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('SUPABASE_SERVICE_KEY', 'test')
+
+from app.services.llm_client import (  # noqa: E402
+    CircuitBreaker, CircuitOpenError, LLMClient, LLMError, LLMTimeoutError
+)
+
+
+class StubChatServer:
+    """
+    Servidor de chat completions con respuestas programadas
+
+    Cada petición consume la siguiente respuesta de la lista:
+    (estado, segundos de espera). Cuando se acaban responde 200. Un 307
+    redirige a la misma URL. Con stream: true responde SSE con
+    stream_chunks fragmentos separados por stream_delay segundos.
+    """
+
+    def __init__(self):
+        self.responses = []
+        self.requests = 0
+        self.stream_chunks = 5
+        self.stream_delay = 0.0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+                with stub._lock:
+                    stub.requests += 1
+                    status, delay = stub.responses.pop(0) if stub.responses else (200, 0)
+                time.sleep(delay)
+
+                if status == 307:
+                    self.send_response(307)
+                    self.send_header('Location', stub.url)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if status == 200 and payload.get('stream'):
+                    self._stream()
+                    return
+
+                body = json.dumps({
+                    'choices': [{'message': {'content': 'hola'}}],
+                    'usage': {'prompt_tokens': 3, 'completion_tokens': 1}
+                } if status == 200 else {'error': 'fallo'}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:
+                    # El cliente cerró la conexión por timeout
+                    pass
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+                def write_chunk(data: bytes):
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                    self.wfile.flush()
+
+                try:
+                    for _ in range(stub.stream_chunks):
+                        time.sleep(stub.stream_delay)
+                        chunk = {'choices': [{'delta': {'content': 'ho'}}]}
+                        write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                    write_chunk(b"data: [DONE]\n\n")
+                    write_chunk(b"")
+                except OSError:
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/chat/completions"
+        self._thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_client(url: str, **options) -> LLMClient:
+    settings = {
+        'connect_timeout': 1.0, 'read_timeout': 1.0, 'total_timeout': 5.0,
+        'max_retries': 2, 'backoff_base': 0.01, 'backoff_max': 0.05
+    }
+    settings.update(options)
+    return LLMClient(url, 'test', 'deepseek-chat', **settings)
+
+
+class LLMClientRetryTest(unittest.TestCase):
+
+    def test_retries_transient_errors(self):
+        with StubChatServer() as stub:
+            stub.responses = [(503, 0), (502, 0)]
+            result = make_client(stub.url).chat([{'role': 'user', 'content': 'hola'}])
+
+        self.assertEqual(result['content'], 'hola')
+        self.assertEqual(result['attempts'], 3)
+        self.assertEqual(stub.requests, 3)
+
+    def test_does_not_retry_client_errors(self):
+        with StubChatServer() as stub:
+            stub.responses = [(400, 0)]
+            with self.assertRaises(LLMError):
+                make_client(stub.url).chat([{'role': 'user', 'content': 'hola'}])
+
+        self.assertEqual(stub.requests, 1)
+
+    def test_gives_up_after_max_retries(self):
+        with StubChatServer() as stub:
+            stub.responses = [(500, 0)] * 5
+            with self.assertRaises(LLMError):
+                make_client(stub.url, max_retries=2).chat([{'role': 'user', 'content': 'hola'}])
+
+        self.assertEqual(stub.requests, 3)
+
+    def test_total_timeout_bounds_retries(self):
+        with StubChatServer() as stub:
+            stub.responses = [(200, 0.6)] * 5
+            client = make_client(stub.url, read_timeout=0.5, total_timeout=1.2, max_retries=5)
+            start = time.monotonic()
+            with self.assertRaises(LLMTimeoutError):
+                client.chat([{'role': 'user', 'content': 'hola'}])
+            elapsed = time.monotonic() - start
+
+        # Sin el tiempo total serían 6 intentos de 0,5 s
+        self.assertLess(elapsed, 1.6)
+        self.assertLess(stub.requests, 4)
+
+    def test_stream_is_bounded_by_total_timeout(self):
+        with StubChatServer() as stub:
+            stub.stream_chunks, stub.stream_delay = 20, 0.1
+            client = make_client(stub.url, read_timeout=1.0, total_timeout=0.5)
+            chunks = []
+            start = time.monotonic()
+            with self.assertRaises(LLMTimeoutError):
+                for chunk in client.stream_chat([{'role': 'user', 'content': 'hola'}]):
+                    chunks.append(chunk)
+            elapsed = time.monotonic() - start
+
+        # Un goteo de fragmentos no extiende la respuesta más allá del tiempo total
+        self.assertLess(elapsed, 1.0)
+        self.assertLess(len(chunks), 20)
+
+    def test_stream_completes_within_total_timeout(self):
+        with StubChatServer() as stub:
+            chunks = list(make_client(stub.url).stream_chat([{'role': 'user', 'content': 'hola'}]))
+
+        self.assertEqual(''.join(chunks), 'ho' * 5)
+
+
+class LLMClientCircuitTest(unittest.TestCase):
+
+    def test_opens_after_consecutive_failures(self):
+        with StubChatServer() as stub:
+            stub.responses = [(500, 0)] * 2
+            client = make_client(stub.url, max_retries=0, breaker=CircuitBreaker(2, 60))
+            for _ in range(2):
+                with self.assertRaises(LLMError):
+                    client.chat([{'role': 'user', 'content': 'hola'}])
+
+            with self.assertRaises(CircuitOpenError):
+                client.chat([{'role': 'user', 'content': 'hola'}])
+
+        # La llamada rechazada no llega al servidor
+        self.assertEqual(stub.requests, 2)
+        self.assertEqual(client.stats()['circuit_rejections'], 1)
+
+    def test_half_open_probe_closes_circuit(self):
+        with StubChatServer() as stub:
+            stub.responses = [(500, 0)]
+            client = make_client(stub.url, max_retries=0, breaker=CircuitBreaker(1, 0.2))
+            with self.assertRaises(LLMError):
+                client.chat([{'role': 'user', 'content': 'hola'}])
+            self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+            time.sleep(0.25)
+            self.assertEqual(client.breaker.state, CircuitBreaker.HALF_OPEN)
+            client.chat([{'role': 'user', 'content': 'hola'}])
+
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens_circuit(self):
+        with StubChatServer() as stub:
+            stub.responses = [(500, 0), (503, 0)]
+            client = make_client(stub.url, max_retries=0, breaker=CircuitBreaker(1, 0.2))
+            with self.assertRaises(LLMError):
+                client.chat([{'role': 'user', 'content': 'hola'}])
+
+            time.sleep(0.25)
+            with self.assertRaises(LLMError):
+                client.chat([{'role': 'user', 'content': 'hola'}])
+            self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+        self.assertEqual(stub.requests, 2)
+
+    def test_unexpected_request_error_does_not_wedge_probe(self):
+        with StubChatServer() as stub:
+            # 500 abre el circuito; la prueba recibe redirecciones sin fin (TooManyRedirects)
+            stub.responses = [(500, 0)] + [(307, 0)] * 31
+            client = make_client(stub.url, max_retries=0, breaker=CircuitBreaker(1, 0.2))
+            with self.assertRaises(LLMError):
+                client.chat([{'role': 'user', 'content': 'hola'}])
+
+            time.sleep(0.25)
+            with self.assertRaises(LLMError):
+                client.chat([{'role': 'user', 'content': 'hola'}])
+            self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+            # Pasado el tiempo, una nueva prueba puede cerrar el circuito
+            time.sleep(0.25)
+            self.assertEqual(client.chat([{'role': 'user', 'content': 'hola'}])['content'], 'hola')
+
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()